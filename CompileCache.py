@@ -0,0 +1,230 @@
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import time
+
+from lexer import Token
+from Parser_2 import AST
+from ICG import Quad
+
+# Bump when the layout of any cached phase changes, so old entries are ignored
+CACHE_VERSION = 2
+
+# Every entry file starts with this, followed by the marshalled phase data
+ENTRY_MAGIC = b'MLC\x01'
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# After an eviction the cache holds at most this fraction of max_bytes, so
+# a full cache does not rescan its directory on every write
+EVICTION_TARGET = 0.75
+
+# Other processes write to the same directory, so the size kept in memory
+# is refreshed from the directory itself after this many writes
+RESCAN_WRITES = 32
+
+# Temporary files older than this (in seconds) were left by a crashed writer
+STALE_TEMPORARY_AGE = 3600
+
+ENTRY_SUFFIX = '.mlc'
+
+
+# Every phase is stored as plain tuples, lists and bytes that marshal can
+# write and read back fast. Unlike pickle, loading an entry never runs code,
+# so a cache directory shared between CI jobs cannot be used to inject it.
+
+def encode_tokens(tokens):
+    return [tuple(token) for token in tokens]
+
+
+def decode_tokens(data):
+    return list(map(Token._make, data))
+
+
+def encode_ast(root):
+    tree = root.tree
+    return (tree.kinds.tobytes(), tree.values, tree.first_child.tobytes(), tree.next_sibling.tobytes(),
+            tree.lines.tobytes(), tree.columns.tobytes(), tree.types.tobytes(), tree.root, root.id)
+
+
+def decode_ast(data):
+    kinds, values, first_child, next_sibling, lines, columns, types, tree_root, root = data
+    tree = AST()
+    tree.kinds.frombytes(kinds)
+    tree.values = values
+    tree.first_child.frombytes(first_child)
+    tree.next_sibling.frombytes(next_sibling)
+    tree.lines.frombytes(lines)
+    tree.columns.frombytes(columns)
+    tree.types.frombytes(types)
+    tree.root = tree_root
+    return tree.node(root)
+
+
+def encode_instructions(instructions):
+    return [(quad.op, quad.dst, quad.src1, quad.src2, quad.relop) for quad in instructions]
+
+
+def decode_instructions(data):
+    return [Quad(*quad) for quad in data]
+
+
+def encode_target_code(target_code):
+    return list(target_code)
+
+
+def decode_target_code(data):
+    return data
+
+
+# phase -> (encode, decode)
+PHASE_CODECS = {
+    'tokens': (encode_tokens, decode_tokens),
+    'ast': (encode_ast, decode_ast),
+    'ir': (encode_instructions, decode_instructions),
+    'target': (encode_target_code, decode_target_code),
+}
+
+
+class CompileCache:
+    """
+    A content-addressed cache of compiler phase results on disk. Entries are
+    keyed by a hash of the source text and the options that affect a phase
+    (see key()), one file per (phase, key), so a hit for a later phase skips
+    every phase before it.
+    Writes go to a temporary file that is renamed into place, and a missing
+    or damaged entry is just a miss, so any number of compiler processes can
+    share one directory. The directory is kept under `max_bytes`: a hit
+    refreshes the modification time of its entry, and once the entries
+    outgrow the limit the least recently used ones are deleted. Each process
+    only sees the directory's size when it scans it (on its first write and
+    every RESCAN_WRITES writes after), so concurrent writers can overshoot
+    the limit by what they wrote in between.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = None  # Estimated bytes in the directory; scanned on the first write
+        self.writes = 0  # Writes since the last scan
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @staticmethod
+    def key(source, *options):
+        """
+        Returns the hex digest identifying `source` compiled with `options`
+        (any values with a stable repr).
+        """
+        digest = hashlib.sha256()
+        digest.update(f"minilang-cache-{CACHE_VERSION}-{sys.byteorder}-{options!r}\0".encode())
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def path(self, phase, key):
+        return os.path.join(self.directory, f"{key}.{phase}{ENTRY_SUFFIX}")
+
+    def get(self, phase, key):
+        """
+        Returns the cached result of `phase` for `key`, or None.
+        """
+        path = self.path(phase, key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            if data[:len(ENTRY_MAGIC)] != ENTRY_MAGIC:
+                raise ValueError("not a cache entry")
+            value = PHASE_CODECS[phase][1](marshal.loads(data[len(ENTRY_MAGIC):]))
+        except (OSError, EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass  # Evicted by another process in the meantime
+        self.hits += 1
+        return value
+
+    def put(self, phase, key, value):
+        """
+        Stores the result of `phase` for `key`. Failing to write only means a later miss.
+        """
+        data = ENTRY_MAGIC + marshal.dumps(PHASE_CODECS[phase][0](value))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            handle, temporary = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                file.write(data)
+            os.replace(temporary, self.path(phase, key))
+        except OSError:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+            return
+        self.writes += 1
+        if self.size is None or self.writes >= RESCAN_WRITES:
+            self.evict()
+        else:
+            self.size += len(data)
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def entries(self):
+        """
+        Returns (mtime, size, path) of every entry, removing stale temporary files on the way.
+        """
+        entries = []
+        now = time.time()
+        try:
+            scan = os.scandir(self.directory)
+        except OSError:
+            return entries
+        with scan:
+            for entry in scan:
+                try:
+                    stat = entry.stat()
+                    if entry.name.endswith(ENTRY_SUFFIX):
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    elif entry.name.endswith('.tmp') and now - stat.st_mtime > STALE_TEMPORARY_AGE:
+                        os.unlink(entry.path)
+                except OSError:
+                    pass  # Replaced or evicted by another process
+        return entries
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the directory is below
+        EVICTION_TARGET of max_bytes (if it is over max_bytes at all).
+        """
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        if size > self.max_bytes:
+            target = self.max_bytes * EVICTION_TARGET
+            entries.sort()
+            for _, entry_size, path in entries:
+                if size <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    self.evicted += 1
+                except OSError:
+                    pass  # Already evicted by another process
+                size -= entry_size
+        self.size = size
+        self.writes = 0
+
+    def clear(self):
+        """
+        Deletes every entry.
+        """
+        for _, _, path in self.entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self.size = 0
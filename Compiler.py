@@ -0,0 +1,153 @@
+import hashlib
+import sys
+
+from lexer import lexer
+from Parser_2 import Parser
+from semantic_analyzer import SemanticAnalyzer, SemanticError
+from ICG import IntermediateCodeGenerator
+from Optimizer import Optimizer, DEFAULT_OPTIMIZATION_LEVEL
+from TargetCodeGenerator import TargetCodeGenerator
+from VirtualMachine import compile_bytecode
+
+# Modules whose code decides what the cached phases contain
+COMPILER_MODULES = ('lexer', 'Parser_2', 'symbol_table', 'semantic_analyzer', 'ICG', 'ControlFlowGraph', 'DataFlow', 'Peephole',
+                    'Optimizer', 'TargetCodeGenerator')
+
+# Unit of the count recorded for each phase by an Instrumentation
+PHASE_UNITS = {'tokens': 'tokens', 'ast': 'nodes', 'semantic': 'nodes', 'icg': 'instrs', 'ir': 'instrs', 'target': 'instrs',
+               'bytecode': 'instrs'}
+
+_fingerprint = None
+
+
+def compiler_fingerprint():
+    """
+    Returns a hash of the compiler's own source, so cache entries written by
+    a different version of the compiler are never reused.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        digest = hashlib.sha256(sys.version.encode())
+        for name in COMPILER_MODULES:
+            with open(sys.modules[name].__file__, 'rb') as file:
+                digest.update(file.read())
+        _fingerprint = digest.hexdigest()
+    return _fingerprint
+
+
+class Compilation:
+    """
+    One source text going through the compiler. Each phase runs when its
+    result is first used and is kept for later ones. With a CompileCache the
+    token stream, the AST, the optimized IR and the target code are looked
+    up first; on a hit for a later phase the earlier ones are never run.
+    Tokens and the AST are keyed by the source alone, the optimized IR and
+    target code also by the optimization level. Intermediate code is only
+    generated for a program without semantic errors. With an
+    Instrumentation.Instrumentation every phase is timed and the size of
+    its result recorded.
+    """
+
+    def __init__(self, source, level=DEFAULT_OPTIMIZATION_LEVEL, cache=None, instrumentation=None):
+        self.source = source
+        self.level = level
+        self.cache = cache
+        self.instrumentation = instrumentation
+        self.optimizer = None  # The Optimizer, if optimization ran here rather than coming from the cache
+        self.cached_phases = []  # Phases served from the cache
+        self.results = {}  # phase -> result
+        self.source_key = self.optimized_key = None
+        if cache is not None:
+            fingerprint = compiler_fingerprint()
+            self.source_key = cache.key(source, fingerprint)
+            self.optimized_key = cache.key(source, fingerprint, level)
+
+    def phase(self, phase, key, compute):
+        """
+        Returns the result of `phase`, from memory, the cache or `compute()`.
+        """
+        result = self.results.get(phase)
+        if result is not None:
+            return result
+        if self.instrumentation is None:
+            result = self.run_phase(phase, key, compute)
+        else:
+            with self.instrumentation.phase(phase) as metrics:
+                result = self.run_phase(phase, key, compute)
+                if phase == 'ast':
+                    metrics.count = len(result.tree)
+                elif phase == 'semantic':
+                    metrics.count = result.nodes
+                else:
+                    metrics.count = len(result)
+                metrics.unit = PHASE_UNITS[phase]
+                metrics.cached = phase in self.cached_phases
+        self.results[phase] = result
+        return result
+
+    def run_phase(self, phase, key, compute):
+        if key is not None:
+            result = self.cache.get(phase, key)
+            if result is not None:
+                self.cached_phases.append(phase)
+                return result
+        result = compute()
+        if key is not None:
+            self.cache.put(phase, key, result)
+        return result
+
+    @property
+    def tokens(self):
+        # Illegal characters become ILLEGAL tokens, reported by the parser with its own errors
+        return self.phase('tokens', self.source_key, lambda: list(lexer(self.source, recover=True)))
+
+    @property
+    def tree(self):
+        """
+        The root Node of the AST. Raises Parser_2.ParseError (a SyntaxError)
+        listing every lexical and syntax error of an invalid program.
+        """
+        return self.phase('ast', self.source_key, lambda: Parser(self.tokens).parse_program())
+
+    def analyze(self):
+        analyzer = SemanticAnalyzer()
+        analyzer.analyze(self.tree)
+        return analyzer
+
+    @property
+    def analysis(self):
+        """
+        The SemanticAnalyzer that checked (and annotated) the AST; its diagnostics include warnings.
+        """
+        return self.phase('semantic', None, self.analyze)
+
+    def checked_tree(self):
+        """
+        Returns the root Node of the analyzed AST. Raises SemanticError if the analysis found errors.
+        """
+        errors = self.analysis.errors
+        if errors:
+            raise SemanticError(errors)
+        return self.tree
+
+    @property
+    def intermediate_code(self):
+        return self.phase('icg', None,
+                          lambda: IntermediateCodeGenerator().generate_code_for_program(self.checked_tree()))
+
+    def optimize(self):
+        self.optimizer = Optimizer(list(self.intermediate_code))
+        return self.optimizer.optimize(self.level)
+
+    @property
+    def optimized_code(self):
+        return self.phase('ir', self.optimized_key, self.optimize)
+
+    @property
+    def target_code(self):
+        return self.phase('target', self.optimized_key,
+                          lambda: TargetCodeGenerator().generate_target_code(self.optimized_code))
+
+    @property
+    def bytecode(self):
+        return self.phase('bytecode', None, lambda: compile_bytecode(self.optimized_code))
@@ -0,0 +1,249 @@
+import asyncio
+import json
+import os
+import re
+import signal
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Optimizer import OPTIMIZATION_LEVELS, DEFAULT_OPTIMIZATION_LEVEL
+from TargetCodeGenerator import format_target_instruction
+from Parser_2 import ParseError
+from Compiler import Compilation
+from semantic_analyzer import SemanticError
+from CompileCache import CompileCache, DEFAULT_MAX_BYTES
+
+# Longest request line accepted, in bytes
+MAX_REQUEST_SIZE = 16 * 1024 * 1024
+
+# Responses to identical requests kept by the server, oldest evicted first
+MAX_CACHED_RESPONSES = 256
+
+EMIT_KINDS = ('tokens', 'ir', 'target', 'bytecode')
+
+POSITION_PATTERN = re.compile(r'at line (\d+), column (\d+)')
+
+
+def diagnostic(error):
+    """
+    Turns a compile error into a diagnostic dict, with its position when the message has one.
+    """
+    message = str(error)
+    result = {'severity': 'error', 'message': message}
+    match = POSITION_PATTERN.search(message)
+    if match:
+        result['line'] = int(match.group(1))
+        result['column'] = int(match.group(2))
+    return result
+
+
+# Per-process state of the workers, set by init_worker
+_cache = None
+
+
+def init_worker(cache_dir, cache_size):
+    global _cache
+    _cache = CompileCache(cache_dir, cache_size) if cache_dir else None
+    compile_program("var x; x = 1; while (x < 2) { x = x + 1; } print(x);", DEFAULT_OPTIMIZATION_LEVEL, EMIT_KINDS)
+
+
+def compile_program(source, level, emit):
+    """
+    Compiles one program in a worker and returns the response fields.
+    The program is always analyzed, so its warnings are reported as by
+    main.py whatever it asks to emit.
+    """
+    start = time.perf_counter()
+    compilation = Compilation(source, level, _cache)
+    response = {'ok': True, 'diagnostics': []}
+    try:
+        if 'tokens' in emit:
+            response['tokens'] = [list(token) for token in compilation.tokens]
+        response['diagnostics'] = [found._asdict() for found in compilation.analysis.diagnostics]
+        compilation.checked_tree()  # Raises SemanticError if the analysis found errors
+        if 'ir' in emit:
+            response['ir'] = [str(instruction) for instruction in compilation.optimized_code]
+        if 'target' in emit:
+            response['target'] = [format_target_instruction(instruction) for instruction in compilation.target_code]
+        if 'bytecode' in emit:
+            response['bytecode'] = compilation.bytecode.disassemble()
+    except ParseError as e:
+        response = {'ok': False, 'diagnostics': [error._asdict() for error in e.diagnostics]}
+    except SemanticError:
+        # The analysis diagnostics, warnings included, are already in the response
+        response = {'ok': False, 'diagnostics': response['diagnostics']}
+    except (SyntaxError, RuntimeError, ValueError) as e:
+        response = {'ok': False, 'diagnostics': [diagnostic(e)]}
+    response['seconds'] = time.perf_counter() - start
+    return response
+
+
+class CompilerServer:
+    """
+    A compiler daemon: accepts connections on a Unix socket and runs every
+    compile request in a pool of worker processes that keep the compiler
+    imported and warm, so the event loop only parses and writes JSON.
+    Identical requests (same source, level and outputs) are answered from
+    memory. The JSON protocol is described in daemon.py.
+    """
+
+    def __init__(self, socket_path, jobs=None, cache_dir=None, cache_size=DEFAULT_MAX_BYTES):
+        self.socket_path = socket_path
+        self.jobs = jobs or os.cpu_count() or 1
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.executor = None
+        self.server = None
+        self.stopped = None  # Future set when the server should shut down
+        self.connections = {}  # Connection handler task -> its StreamWriter
+        self.responses = {}  # (source, level, emit) -> response, in insertion order
+        self.requests = 0
+        self.cached = 0
+        self.failed = 0
+        self.started = time.time()
+
+    async def serve(self):
+        """
+        Runs until a shutdown request or SIGINT/SIGTERM, then removes the socket.
+        """
+        self.claim_socket()
+        self.executor = ProcessPoolExecutor(self.jobs, initializer=init_worker,
+                                            initargs=(self.cache_dir, self.cache_size))
+        loop = asyncio.get_running_loop()
+        self.stopped = loop.create_future()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stop)
+        self.server = await asyncio.start_unix_server(self.handle_connection, self.socket_path,
+                                                      limit=MAX_REQUEST_SIZE)
+        print(f"MiniLang compiler daemon listening on {self.socket_path} with {self.jobs} worker(s)", flush=True)
+        try:
+            await self.stopped
+        finally:
+            self.server.close()
+            for writer in self.connections.values():
+                writer.close()  # The handlers see end of input and return
+            await asyncio.gather(*self.connections, return_exceptions=True)
+            await self.server.wait_closed()
+            self.executor.shutdown(cancel_futures=True)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def stop(self):
+        if not self.stopped.done():
+            self.stopped.set_result(None)
+
+    def claim_socket(self):
+        """
+        Removes a socket left by a daemon that is no longer running; refuses to start next to a live one.
+        """
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise RuntimeError(f"A compiler daemon is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Reads requests line by line and answers each as soon as it is done.
+        """
+        pending = set()
+        connection = asyncio.current_task()
+        self.connections[connection] = writer
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Longer than MAX_REQUEST_SIZE
+                    await self.send(writer, {'ok': False, 'diagnostics': [
+                        {'severity': 'error', 'message': f"Request larger than {MAX_REQUEST_SIZE} bytes"}]})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                task = asyncio.ensure_future(self.answer(line, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            for task in pending:
+                task.cancel()
+            del self.connections[connection]
+            writer.close()
+
+    async def answer(self, line, writer):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+        except ValueError as e:
+            await self.send(writer, {'ok': False, 'diagnostics': [
+                {'severity': 'error', 'message': f"Invalid request: {e}"}]})
+            return
+        response = await self.respond(request)
+        if 'id' in request:
+            response['id'] = request['id']
+        await self.send(writer, response)
+
+    async def respond(self, request):
+        """
+        Returns the response to one decoded request.
+        """
+        op = request.get('op', 'compile')
+        if op == 'ping':
+            return {'ok': True}
+        if op == 'stats':
+            return {'ok': True, 'requests': self.requests, 'cached': self.cached, 'failed': self.failed,
+                    'workers': self.jobs, 'uptime': time.time() - self.started}
+        if op == 'shutdown':
+            self.stop()
+            return {'ok': True}
+        if op != 'compile':
+            return {'ok': False, 'diagnostics': [{'severity': 'error', 'message': f"Unknown op {op!r}"}]}
+
+        source = request.get('source')
+        level = request.get('level', DEFAULT_OPTIMIZATION_LEVEL)
+        emit = request.get('emit', ['target'])
+        # Types first: an unhashable level or emit kind would make the membership tests raise
+        if (not isinstance(source, str) or not isinstance(level, int) or level not in OPTIMIZATION_LEVELS
+                or not isinstance(emit, list) or not all(isinstance(kind, str) for kind in emit)
+                or not set(emit) <= set(EMIT_KINDS)):
+            return {'ok': False, 'diagnostics': [{'severity': 'error', 'message': (
+                f"A compile request needs a string 'source', a 'level' in {sorted(OPTIMIZATION_LEVELS)} "
+                f"and 'emit' drawn from {list(EMIT_KINDS)}")}]}
+
+        self.requests += 1
+        key = (source, level, tuple(sorted(emit)))
+        response = self.responses.get(key)
+        if response is not None:
+            self.cached += 1
+        else:
+            try:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, compile_program, source, level, key[2])
+            except Exception as e:  # A crashed worker or a compiler bug: report it, keep serving
+                self.failed += 1
+                return {'ok': False, 'diagnostics': [
+                    {'severity': 'error', 'message': f"Internal compiler error: {type(e).__name__}: {e}"}]}
+            if len(self.responses) >= MAX_CACHED_RESPONSES:
+                del self.responses[next(iter(self.responses))]
+            self.responses[key] = response
+        if not response['ok']:
+            self.failed += 1
+        return dict(response)
+
+    async def send(self, writer, response):
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+
+
@@ -0,0 +1,285 @@
+from ICG import LABEL, GOTO, IF_GOTO
+
+
+class BasicBlock:
+    """
+    A maximal straight-line run of IR instructions. A block may start with one
+    or more labels and only its last instruction may jump. `exits` is True
+    when control can leave the program from the end of the block.
+    """
+    __slots__ = ('index', 'instructions', 'successors', 'predecessors', 'exits')
+
+    def __init__(self, index):
+        self.index = index
+        self.instructions = []
+        self.successors = []
+        self.predecessors = []
+        self.exits = False
+
+    def labels(self):
+        """
+        Returns the labels placed at the start of the block.
+        """
+        result = []
+        for instruction in self.instructions:
+            if instruction.op != LABEL:
+                break
+            result.append(instruction.dst)
+        return result
+
+    def __repr__(self):
+        return f"BasicBlock({self.index}, {len(self.instructions)} instructions)"
+
+
+class ControlFlowGraph:
+    """
+    Splits a list of ICG.Quad instructions into basic blocks and links them.
+    Block 0 is the entry block; blocks keep the order of the instruction list,
+    so concatenating them gives back a valid program.
+    """
+
+    def __init__(self, instructions):
+        self.blocks = []
+        self.label_blocks = {}  # label -> index of the block it starts
+        self.build_blocks(instructions)
+        self.link_blocks()
+
+    def build_blocks(self, instructions):
+        block = None
+        starts_new_block = True
+        for instruction in instructions:
+            op = instruction.op
+            # A label starts a new block unless the current block holds only labels so far
+            if op == LABEL and block is not None and block.instructions[-1].op != LABEL:
+                starts_new_block = True
+            if starts_new_block:
+                block = BasicBlock(len(self.blocks))
+                self.blocks.append(block)
+                starts_new_block = False
+            if op == LABEL:
+                self.label_blocks[instruction.dst] = block.index
+            block.instructions.append(instruction)
+            if op == GOTO or op == IF_GOTO:
+                starts_new_block = True
+
+    def link_blocks(self):
+        blocks = self.blocks
+        for block in blocks:
+            block.successors = []
+            block.predecessors = []
+        last = len(blocks) - 1
+        for block in blocks:
+            instructions = block.instructions
+            op = instructions[-1].op if instructions else None
+            block.exits = op != GOTO and block.index == last
+            if op == GOTO:
+                successors = [self.label_blocks[instructions[-1].dst]]
+            elif op == IF_GOTO:
+                target = self.label_blocks[instructions[-1].dst]
+                successors = [block.index + 1, target] if block.index < last else [target]
+                if successors[0] == target:
+                    successors = [target]
+            else:
+                successors = [block.index + 1] if block.index < last else []
+            block.successors = successors
+            for successor in successors:
+                blocks[successor].predecessors.append(block.index)
+
+    def reachable(self):
+        """
+        Returns the set of block indices reachable from the entry block.
+        """
+        if not self.blocks:
+            return set()
+        seen = {0}
+        stack = [0]
+        blocks = self.blocks
+        while stack:
+            for successor in blocks[stack.pop()].successors:
+                if successor not in seen:
+                    seen.add(successor)
+                    stack.append(successor)
+        return seen
+
+    def postorder(self):
+        """
+        Returns the reachable block indices in depth-first postorder.
+        """
+        if not self.blocks:
+            return []
+        blocks = self.blocks
+        order = []
+        visited = {0}
+        stack = [(0, iter(blocks[0].successors))]
+        while stack:
+            index, successors = stack[-1]
+            for successor in successors:
+                if successor not in visited:
+                    visited.add(successor)
+                    stack.append((successor, iter(blocks[successor].successors)))
+                    break
+            else:
+                stack.pop()
+                order.append(index)
+        return order
+
+    def reverse_postorder(self):
+        order = self.postorder()
+        order.reverse()
+        return order
+
+    def remove_unreachable_blocks(self):
+        """
+        Drops blocks that cannot be reached from the entry block, renumbers
+        the rest and returns the number of instructions removed.
+        """
+        reachable = self.reachable()
+        if len(reachable) == len(self.blocks):
+            return 0
+        removed = 0
+        kept = []
+        for block in self.blocks:
+            if block.index in reachable:
+                kept.append(block)
+            else:
+                removed += len(block.instructions)
+        self.rebuild(kept)
+        return removed
+
+    def rebuild(self, blocks):
+        """
+        Replaces the block list (e.g. after blocks were added, removed or edited)
+        and recomputes indices, labels and edges.
+        """
+        self.blocks = blocks
+        self.label_blocks = {}
+        for index, block in enumerate(blocks):
+            block.index = index
+            for label in block.labels():
+                self.label_blocks[label] = index
+        self.link_blocks()
+
+    def instructions(self):
+        """
+        Flattens the blocks back into a single instruction list.
+        """
+        result = []
+        for block in self.blocks:
+            result.extend(block.instructions)
+        return result
+
+    def natural_loops(self, dominators):
+        """
+        Finds natural loops: for every back edge latch -> header (the header
+        dominates the latch) the loop is the header plus every block that can
+        reach the latch without passing through the header. Back edges to the
+        same header are merged. Loops are returned innermost (smallest) first.
+        """
+        loops = {}
+        blocks = self.blocks
+        for block in blocks:
+            for successor in block.successors:
+                if not dominators.dominates(successor, block.index):
+                    continue
+                loop = loops.get(successor)
+                if loop is None:
+                    loop = loops[successor] = Loop(successor)
+                loop.latches.append(block.index)
+                stack = [block.index]
+                while stack:
+                    index = stack.pop()
+                    if index in loop.blocks:
+                        continue
+                    loop.blocks.add(index)
+                    stack.extend(blocks[index].predecessors)
+        return sorted(loops.values(), key=lambda loop: len(loop.blocks))
+
+
+class Dominators:
+    """
+    Dominator tree of a ControlFlowGraph, computed with the iterative
+    algorithm of Cooper, Harvey and Kennedy. Dominance queries are O(1)
+    through preorder/postorder numbers of the dominator tree.
+    idom[entry] is the entry itself; unreachable blocks have idom -1.
+    """
+
+    def __init__(self, cfg):
+        count = len(cfg.blocks)
+        self.idom = idom = [-1] * count
+        order = cfg.reverse_postorder()
+        if not order:
+            self.pre = self.post = []
+            return
+        rank = [count] * count
+        for position, index in enumerate(order):
+            rank[index] = position
+        idom[0] = 0
+        blocks = cfg.blocks
+        changed = True
+        while changed:
+            changed = False
+            for index in order[1:]:
+                new_idom = -1
+                for predecessor in blocks[index].predecessors:
+                    if idom[predecessor] == -1:
+                        continue
+                    if new_idom == -1:
+                        new_idom = predecessor
+                        continue
+                    # Walk both candidates up to their closest common dominator
+                    left, right = predecessor, new_idom
+                    while left != right:
+                        while rank[left] > rank[right]:
+                            left = idom[left]
+                        while rank[right] > rank[left]:
+                            right = idom[right]
+                    new_idom = left
+                if idom[index] != new_idom:
+                    idom[index] = new_idom
+                    changed = True
+
+        # Number the dominator tree so that dominance is an interval test
+        children = [[] for _ in range(count)]
+        for index in order[1:]:
+            children[idom[index]].append(index)
+        self.pre = pre = [-1] * count
+        self.post = post = [-1] * count
+        clock = 0
+        stack = [(0, iter(children[0]))]
+        pre[0] = clock
+        while stack:
+            index, pending = stack[-1]
+            child = next(pending, None)
+            if child is None:
+                stack.pop()
+                clock += 1
+                post[index] = clock
+            else:
+                clock += 1
+                pre[child] = clock
+                stack.append((child, iter(children[child])))
+
+    def dominates(self, dominator, index):
+        """
+        Returns True if every path from the entry to block `index` passes through `dominator`.
+        """
+        pre = self.pre
+        if pre[dominator] < 0 or pre[index] < 0:
+            return False
+        return pre[dominator] <= pre[index] and self.post[index] <= self.post[dominator]
+
+
+class Loop:
+    """
+    A natural loop: its header block, the set of block indices in its body
+    (header included) and the latches whose back edges jump to the header.
+    """
+    __slots__ = ('header', 'blocks', 'latches')
+
+    def __init__(self, header):
+        self.header = header
+        self.blocks = {header}
+        self.latches = []
+
+    def __repr__(self):
+        return f"Loop(header={self.header}, blocks={sorted(self.blocks)})"
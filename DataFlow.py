@@ -0,0 +1,198 @@
+from heapq import heappop, heappush
+
+from ICG import is_temporary
+
+
+class DataFlowAnalysis:
+    """
+    Worklist solver for gen/kill problems over a ControlFlowGraph. Facts are
+    Python ints used as bitsets and paths are merged with union:
+        forward:  in[b]  = OR of out[p] over predecessors, out[b] = gen[b] | (in[b] & ~kill[b])
+        backward: out[b] = OR of in[s] over successors,    in[b]  = gen[b] | (out[b] & ~kill[b])
+    Subclasses fill `gen`, `kill` and `boundary` (the fact at the program
+    entry for forward problems, or at the program exit for backward ones).
+    """
+    forward = True
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        count = len(cfg.blocks)
+        self.gen = [0] * count
+        self.kill = [0] * count
+        self.boundary = 0
+        self.block_in = [0] * count
+        self.block_out = [0] * count
+
+    def solve(self):
+        """
+        Iterates the transfer functions to a fixed point and returns self.
+        The worklist is a priority queue ordered by reverse postorder (forward)
+        or postorder (backward), so a loop settles before the blocks after it
+        are revisited and each block is processed only a few times.
+        """
+        blocks = self.cfg.blocks
+        gen = self.gen
+        kill = self.kill
+        block_in = self.block_in
+        block_out = self.block_out
+        boundary = self.boundary
+
+        order = self.cfg.reverse_postorder() if self.forward else self.cfg.postorder()
+        rank = [-1] * len(blocks)
+        for position, index in enumerate(order):
+            rank[index] = position
+        # Unreachable blocks still get a solution
+        for index in range(len(blocks)):
+            if rank[index] < 0:
+                rank[index] = len(order)
+                order.append(index)
+        queued = [True] * len(blocks)
+        worklist = list(range(len(order)))  # ranks; already a valid heap
+
+        if self.forward:
+            while worklist:
+                index = order[heappop(worklist)]
+                queued[index] = False
+                block = blocks[index]
+                fact = boundary if index == 0 else 0
+                for predecessor in block.predecessors:
+                    fact |= block_out[predecessor]
+                block_in[index] = fact
+                fact = gen[index] | (fact & ~kill[index])
+                if fact != block_out[index]:
+                    block_out[index] = fact
+                    for successor in block.successors:
+                        if not queued[successor]:
+                            queued[successor] = True
+                            heappush(worklist, rank[successor])
+        else:
+            while worklist:
+                index = order[heappop(worklist)]
+                queued[index] = False
+                block = blocks[index]
+                fact = boundary if block.exits else 0
+                for successor in block.successors:
+                    fact |= block_in[successor]
+                block_out[index] = fact
+                fact = gen[index] | (fact & ~kill[index])
+                if fact != block_in[index]:
+                    block_in[index] = fact
+                    for predecessor in block.predecessors:
+                        if not queued[predecessor]:
+                            queued[predecessor] = True
+                            heappush(worklist, rank[predecessor])
+        return self
+
+
+class Liveness(DataFlowAnalysis):
+    """
+    Live variables. Bit i stands for variable `names[i]`. Variables in
+    `live_on_exit` are live when the program ends; by default that is every
+    non-temporary variable, so only temporaries and overwritten stores die.
+    """
+    forward = False
+
+    def __init__(self, cfg, live_on_exit=None):
+        super().__init__(cfg)
+        self.names = []
+        self.bits = {}  # variable -> bit
+        bit = self.bit
+        for block in cfg.blocks:
+            use = 0
+            define = 0
+            for instruction in reversed(block.instructions):
+                var = instruction.defines()
+                if var is not None:
+                    mask = bit(var)
+                    use &= ~mask
+                    define |= mask
+                for var in instruction.uses():
+                    use |= bit(var)
+            self.gen[block.index] = use
+            self.kill[block.index] = define
+
+        if live_on_exit is None:
+            live_on_exit = [name for name in self.names if not is_temporary(name)]
+        for name in live_on_exit:
+            self.boundary |= bit(name)
+
+    def bit(self, name):
+        """
+        Returns the bitmask of a variable, numbering it on first sight.
+        """
+        mask = self.bits.get(name)
+        if mask is None:
+            mask = 1 << len(self.names)
+            self.bits[name] = mask
+            self.names.append(name)
+        return mask
+
+    def live_in(self, index):
+        return self.to_names(self.block_in[index])
+
+    def live_out(self, index):
+        return self.to_names(self.block_out[index])
+
+    def to_names(self, fact):
+        """
+        Converts a bitset into the set of variable names it contains.
+        """
+        names = self.names
+        result = set()
+        while fact:
+            low = fact & -fact
+            result.add(names[low.bit_length() - 1])
+            fact ^= low
+        return result
+
+
+class ReachingDefinitions(DataFlowAnalysis):
+    """
+    Reaching definitions. Bit i stands for `definitions[i]`, a
+    (block index, instruction index, variable) triple.
+    """
+    forward = True
+
+    def __init__(self, cfg):
+        super().__init__(cfg)
+        self.definitions = []
+        self.variable_definitions = {}  # variable -> bitset of its definitions
+        for block in cfg.blocks:
+            for position, instruction in enumerate(block.instructions):
+                var = instruction.defines()
+                if var is not None:
+                    mask = 1 << len(self.definitions)
+                    self.definitions.append((block.index, position, var))
+                    self.variable_definitions[var] = self.variable_definitions.get(var, 0) | mask
+
+        variable_definitions = self.variable_definitions
+        mask = 1
+        for block_index, _, var in self.definitions:
+            all_definitions = variable_definitions[var]
+            self.gen[block_index] = (self.gen[block_index] & ~all_definitions) | mask
+            self.kill[block_index] |= all_definitions
+            mask <<= 1
+
+    def reaching_in(self, index):
+        """
+        Returns the definitions (as triples) that reach the start of a block.
+        """
+        return self.to_definitions(self.block_in[index])
+
+    def reaching_out(self, index):
+        """
+        Returns the definitions (as triples) that reach the end of a block.
+        """
+        return self.to_definitions(self.block_out[index])
+
+    def to_definitions(self, fact):
+        """
+        Converts a bitset into the list of definition triples it contains, in order.
+        """
+        definitions = self.definitions
+        result = []
+        while fact:
+            low = fact & -fact
+            result.append(definitions[low.bit_length() - 1])
+            fact ^= low
+        return result
@@ -1,6 +1,194 @@
+import operator
+import sys
+
+from Parser_2 import (
+    N_PROGRAM, N_BLOCK, N_VAR_DECL, N_ASSIGN, N_IF, N_WHILE, N_PRINT, N_NUMBER, N_ID, N_BINARY, N_INPUT, T_INT, T_FLOAT,
+)
+
+# IR opcodes. Arithmetic, relational and logical instructions use the operator itself as opcode.
+COPY = ':='
+LABEL = 'label'
+GOTO = 'goto'
+IF_GOTO = 'if'
+PRINT = 'print'
+INPUT = 'input'
+
+ARITHMETIC_OPERATORS = frozenset(('+', '-', '*', '/'))
+RELATIONAL_OPERATORS = frozenset(('<', '>', '<=', '>=', '==', '!='))
+LOGICAL_OPERATORS = frozenset(('&&', '||'))
+BINARY_OPERATORS = ARITHMETIC_OPERATORS | RELATIONAL_OPERATORS | LOGICAL_OPERATORS
+
+# Relational operator that holds exactly when the given one does not
+NEGATED_RELATIONS = {'<': '>=', '>=': '<', '>': '<=', '<=': '>', '==': '!=', '!=': '=='}
+
+
+def divide(left, right):
+    """
+    Division as MiniLang defines it: truncating for two ints, true division otherwise.
+    """
+    if left.__class__ is int and right.__class__ is int:
+        quotient = abs(left) // abs(right)
+        return quotient if (left >= 0) == (right >= 0) else -quotient
+    return left / right
+
+
+# Conditions of relational jumps, and the value of every binary operator.
+# Comparisons and logical operators produce the ints 1 and 0.
+RELATIONS = {
+    '<': operator.lt, '>': operator.gt, '<=': operator.le,
+    '>=': operator.ge, '==': operator.eq, '!=': operator.ne,
+}
+BINARY_OPERATIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': divide,
+    '<': lambda left, right: int(left < right),
+    '>': lambda left, right: int(left > right),
+    '<=': lambda left, right: int(left <= right),
+    '>=': lambda left, right: int(left >= right),
+    '==': lambda left, right: int(left == right),
+    '!=': lambda left, right: int(left != right),
+    '&&': lambda left, right: int(left != 0 and right != 0),
+    '||': lambda left, right: int(left != 0 or right != 0),
+}
+
+
+class Quad:
+    """
+    A three-address instruction (quadruple). Operands are variable names
+    (interned strings) or int/float constants.
+        x := y              Quad(':=', 'x', 'y')
+        %t0 := a + b        Quad('+', '%t0', 'a', 'b')
+        label_0:            Quad('label', 'label_0')
+        goto label_0        Quad('goto', 'label_0')
+        if a < b goto L     Quad('if', 'L', 'a', 'b', '<')
+        print a             Quad('print', None, 'a')
+        input a             Quad('input', 'a')
+    """
+    __slots__ = ('op', 'dst', 'src1', 'src2', 'relop')
+
+    def __init__(self, op, dst=None, src1=None, src2=None, relop=None):
+        self.op = op
+        self.dst = dst
+        self.src1 = src1
+        self.src2 = src2
+        self.relop = relop
+
+    def __str__(self):
+        op = self.op
+        if op == COPY:
+            return f"{self.dst} := {self.src1}"
+        elif op == LABEL:
+            return f"{self.dst}:"
+        elif op == GOTO:
+            return f"goto {self.dst}"
+        elif op == IF_GOTO:
+            return f"if {self.src1} {self.relop} {self.src2} goto {self.dst}"
+        elif op == PRINT:
+            return f"print {self.src1}"
+        elif op == INPUT:
+            return f"input {self.dst}"
+        return f"{self.dst} := {self.src1} {op} {self.src2}"
+
+    def __repr__(self):
+        return f"Quad({str(self)!r})"
+
+    def defines(self):
+        """
+        Returns the variable written by this instruction, or None.
+        """
+        op = self.op
+        return self.dst if op == COPY or op == INPUT or op in BINARY_OPERATORS else None
+
+    def uses(self):
+        """
+        Returns the variables read by this instruction.
+        """
+        op = self.op
+        if op == LABEL or op == GOTO or op == INPUT:
+            return ()
+        src1 = self.src1
+        src2 = self.src2
+        if src2 is None or src2.__class__ is not str:
+            return (src1,) if src1.__class__ is str else ()
+        if src1.__class__ is str:
+            return (src1, src2)
+        return (src2,)
+
+
+def is_constant(operand):
+    """
+    Returns True for numeric constant operands, False for variable names.
+    """
+    return operand.__class__ is not str
+
+
+# Temporaries are named %t0, %t1, ...; '%' cannot start a MiniLang identifier,
+# so they never collide with a program's own variables
+TEMPORARY_PREFIX = '%t'
+
+
+def temporary_name(number):
+    """
+    Returns the name of temporary number `number`.
+    """
+    return sys.intern(f"{TEMPORARY_PREFIX}{number}")
+
+
+def temporary_number(name):
+    """
+    Returns the number of a temporary name made by temporary_name.
+    """
+    return int(name[len(TEMPORARY_PREFIX):])
+
+
+def is_temporary(name):
+    """
+    Returns True if a variable name was generated by get_new_temp (%t0, %t1, ...).
+    """
+    return name.startswith(TEMPORARY_PREFIX)
+
+
+def make_operand(value):
+    """
+    Converts a source-level operand (a NUMBER lexeme or a name) into an IR operand.
+    """
+    if value.__class__ is not str:
+        return value
+    if value[:1].isdigit():
+        return float(value) if '.' in value else int(value)
+    return sys.intern(value)
+
+
+def variable_operand(tree, node):
+    """
+    Returns the IR name of the variable a var_decl, assign, input or id node
+    refers to: the name of the symbol slot the semantic analyzer resolved it
+    to, or just its spelling in a tree that was never analyzed.
+    """
+    slots = tree.slots
+    if slots is None:
+        return tree.values[node]
+    return tree.slot_names[slots[node]]
+
+
+def constant_operand(tree, node):
+    """
+    Returns the IR constant of a number node, as the int or float the
+    semantic analyzer typed it (parsed from the lexeme if it never ran).
+    """
+    value_type = tree.types[node]
+    if value_type == T_INT:
+        return int(tree.values[node])
+    if value_type == T_FLOAT:
+        return float(tree.values[node])
+    return make_operand(tree.values[node])
+
+
 class IntermediateCodeGenerator:
     def __init__(self):
-        self.instruction_list = []  # List to store intermediate code instructions
+        self.instruction_list = []  # List to store intermediate code instructions (Quad objects)
         self.label_count = 0  # Counter for generating unique labels
         self.temp_count = 0  # Counter for generating temporary variables
 
@@ -8,23 +196,37 @@ class IntermediateCodeGenerator:
         """
         Generates a new label for control flow (e.g., for loops or conditionals).
         """
-        label = f"label_{self.label_count}"
+        label = sys.intern(f"label_{self.label_count}")
         self.label_count += 1
         return label
 
     def get_new_temp(self):
         """
-        Generates a new temporary variable (e.g., t1, t2, etc.).
+        Generates a new temporary variable (e.g., %t1, %t2, etc.).
         """
-        temp = f"t{self.temp_count}"
+        temp = temporary_name(self.temp_count)
         self.temp_count += 1
         return temp
 
-    def emit(self, instruction):
+    def emit(self, op, dst=None, src1=None, src2=None, relop=None):
         """
-        Adds an instruction to the list of intermediate code.
+        Adds an instruction to the list of intermediate code and returns it.
         """
+        instruction = Quad(op, dst, src1, src2, relop)
         self.instruction_list.append(instruction)
+        return instruction
+
+    def emit_label(self, label):
+        """
+        Places a label at the current position.
+        """
+        return self.emit(LABEL, label)
+
+    def emit_goto(self, label):
+        """
+        Adds an unconditional jump to a label.
+        """
+        return self.emit(GOTO, label)
 
     def print_instructions(self):
         """
@@ -37,8 +239,7 @@ class IntermediateCodeGenerator:
         """
         Generate intermediate code for an assignment (e.g., var := value).
         """
-        instruction = f"{var} := {value}"
-        self.emit(instruction)
+        self.emit(COPY, make_operand(var), make_operand(value))
 
     def generate_code_for_arithmetic(self, operand1, operator, operand2):
         """
@@ -46,8 +247,7 @@ class IntermediateCodeGenerator:
         e.g., a + b -> temp_var := a + b
         """
         temp_var = self.get_new_temp()
-        instruction = f"{temp_var} := {operand1} {operator} {operand2}"
-        self.emit(instruction)
+        self.emit(operator, temp_var, make_operand(operand1), make_operand(operand2))
         return temp_var
 
     def generate_code_for_comparison(self, operand1, operator, operand2, true_label, false_label):
@@ -55,27 +255,121 @@ class IntermediateCodeGenerator:
         Generate intermediate code for a comparison (e.g., a < b).
         If true, jump to true_label, else jump to false_label.
         """
-        instruction = f"if {operand1} {operator} {operand2} goto {true_label}"
-        self.emit(instruction)
-        self.emit(f"goto {false_label}")
+        self.emit(IF_GOTO, true_label, make_operand(operand1), make_operand(operand2), operator)
+        self.emit_goto(false_label)
 
     def generate_code_for_conditional(self, condition, true_label, false_label):
         """
         Generate intermediate code for a conditional jump (if-else).
+        A condition value is true when it is non-zero.
+        """
+        self.emit(IF_GOTO, true_label, make_operand(condition), 0, '!=')
+        self.emit_goto(false_label)
+
+    def generate_code_for_program(self, root):
+        """
+        Lowers a parsed program (the root Node returned by Parser.parse_program)
+        to intermediate code in a single pass. Statements are walked with an
+        explicit work stack of node ids and pending label/goto actions, and
+        every if/while allocates its own labels, so nesting depth and program
+        size only cost linear time. Variables and constants come from the
+        slots and types the semantic analyzer left in the tree.
         """
-        self.emit(f"if {condition} goto {true_label}")
-        self.emit(f"goto {false_label}")
+        tree = root.tree
+        kinds = tree.kinds
+        stack = [root.id]
+        while stack:
+            item = stack.pop()
+            if item.__class__ is tuple:
+                # Deferred control-flow action: (opcode, label)
+                self.emit(item[0], item[1])
+                continue
+
+            kind = kinds[item]
+            if kind == N_ASSIGN:
+                self.generate_code_for_expression(tree, tree.first_child[item], variable_operand(tree, item))
+            elif kind == N_PRINT:
+                self.emit(PRINT, None, self.generate_code_for_expression(tree, tree.first_child[item]))
+            elif kind == N_INPUT:
+                self.emit(INPUT, variable_operand(tree, item))
+            elif kind == N_IF:
+                children = tree.children(item)
+                else_label = self.new_label()
+                self.generate_code_for_false_jump(tree, children[0], else_label)
+                if len(children) > 2:
+                    end_label = self.new_label()
+                    stack += [(LABEL, end_label), children[2], (LABEL, else_label), (GOTO, end_label), children[1]]
+                else:
+                    stack += [(LABEL, else_label), children[1]]
+            elif kind == N_WHILE:
+                condition, body = tree.children(item)
+                start_label = self.new_label()
+                end_label = self.new_label()
+                self.emit_label(start_label)
+                self.generate_code_for_false_jump(tree, condition, end_label)
+                stack += [(LABEL, end_label), (GOTO, start_label), body]
+            elif kind == N_BLOCK or kind == N_PROGRAM:
+                stack.extend(reversed(tree.children(item)))
+            elif kind != N_VAR_DECL:  # Declarations produce no code
+                raise ValueError(f"Cannot generate code for node kind {kind}")
+        return self.instruction_list
+
+    def generate_code_for_expression(self, tree, node, target=None):
+        """
+        Generates code for an expression subtree and returns the operand holding
+        its value. When `target` is given the value is stored there, and the
+        outermost operation writes to it directly instead of to a temporary.
+        """
+        kinds = tree.kinds
+        values = tree.values
+        kind = kinds[node]
+        if kind != N_BINARY:
+            operand = constant_operand(tree, node) if kind == N_NUMBER else variable_operand(tree, node)
+            if target is not None:
+                self.emit(COPY, target, operand)
+                return target
+            return operand
+
+        first_child = tree.first_child
+        next_sibling = tree.next_sibling
+        results = []
+        stack = [node]  # node ids to evaluate; ~id marks an operator whose operands are ready
+        while stack:
+            item = stack.pop()
+            if item < 0:
+                item = ~item
+                right = results.pop()
+                left = results.pop()
+                dst = target if item == node and target is not None else self.get_new_temp()
+                self.emit(values[item], dst, left, right)
+                results.append(dst)
+                continue
+            kind = kinds[item]
+            if kind == N_BINARY:
+                left = first_child[item]
+                stack += [~item, next_sibling[left], left]
+            elif kind == N_NUMBER:
+                results.append(constant_operand(tree, item))
+            elif kind == N_ID:
+                results.append(variable_operand(tree, item))
+            else:
+                raise ValueError(f"Cannot generate code for expression node kind {kind}")
+        return results[0]
 
-    def generate_code_for_loop(self, loop_condition, loop_body, loop_end_label):
+    def generate_code_for_false_jump(self, tree, condition, false_label):
         """
-        Generate intermediate code for a while loop.
-        The loop will continue while the condition is true.
+        Generates code that jumps to false_label when a condition does not hold
+        and falls through otherwise. Relational conditions become a single
+        negated conditional jump.
         """
-        start_label = self.new_label()
-        self.emit(f"{start_label}:")  # Start label for the loop
-        self.generate_code_for_comparison(loop_condition[0], loop_condition[1], loop_condition[2], loop_end_label, start_label)
-        self.emit(f"{loop_body}:")  # Body of the loop
-        self.emit(f"goto {start_label}")  # Jump back to the start of the loop
+        if tree.kinds[condition] == N_BINARY and tree.values[condition] in RELATIONAL_OPERATORS:
+            left = tree.first_child[condition]
+            operand1 = self.generate_code_for_expression(tree, left)
+            operand2 = self.generate_code_for_expression(tree, tree.next_sibling[left])
+            self.emit(IF_GOTO, false_label, operand1, operand2, NEGATED_RELATIONS[tree.values[condition]])
+        else:
+            value = self.generate_code_for_expression(tree, condition)
+            self.emit(IF_GOTO, false_label, value, 0, '==')
 
     def optimize(self):
         """
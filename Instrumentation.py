@@ -0,0 +1,150 @@
+import json
+import time
+import tracemalloc
+from contextlib import nullcontext
+
+# Shared no-op context for callers without instrumentation
+NULL_PHASE = nullcontext()
+
+
+class PhaseMetrics:
+    """
+    What one compiler phase cost and produced. `seconds` and `cpu_seconds`
+    exclude phases run inside it (a phase that needs an earlier one computes
+    it lazily, see Compiler.Compilation), so the phases of a compile add up.
+    `peak_bytes` is only measured when memory tracing is on.
+    """
+    __slots__ = ('name', 'seconds', 'cpu_seconds', 'peak_bytes', 'count', 'unit', 'cached', 'error',
+                 'start', 'cpu_start', 'memory_start', 'nested_seconds', 'nested_cpu_seconds')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.peak_bytes = None
+        self.count = None  # Items the phase produced (tokens, nodes, instructions)
+        self.unit = None
+        self.cached = False  # Result taken from a CompileCache
+        self.error = None  # Name of the exception the phase raised, if any
+        self.nested_seconds = 0.0
+        self.nested_cpu_seconds = 0.0
+
+    def as_dict(self):
+        return {'name': self.name, 'seconds': self.seconds, 'cpu_seconds': self.cpu_seconds,
+                'peak_bytes': self.peak_bytes, 'count': self.count, 'unit': self.unit, 'cached': self.cached,
+                'error': self.error}
+
+
+class PhaseTimer:
+    """
+    Context manager measuring one phase for an Instrumentation; entering it returns the PhaseMetrics to fill in.
+    """
+    __slots__ = ('instrumentation', 'metrics')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.metrics = PhaseMetrics(name)
+
+    def __enter__(self):
+        metrics = self.metrics
+        instrumentation = self.instrumentation
+        if instrumentation.trace_memory:
+            if instrumentation.active:
+                parent = instrumentation.active[-1]
+                parent.peak_bytes = max(parent.peak_bytes, tracemalloc.get_traced_memory()[1] - parent.memory_start)
+            metrics.memory_start = tracemalloc.get_traced_memory()[0]
+            metrics.peak_bytes = 0
+            tracemalloc.reset_peak()
+        instrumentation.active.append(metrics)
+        metrics.cpu_start = time.process_time()
+        metrics.start = time.perf_counter()
+        return metrics
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        metrics = self.metrics
+        if exc_type is not None:
+            metrics.error = exc_type.__name__
+        seconds = time.perf_counter() - metrics.start
+        cpu_seconds = time.process_time() - metrics.cpu_start
+        instrumentation = self.instrumentation
+        instrumentation.active.pop()
+        metrics.seconds = seconds - metrics.nested_seconds
+        metrics.cpu_seconds = cpu_seconds - metrics.nested_cpu_seconds
+        if instrumentation.trace_memory:
+            metrics.peak_bytes = max(metrics.peak_bytes, tracemalloc.get_traced_memory()[1] - metrics.memory_start)
+        if instrumentation.active:
+            parent = instrumentation.active[-1]
+            parent.nested_seconds += seconds
+            parent.nested_cpu_seconds += cpu_seconds
+            if instrumentation.trace_memory:
+                parent.peak_bytes = max(parent.peak_bytes, metrics.memory_start - parent.memory_start
+                                        + metrics.peak_bytes)
+        instrumentation.record(metrics)
+        return False
+
+
+class Instrumentation:
+    """
+    Collects PhaseMetrics for the phases of a compile:
+        with instrumentation.phase('lexer') as metrics:
+            tokens = list(lexer(source))
+            metrics.count, metrics.unit = len(tokens), 'tokens'
+    Code that takes an optional Instrumentation checks for None and does
+    nothing else, so turning instrumentation off costs one test per phase.
+    Subclasses can override record() to send metrics elsewhere.
+    `trace_memory` measures peak allocations with tracemalloc, which slows
+    compiling down noticeably.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.phases = []  # PhaseMetrics in the order the phases finished
+        self.active = []  # Phases being measured, innermost last
+        self.extra = {}  # Other values to report, by name
+        self.started = time.perf_counter()
+        self.started_tracing = trace_memory and not tracemalloc.is_tracing()
+        if self.started_tracing:
+            tracemalloc.start()
+
+    def phase(self, name):
+        return PhaseTimer(self, name)
+
+    def record(self, metrics):
+        self.phases.append(metrics)
+
+    def close(self):
+        """
+        Stops memory tracing (if this instance started it).
+        """
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def as_dict(self):
+        return {
+            'total_seconds': time.perf_counter() - self.started,
+            'phases': [metrics.as_dict() for metrics in self.phases],
+            **self.extra,
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=1)
+
+    def print_metrics(self, file=None):
+        """
+        Prints one line per phase.
+        """
+        print(f"{'phase':<12} {'wall (ms)':>10} {'cpu (ms)':>10} {'peak (KB)':>10} {'count':>14}", file=file)
+        for metrics in self.phases:
+            peak = f"{metrics.peak_bytes / 1024:10.1f}" if metrics.peak_bytes is not None else f"{'-':>10}"
+            count = f"{metrics.count} {metrics.unit}" if metrics.count is not None else ""
+            note = f"  ({metrics.error})" if metrics.error else "  (cached)" if metrics.cached else ""
+            print(f"{metrics.name:<12} {metrics.seconds * 1000:10.3f} {metrics.cpu_seconds * 1000:10.3f} {peak} "
+                  f"{count:>14}{note}", file=file)
+
+
+def phase(instrumentation, name):
+    """
+    Returns instrumentation.phase(name), or a no-op context when instrumentation is None.
+    """
+    return NULL_PHASE if instrumentation is None else instrumentation.phase(name)
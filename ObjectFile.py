@@ -0,0 +1,312 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from VirtualMachine import Bytecode, INSTRUCTION_WIDTH
+
+# Layout of a MiniLang object file (.mlo). All integers are little-endian
+# and every section starts on an 8-byte boundary.
+#
+#   header       HEADER_FORMAT, see below
+#   code         instruction_count * 4 int32 (opcode, a, b, c)
+#   symbols      symbol_count * (string offset u32, string length u32), one per register slot
+#   constants    constant_count * (tag u32, pad u32, 8-byte value)
+#   labels       label_count * (string offset u32, string length u32, instruction index u32, pad u32)
+#   strings      UTF-8 bytes referenced by symbols, labels and big-int constants
+#
+# The header holds the offset and size of every section, so a loader maps
+# the file and reads any part of it in O(1) without scanning the rest.
+MAGIC = b'MLO\x00'
+FORMAT_VERSION = 1
+HEADER_FORMAT = '<4sHHIIIIIIIIIII'
+# magic, version, flags,
+# instruction_count, code_offset, symbol_count, symbol_offset,
+# constant_count, constant_offset, label_count, label_offset,
+# string_offset, string_size, reserved
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+ALIGNMENT = 8
+
+SYMBOL_FORMAT = '<II'
+CONSTANT_FORMAT = '<II8s'
+LABEL_FORMAT = '<IIII'
+SYMBOL_SIZE = struct.calcsize(SYMBOL_FORMAT)
+CONSTANT_SIZE = struct.calcsize(CONSTANT_FORMAT)
+LABEL_SIZE = struct.calcsize(LABEL_FORMAT)
+
+# Constant tags: 64-bit ints and doubles are stored inline, larger ints as decimal text
+CONSTANT_INT, CONSTANT_FLOAT, CONSTANT_BIG_INT = range(3)
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class ObjectFormatError(ValueError):
+    """
+    Raised when a file is not a valid MiniLang object file.
+    """
+
+
+class StringPool:
+    """
+    Collects the strings of an object file; equal strings are stored once.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def add(self, text):
+        """
+        Returns the (offset, length) of a string in the pool.
+        """
+        entry = self.offsets.get(text)
+        if entry is None:
+            encoded = text.encode('utf-8')
+            entry = self.offsets[text] = (len(self.data), len(encoded))
+            self.data += encoded
+        return entry
+
+
+def encode_object(bytecode):
+    """
+    Serializes Bytecode into the bytes of an object file.
+    """
+    strings = StringPool()
+    code = array('i', bytecode.code)
+    if code.itemsize != 4:
+        raise ObjectFormatError("The instruction stream needs 32-bit ints")
+    if sys.byteorder == 'big':
+        code.byteswap()
+    instruction_count = len(code) // INSTRUCTION_WIDTH
+
+    symbols = bytearray()
+    for name in bytecode.names:
+        symbols += struct.pack(SYMBOL_FORMAT, *strings.add(name))
+
+    constants = bytearray()
+    for constant in bytecode.constants:
+        if constant.__class__ is float:
+            constants += struct.pack(CONSTANT_FORMAT, CONSTANT_FLOAT, 0, struct.pack('<d', constant))
+        elif INT64_MIN <= constant <= INT64_MAX:
+            constants += struct.pack(CONSTANT_FORMAT, CONSTANT_INT, 0, struct.pack('<q', constant))
+        else:
+            constants += struct.pack(CONSTANT_FORMAT, CONSTANT_BIG_INT, 0,
+                                     struct.pack('<II', *strings.add(str(constant))))
+
+    labels = bytearray()
+    for label, index in bytecode.labels.items():
+        offset, length = strings.add(label)
+        labels += struct.pack(LABEL_FORMAT, offset, length, index, 0)
+
+    code_offset = _align(HEADER_SIZE)
+    symbol_offset = _align(code_offset + len(code) * 4)
+    constant_offset = _align(symbol_offset + len(symbols))
+    label_offset = _align(constant_offset + len(constants))
+    string_offset = _align(label_offset + len(labels))
+
+    output = bytearray(string_offset + len(strings.data))
+    struct.pack_into(HEADER_FORMAT, output, 0, MAGIC, FORMAT_VERSION, 0,
+                     instruction_count, code_offset, len(bytecode.names), symbol_offset,
+                     len(bytecode.constants), constant_offset, len(bytecode.labels), label_offset,
+                     string_offset, len(strings.data), 0)
+    output[code_offset:code_offset + len(code) * 4] = code.tobytes()
+    output[symbol_offset:symbol_offset + len(symbols)] = symbols
+    output[constant_offset:constant_offset + len(constants)] = constants
+    output[label_offset:label_offset + len(labels)] = labels
+    output[string_offset:] = strings.data
+    return bytes(output)
+
+
+def write_object(bytecode, path):
+    """
+    Writes Bytecode to an object file. The file is written under a
+    temporary name and renamed into place, so readers never see half of it.
+    """
+    data = encode_object(bytecode)
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.unlink(temporary)
+        raise
+    return len(data)
+
+
+class ObjectFile:
+    """
+    A loaded object file. Opening only maps the file and checks the header;
+    the instruction stream is a memoryview over the mapping (no copy), and
+    the symbol, constant and label tables are decoded on first use.
+        with ObjectFile.open('program.mlo') as obj:
+            run_bytecode(obj.bytecode())
+    """
+
+    def __init__(self, buffer, mapping=None, file=None):
+        self.buffer = memoryview(buffer)
+        self.mapping = mapping
+        self.file = file
+        self._code = None
+        self._names = None
+        self._constants = None
+        self._labels = None
+        try:
+            self.read_header()
+        except ObjectFormatError:
+            self.buffer.release()
+            raise
+
+    def read_header(self):
+        """
+        Unpacks the header and checks that every section lies inside the file.
+        """
+        if len(self.buffer) < HEADER_SIZE:
+            raise ObjectFormatError("File too short for a MiniLang object header")
+        (magic, version, self.flags,
+         self.instruction_count, self.code_offset, self.symbol_count, self.symbol_offset,
+         self.constant_count, self.constant_offset, self.label_count, self.label_offset,
+         self.string_offset, self.string_size, _) = struct.unpack_from(HEADER_FORMAT, self.buffer, 0)
+        if magic != MAGIC:
+            raise ObjectFormatError("Not a MiniLang object file")
+        if version != FORMAT_VERSION:
+            raise ObjectFormatError(f"Unsupported object file version {version} (expected {FORMAT_VERSION})")
+        size = len(self.buffer)
+        sections = (
+            (self.code_offset, self.instruction_count * INSTRUCTION_WIDTH * 4),
+            (self.symbol_offset, self.symbol_count * SYMBOL_SIZE),
+            (self.constant_offset, self.constant_count * CONSTANT_SIZE),
+            (self.label_offset, self.label_count * LABEL_SIZE),
+            (self.string_offset, self.string_size),
+        )
+        for offset, length in sections:
+            if offset + length > size:
+                raise ObjectFormatError("Object file is truncated")
+
+    @classmethod
+    def open(cls, path):
+        """
+        Memory-maps an object file read-only.
+        """
+        file = open(path, 'rb')
+        try:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            file.close()
+            raise
+        try:
+            return cls(mapping, mapping, file)
+        except BaseException:
+            mapping.close()
+            file.close()
+            raise
+
+    def close(self):
+        """
+        Unmaps the file. Bytecode obtained from it must not be used afterwards.
+        """
+        if self._code is not None:
+            self._code.release()
+            self._code = None
+        self.buffer.release()
+        if self.mapping is not None:
+            self.mapping.close()
+            self.mapping = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def string(self, offset, length):
+        start = self.string_offset + offset
+        return str(self.buffer[start:start + length], 'utf-8')
+
+    @property
+    def code(self):
+        """
+        The instruction stream as a memoryview of int32, sharing memory with the file.
+        """
+        if self._code is None:
+            end = self.code_offset + self.instruction_count * INSTRUCTION_WIDTH * 4
+            raw = self.buffer[self.code_offset:end]
+            if sys.byteorder == 'big':  # Stored little-endian: a big-endian host needs a swapped copy
+                swapped = array('i', raw.tobytes())
+                swapped.byteswap()
+                self._code = memoryview(swapped)
+            else:
+                self._code = raw.cast('i')
+        return self._code
+
+    def instruction(self, index):
+        """
+        Returns instruction `index` as an (opcode, a, b, c) tuple, reading only those 16 bytes.
+        """
+        return struct.unpack_from('<iiii', self.buffer, self.code_offset + index * INSTRUCTION_WIDTH * 4)
+
+    def symbol(self, slot):
+        """
+        Returns the variable name of a register slot.
+        """
+        offset, length = struct.unpack_from(SYMBOL_FORMAT, self.buffer, self.symbol_offset + slot * SYMBOL_SIZE)
+        return self.string(offset, length)
+
+    @property
+    def names(self):
+        if self._names is None:
+            self._names = [self.symbol(slot) for slot in range(self.symbol_count)]
+        return self._names
+
+    @property
+    def constants(self):
+        if self._constants is None:
+            constants = []
+            for tag, _, value in struct.iter_unpack(CONSTANT_FORMAT, self.buffer[
+                    self.constant_offset:self.constant_offset + self.constant_count * CONSTANT_SIZE]):
+                if tag == CONSTANT_INT:
+                    constants.append(struct.unpack('<q', value)[0])
+                elif tag == CONSTANT_FLOAT:
+                    constants.append(struct.unpack('<d', value)[0])
+                elif tag == CONSTANT_BIG_INT:
+                    constants.append(int(self.string(*struct.unpack('<II', value))))
+                else:
+                    raise ObjectFormatError(f"Unknown constant tag {tag}")
+            self._constants = constants
+        return self._constants
+
+    @property
+    def labels(self):
+        if self._labels is None:
+            labels = {}
+            for offset, length, index, _ in struct.iter_unpack(LABEL_FORMAT, self.buffer[
+                    self.label_offset:self.label_offset + self.label_count * LABEL_SIZE]):
+                labels[self.string(offset, length)] = index
+            self._labels = labels
+        return self._labels
+
+    def bytecode(self):
+        """
+        Returns a Bytecode whose instruction stream is the mapped code section.
+        The ObjectFile must stay open while it is used.
+        """
+        return Bytecode(self.code, self.names, self.constants, self.labels)
+
+
+def load_object(path):
+    """
+    Opens an object file; use it as a context manager or call close().
+    """
+    return ObjectFile.open(path)
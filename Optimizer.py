@@ -1,73 +1,711 @@
+from heapq import heappop, heappush
+from itertools import count
+from time import perf_counter
+
+from ControlFlowGraph import BasicBlock, ControlFlowGraph, Dominators
+from DataFlow import Liveness
+from Peephole import IR_WINDOW, optimize_intermediate_code
+from ICG import (
+    Quad, COPY, LABEL, GOTO, IF_GOTO, PRINT, INPUT, BINARY_OPERATIONS, RELATIONS,
+    is_temporary, temporary_name, temporary_number,
+)
+
+
+def _same_state(state, other):
+    """
+    Compares two constant-propagation states, telling 1 and 1.0 apart.
+    """
+    if len(state) != len(other):
+        return False
+    for var, value in state.items():
+        other_value = other.get(var)
+        if other_value is None or other_value != value or other_value.__class__ is not value.__class__:
+            return False
+    return True
+
+
+# Operators whose operands can be swapped, and the operator a relation becomes when they are
+COMMUTATIVE_OPERATORS = frozenset(('+', '*', '==', '!=', '&&', '||'))
+SWAPPED_RELATIONS = {'<': '>', '>': '<', '<=': '>=', '>=': '<='}
+
+# Upper bound on the rounds of loop optimization (one nesting level per round)
+MAX_LOOP_ROUNDS = 8
+
+# Loop preheaders are labelled %preheader_0, %preheader_1, ...; like the
+# temporaries, the '%' keeps them apart from the labels the ICG makes
+PREHEADER_PREFIX = '%preheader_'
+
+# Passes run at each optimization level, in order, and how many times the
+# pass list may be repeated while it keeps changing the code.
+#   -O0  no optimization
+#   -O1  one sweep of the passes that only look at the CFG and liveness
+#   -O2  every pass, iterated to a fixed point
+OPTIMIZATION_LEVELS = {
+    0: ((), 0),
+    1: (('constant_folding', 'remove_unreachable_code', 'eliminate_dead_code',
+         'peephole_optimization', 'remove_duplicate_labels'), 1),
+    2: (('constant_folding', 'local_value_numbering', 'optimize_loops', 'peephole_optimization',
+         'remove_unreachable_code', 'eliminate_dead_code', 'remove_duplicate_labels'), 10),
+}
+DEFAULT_OPTIMIZATION_LEVEL = 2
+
+
+class PassStatistics:
+    """
+    What one optimization pass cost and what it did, summed over its runs.
+    `removed` is the net number of instructions it deleted (negative if it
+    added code) and `changed` the number of instructions it rewrote or inserted.
+    """
+    __slots__ = ('name', 'runs', 'seconds', 'removed', 'changed')
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = 0
+        self.seconds = 0.0
+        self.removed = 0
+        self.changed = 0
+
+    def __repr__(self):
+        return (f"PassStatistics({self.name!r}, runs={self.runs}, seconds={self.seconds:.6f}, "
+                f"removed={self.removed}, changed={self.changed})")
+
+
+class PassManager:
+    """
+    Runs registered passes over an Optimizer's instruction list. The pass list
+    is repeated until a whole sweep leaves the code unchanged or
+    `max_iterations` sweeps have run. A pass is any callable that rewrites
+    `optimizer.instructions`; its effect is measured by comparing the list
+    before and after, so passes need not report anything themselves.
+    """
+
+    def __init__(self, optimizer, max_iterations=1):
+        self.optimizer = optimizer
+        self.max_iterations = max_iterations
+        self.passes = []  # (name, callable) in run order
+        self.statistics = {}  # name -> PassStatistics
+        self.iterations = 0  # Sweeps made by the last run
+
+    def register(self, name, function=None):
+        """
+        Appends a pass. Without `function` the Optimizer method called `name` is used.
+        """
+        if function is None:
+            function = getattr(self.optimizer, name)
+        self.passes.append((name, function))
+        if name not in self.statistics:
+            self.statistics[name] = PassStatistics(name)
+        return self
+
+    def run(self):
+        """
+        Sweeps the passes to a fixed point (bounded by max_iterations) and
+        returns the final instruction list.
+        """
+        self.iterations = 0
+        while self.iterations < self.max_iterations:
+            self.iterations += 1
+            changed = False
+            for name, function in self.passes:
+                if self.run_pass(name, function):
+                    changed = True
+            if not changed:
+                break
+        return self.optimizer.instructions
+
+    def run_pass(self, name, function):
+        """
+        Runs one pass, records its statistics and returns True if it changed the code.
+        """
+        optimizer = self.optimizer
+        before = optimizer.instructions
+        start = perf_counter()
+        function()
+        seconds = perf_counter() - start
+        after = optimizer.instructions
+
+        statistics = self.statistics[name]
+        statistics.runs += 1
+        statistics.seconds += seconds
+        if after is before:
+            return False
+        old = {id(instruction) for instruction in before}
+        new = 0
+        for instruction in after:
+            if id(instruction) not in old:
+                new += 1
+        statistics.removed += len(before) - len(after)
+        statistics.changed += new
+        if new or len(before) != len(after):
+            return True
+        # Same instructions, possibly moved (e.g. hoisted out of a loop)
+        for old_instruction, new_instruction in zip(before, after):
+            if old_instruction is not new_instruction:
+                return True
+        return False
+
+    def print_statistics(self):
+        """
+        Prints a table with the time and effect of every pass.
+        """
+        print(f"{'pass':<26} {'runs':>5} {'time (ms)':>10} {'removed':>8} {'changed':>8}")
+        for statistics in self.statistics.values():
+            print(f"{statistics.name:<26} {statistics.runs:>5} {statistics.seconds * 1000:>10.3f} "
+                  f"{statistics.removed:>8} {statistics.changed:>8}")
+        print(f"{self.iterations} iteration(s), {len(self.optimizer.instructions)} instructions")
+
+
 class Optimizer:
-    def __init__(self, instructions):
-        self.instructions = instructions
+    def __init__(self, instructions, live_on_exit=None):
+        self.instructions = instructions  # List of ICG.Quad instructions
+        self.live_on_exit = live_on_exit  # Variables observable after the program ends (default: all non-temporaries)
         self.labels = set()  # To track labels that have been used
-        self.label_counter = 0  # For generating new labels if needed
+        self.label_counter = None  # For generating new labels (set on first use)
+        self.temp_counter = None  # For generating new temporaries (set on first use)
+        self.peephole_window = IR_WINDOW  # Instructions the peephole rules look at together
+        self.pass_manager = None  # PassManager of the last optimize() call, with its statistics
 
     def constant_folding(self):
-        optimized_instructions = []
-        for instruction in self.instructions:
-            if ":=" in instruction:
-                var, expr = instruction.split(":=")
-                expr = expr.strip()
-                if expr.isdigit():
-                    optimized_instructions.append(f"{var.strip()} := {expr}")
+        """
+        Sparse conditional constant and copy propagation over the CFG.
+        Each variable maps to a constant, to another variable it is a copy of,
+        or is unknown (absent). Blocks are only analyzed once an executable
+        edge reaches them, and a conditional jump with constant operands only
+        makes its taken edge executable. Afterwards constants and copies are
+        substituted into operands, constant expressions are folded, decided
+        jumps become gotos or disappear, and never-executed blocks are dropped.
+        """
+        cfg = ControlFlowGraph(self.instructions)
+        blocks = cfg.blocks
+        if not blocks:
+            return
+        liveness = Liveness(cfg, self.live_on_exit).solve()
+        rank = [len(blocks)] * len(blocks)
+        for position, index in enumerate(cfg.reverse_postorder()):
+            rank[index] = position
+
+        out_states = [None] * len(blocks)  # None until the block has been executed
+        executable_edges = set()
+        queued = [False] * len(blocks)
+        worklist = [rank[0]]
+        queued[0] = True
+        by_rank = {rank[index]: index for index in range(len(blocks))}
+        while worklist:
+            index = by_rank[heappop(worklist)]
+            queued[index] = False
+            block = blocks[index]
+            state = self._block_entry_state(block, out_states, executable_edges)
+            taken = self._propagate_block(cfg, block, state, None)
+
+            # Only variables live at the block exit can be read later
+            live = liveness.block_out[index]
+            bits = liveness.bits
+            state = {var: value for var, value in state.items() if live & bits.get(var, 0)}
+            changed = out_states[index] is None or not _same_state(state, out_states[index])
+            out_states[index] = state
+            for successor in taken:
+                edge = (index, successor)
+                if edge not in executable_edges:
+                    executable_edges.add(edge)
+                elif not changed:
+                    continue
+                if not queued[successor]:
+                    queued[successor] = True
+                    heappush(worklist, rank[successor])
+
+        # Rewrite executed blocks with the final states; drop the others
+        kept = []
+        for block in blocks:
+            if out_states[block.index] is None:
+                continue
+            state = self._block_entry_state(block, out_states, executable_edges)
+            rewritten = []
+            self._propagate_block(cfg, block, state, rewritten)
+            block.instructions = rewritten
+            kept.append(block)
+        cfg.rebuild(kept)
+        self.instructions = cfg.instructions()
+
+    def _block_entry_state(self, block, out_states, executable_edges):
+        """
+        Meets the states flowing into a block along executable edges: a variable
+        keeps its value only if every executed predecessor agrees on it.
+        """
+        if block.index == 0:
+            return {}  # Nothing is known when the program starts
+        incoming = [out_states[predecessor] for predecessor in block.predecessors
+                    if (predecessor, block.index) in executable_edges and out_states[predecessor] is not None]
+        if not incoming:
+            return {}
+        state = dict(incoming[0])
+        for other in incoming[1:]:
+            for var, value in list(state.items()):
+                other_value = other.get(var)
+                if other_value is None or other_value != value or other_value.__class__ is not value.__class__:
+                    del state[var]
+        return state
+
+    def _propagate_block(self, cfg, block, state, rewritten):
+        """
+        Runs the constant/copy transfer function over one block, updating
+        `state` in place, and returns the successors control can reach.
+        When `rewritten` is a list, the simplified instructions are appended to
+        it; instructions that did not change are appended as they are.
+        """
+        copies = {}  # variable -> variables currently recorded as copies of it
+        for var, value in state.items():
+            if value.__class__ is str:
+                copies.setdefault(value, []).append(var)
+
+        def lookup(operand):
+            if operand.__class__ is not str:
+                return operand
+            value = state.get(operand)
+            return operand if value is None else value
+
+        def kill(var):
+            state.pop(var, None)
+            for copy in copies.pop(var, ()):
+                if state.get(copy) == var:
+                    del state[copy]
+
+        def assign(var, value):
+            kill(var)
+            if value.__class__ is not str or value != var:
+                state[var] = value
+                if value.__class__ is str:
+                    copies.setdefault(value, []).append(var)
+
+        taken = list(block.successors)
+        for instruction in block.instructions:
+            op = instruction.op
+            if op == COPY:
+                value = lookup(instruction.src1)
+                if value.__class__ is str and value == instruction.dst:
+                    continue  # x := x
+                assign(instruction.dst, value)
+                if rewritten is not None:
+                    rewritten.append(instruction if value is instruction.src1 else Quad(COPY, instruction.dst, value))
+            elif op in BINARY_OPERATIONS:
+                left = lookup(instruction.src1)
+                right = lookup(instruction.src2)
+                folded = None
+                if left.__class__ is not str and right.__class__ is not str:
+                    try:
+                        folded = BINARY_OPERATIONS[op](left, right)
+                    except ZeroDivisionError:
+                        pass  # Leave the division for run time
+                if folded is not None:
+                    assign(instruction.dst, folded)
+                    if rewritten is not None:
+                        rewritten.append(Quad(COPY, instruction.dst, folded))
                 else:
-                    optimized_instructions.append(instruction)
+                    kill(instruction.dst)
+                    if rewritten is not None:
+                        if left is instruction.src1 and right is instruction.src2:
+                            rewritten.append(instruction)
+                        else:
+                            rewritten.append(Quad(op, instruction.dst, left, right))
+            elif op == IF_GOTO:
+                left = lookup(instruction.src1)
+                right = lookup(instruction.src2)
+                if left.__class__ is not str and right.__class__ is not str:
+                    if RELATIONS[instruction.relop](left, right):
+                        taken = [cfg.label_blocks[instruction.dst]]
+                        if rewritten is not None:
+                            rewritten.append(Quad(GOTO, instruction.dst))
+                    else:
+                        # Never taken: the jump disappears and control falls through
+                        taken = [block.index + 1] if block.index + 1 < len(cfg.blocks) else []
+                elif rewritten is not None:
+                    if left is instruction.src1 and right is instruction.src2:
+                        rewritten.append(instruction)
+                    else:
+                        rewritten.append(Quad(IF_GOTO, instruction.dst, left, right, instruction.relop))
+            elif op == PRINT:
+                if rewritten is not None:
+                    value = lookup(instruction.src1)
+                    rewritten.append(instruction if value is instruction.src1 else Quad(PRINT, None, value))
+            elif op == INPUT:
+                kill(instruction.dst)
+                if rewritten is not None:
+                    rewritten.append(instruction)
+            elif rewritten is not None:
+                rewritten.append(instruction)
+        return taken
+
+    def local_value_numbering(self):
+        """
+        Hash-based value numbering inside each basic block. Every operand gets
+        a value number; an operation is keyed by (operator, value numbers) with
+        commutative operands and mirrored relations put in a canonical order.
+        A repeated pure expression becomes a copy of the variable that already
+        holds its value, and operands are replaced by the oldest variable (or
+        constant) still holding the same value.
+        """
+        cfg = ControlFlowGraph(self.instructions)
+        changed = False
+        for block in cfg.blocks:
+            if self._number_block(block):
+                changed = True
+        if changed:
+            self.instructions = cfg.instructions()
+
+    def _number_block(self, block):
+        value_numbers = {}  # variable or (type, constant) -> value number
+        expressions = {}  # (operator, value number, value number) -> value number
+        holders = {}  # value number -> variables that were assigned it, oldest first
+        constants = {}  # value number -> constant
+        new_value = count().__next__
+        changed = False
+
+        def number(operand):
+            if operand.__class__ is str:
+                key = operand
             else:
-                optimized_instructions.append(instruction)
-        self.instructions = optimized_instructions
+                key = (operand.__class__, operand)
+            value = value_numbers.get(key)
+            if value is None:
+                value = new_value()
+                value_numbers[key] = value
+                if key is not operand:
+                    constants[value] = operand
+                else:
+                    holders[value] = [operand]
+            return value
 
-    def peephole_optimization(self):
-        optimized_instructions = []
-        skip_next = False
-        for i in range(len(self.instructions) - 1):
-            if skip_next:
-                skip_next = False
-                continue
+        def canonical(operand, value):
+            # The constant or the oldest variable that still holds `value`
+            if value in constants:
+                return constants[value]
+            for holder in holders.get(value, ()):
+                if value_numbers.get(holder) == value:
+                    return holder
+            return operand
 
-            current = self.instructions[i]
-            next_instr = self.instructions[i + 1]
+        def assign(var, value):
+            value_numbers[var] = value
+            holders.setdefault(value, []).append(var)
 
-            # Simplify redundant jumps
-            if "goto" in current and "goto" in next_instr:
-                if current == next_instr:
-                    continue  # Remove redundant goto
+        rewritten = []
+        for instruction in block.instructions:
+            op = instruction.op
+            if op in BINARY_OPERATIONS:
+                left = number(instruction.src1)
+                right = number(instruction.src2)
+                key_op = op
+                if left > right:
+                    if op in COMMUTATIVE_OPERATORS:
+                        left, right = right, left
+                    elif op in SWAPPED_RELATIONS:
+                        key_op = SWAPPED_RELATIONS[op]
+                        left, right = right, left
+                key = (key_op, left, right)
+                value = expressions.get(key)
+                holder = canonical(None, value) if value is not None else None
+                if holder is not None:
+                    # Already computed in this block: reuse it
+                    rewritten.append(Quad(COPY, instruction.dst, holder))
+                    changed = True
+                else:
+                    value = new_value()
+                    expressions[key] = value
+                    src1 = canonical(instruction.src1, number(instruction.src1))
+                    src2 = canonical(instruction.src2, number(instruction.src2))
+                    if src1 is not instruction.src1 or src2 is not instruction.src2:
+                        instruction = Quad(op, instruction.dst, src1, src2)
+                        changed = True
+                    rewritten.append(instruction)
+                assign(instruction.dst, value)
+            elif op == COPY:
+                value = number(instruction.src1)
+                src1 = canonical(instruction.src1, value)
+                if src1 is not instruction.src1:
+                    instruction = Quad(COPY, instruction.dst, src1)
+                    changed = True
+                rewritten.append(instruction)
+                assign(instruction.dst, value)
+            elif op == IF_GOTO or op == PRINT:
+                src1 = canonical(instruction.src1, number(instruction.src1))
+                src2 = instruction.src2
+                if src2 is not None:
+                    src2 = canonical(src2, number(src2))
+                if src1 is not instruction.src1 or src2 is not instruction.src2:
+                    instruction = Quad(op, instruction.dst, src1, src2, instruction.relop)
+                    changed = True
+                rewritten.append(instruction)
+            elif op == INPUT:
+                rewritten.append(instruction)
+                assign(instruction.dst, new_value())  # Unknown until run time
+            else:
+                rewritten.append(instruction)
+        block.instructions = rewritten
+        return changed
 
-            optimized_instructions.append(current)
+    def optimize_loops(self):
+        """
+        Loop-invariant code motion and strength reduction on natural loops
+        (found with dominators on the CFG). Loops are handled innermost
+        first; an outer loop whose inner loop changed is revisited in the
+        next round on a fresh CFG, so invariants bubble out one level per round.
+        """
+        for _ in range(MAX_LOOP_ROUNDS):
+            cfg = ControlFlowGraph(self.instructions)
+            dominators = Dominators(cfg)
+            loops = cfg.natural_loops(dominators)
+            if not loops:
+                return
+            liveness = Liveness(cfg, self.live_on_exit).solve()
+            preheaders = {}  # header block index -> new preheader block
+            changed_blocks = set()
+            for loop in loops:
+                if loop.blocks & changed_blocks:
+                    continue
+                if self._optimize_loop(cfg, dominators, liveness, loop, preheaders):
+                    changed_blocks |= loop.blocks
+            if not changed_blocks:
+                return
+            blocks = []
+            for block in cfg.blocks:
+                preheader = preheaders.get(block.index)
+                if preheader is not None:
+                    blocks.append(preheader)
+                blocks.append(block)
+            cfg.rebuild(blocks)
+            self.instructions = cfg.instructions()
 
-            if i == len(self.instructions) - 2:
-                optimized_instructions.append(next_instr)
+    def _optimize_loop(self, cfg, dominators, liveness, loop, preheaders):
+        blocks = cfg.blocks
+        body = loop.blocks
+        header = loop.header
+        bits = liveness.bits
 
-        self.instructions = optimized_instructions
+        # A block laid out just before the header that falls into it from inside the loop
+        # leaves no place for a preheader
+        if header > 0 and header - 1 in body:
+            last = blocks[header - 1].instructions[-1:]
+            if not last or last[0].op != GOTO:
+                return False
 
-    def eliminate_dead_code(self):
-        optimized_instructions = []
-        used_variables = set()
+        definition_counts = {}
+        for index in body:
+            for instruction in blocks[index].instructions:
+                var = instruction.defines()
+                if var is not None:
+                    definition_counts[var] = definition_counts.get(var, 0) + 1
 
-        # First pass: identify all variables that are used
-        for instruction in self.instructions:
-            if ":=" in instruction:
-                var, _ = instruction.split(":=")
-                used_variables.add(var.strip())
+        # Variables that are read after leaving the loop
+        exit_blocks = []
+        live_after_loop = 0
+        for index in body:
+            block = blocks[index]
+            leaves = block.exits
+            for successor in block.successors:
+                if successor not in body:
+                    leaves = True
+                    live_after_loop |= liveness.block_in[successor]
+            if block.exits:
+                live_after_loop |= liveness.boundary
+            if leaves:
+                exit_blocks.append(index)
+        header_live_in = liveness.block_in[header]
 
-        # Second pass: remove instructions with variables that are not used
-        for instruction in self.instructions:
-            if ":=" in instruction:
-                var, _ = instruction.split(":=")
-                if var.strip() not in used_variables:
+        def is_invariant(operand):
+            return operand.__class__ is not str or operand not in definition_counts or operand in hoisted_vars
+
+        # Loop-invariant code motion
+        hoisted = []
+        hoisted_vars = set()
+        order = sorted(body)
+        found = True
+        while found:
+            found = False
+            for index in order:
+                block = blocks[index]
+                dominates_exits = all(dominators.dominates(index, exit_block) for exit_block in exit_blocks)
+                kept = []
+                for instruction in block.instructions:
+                    op = instruction.op
+                    var = instruction.defines()
+                    if (var is not None and op != INPUT and definition_counts[var] == 1
+                            and is_invariant(instruction.src1)
+                            and (op == COPY or is_invariant(instruction.src2))
+                            and not (op == '/' and (instruction.src2.__class__ is str or instruction.src2 == 0))
+                            and not header_live_in & bits.get(var, 0)
+                            and (dominates_exits or not live_after_loop & bits.get(var, 0))):
+                        hoisted.append(instruction)
+                        hoisted_vars.add(var)
+                        found = True
+                    else:
+                        kept.append(instruction)
+                block.instructions = kept
+
+        # Strength reduction: t := i * k with a basic induction variable i := i +/- c
+        steps = {}  # induction variable -> (block index, instruction, step)
+        for index in order:
+            for instruction in blocks[index].instructions:
+                op = instruction.op
+                var = instruction.dst
+                if (op == '+' or op == '-') and definition_counts.get(var) == 1:
+                    if instruction.src1 == var and instruction.src2.__class__ is int:
+                        steps[var] = (index, instruction, instruction.src2 if op == '+' else -instruction.src2)
+                    elif op == '+' and instruction.src2 == var and instruction.src1.__class__ is int:
+                        steps[var] = (index, instruction, instruction.src1)
+        reduced = {}  # (induction variable, factor) -> running product variable
+        for index in order:
+            block = blocks[index]
+            for position, instruction in enumerate(block.instructions):
+                if instruction.op != '*' or definition_counts.get(instruction.dst) != 1:
                     continue
-            optimized_instructions.append(instruction)
+                if instruction.src1 in steps and instruction.src2.__class__ is int:
+                    induction, factor = instruction.src1, instruction.src2
+                elif instruction.src2 in steps and instruction.src1.__class__ is int:
+                    induction, factor = instruction.src2, instruction.src1
+                else:
+                    continue
+                if instruction.dst == induction:
+                    continue
+                product = reduced.get((induction, factor))
+                if product is None:
+                    product = reduced[(induction, factor)] = self.new_temp()
+                    hoisted.append(Quad('*', product, induction, factor))
+                block.instructions[position] = Quad(COPY, instruction.dst, product)
 
-        self.instructions = optimized_instructions
+        if not hoisted:
+            return False
+        # Keep each running product in step right after its induction variable changes
+        for (induction, factor), product in reduced.items():
+            index, update, step = steps[induction]
+            instructions = blocks[index].instructions
+            position = next(i for i, instruction in enumerate(instructions) if instruction is update)
+            instructions.insert(position + 1, Quad('+', product, product, step * factor))
+
+        self._place_in_preheader(cfg, loop, hoisted, preheaders)
+        return True
+
+    def _place_in_preheader(self, cfg, loop, instructions, preheaders):
+        """
+        Puts instructions where they run once before the loop: at the end of the
+        single outside predecessor that only leads to the header, or else in a
+        new labelled block laid out just before the header that every entry
+        edge is redirected to.
+        """
+        blocks = cfg.blocks
+        header = loop.header
+        outside = [index for index in blocks[header].predecessors if index not in loop.blocks]
+        if header in preheaders:
+            preheaders[header].instructions.extend(instructions)
+            return
+        if (len(outside) == 1 and header != 0 and blocks[outside[0]].successors == [header]
+                and blocks[outside[0]].instructions[-1].op != IF_GOTO):
+            target = blocks[outside[0]].instructions
+            if target and target[-1].op == GOTO:
+                target[-1:-1] = instructions
+            else:
+                target.extend(instructions)
+            return
+
+        label = self.new_label()
+        preheader = BasicBlock(-1)
+        preheader.instructions = [Quad(LABEL, label)] + instructions
+        preheaders[header] = preheader
+        header_labels = set(blocks[header].labels())
+        for index in outside:
+            jumps = blocks[index].instructions
+            last = jumps[-1] if jumps else None
+            if last is not None and (last.op == GOTO or last.op == IF_GOTO) and last.dst in header_labels:
+                jumps[-1] = Quad(last.op, label, last.src1, last.src2, last.relop)
+
+    def new_label(self):
+        """
+        Generates a preheader label numbered after every preheader already in
+        the code, so optimizing code a second time never reuses one.
+        """
+        if self.label_counter is None:
+            self.label_counter = 0
+            for instruction in self.instructions:
+                label = instruction.dst
+                if instruction.op == LABEL and label.startswith(PREHEADER_PREFIX):
+                    self.label_counter = max(self.label_counter, int(label[len(PREHEADER_PREFIX):]) + 1)
+        label = f"{PREHEADER_PREFIX}{self.label_counter}"
+        self.label_counter += 1
+        return label
+
+    def new_temp(self):
+        """
+        Generates a temporary numbered after every temporary already in the code.
+        """
+        if self.temp_counter is None:
+            self.temp_counter = 0
+            for instruction in self.instructions:
+                var = instruction.defines()
+                if var is not None and is_temporary(var):
+                    self.temp_counter = max(self.temp_counter, temporary_number(var) + 1)
+        temp = temporary_name(self.temp_counter)
+        self.temp_counter += 1
+        return temp
+
+    def peephole_optimization(self):
+        """
+        Rewrites short instruction sequences with the rules of Peephole.IR_RULES
+        (jump threading, jumps to the next instruction, code after a goto,
+        branch inversion and algebraic identities), then drops the labels no
+        jump refers to any more so that their blocks can merge.
+        """
+        instructions = optimize_intermediate_code(self.instructions, self.peephole_window)
+        referenced = set()
+        for instruction in instructions:
+            if instruction.op == GOTO or instruction.op == IF_GOTO:
+                referenced.add(instruction.dst)
+        self.instructions = [instruction for instruction in instructions
+                             if instruction.op != LABEL or instruction.dst in referenced]
+
+    def remove_unreachable_code(self):
+        """
+        Removes basic blocks that cannot be reached from the program entry.
+        """
+        cfg = ControlFlowGraph(self.instructions)
+        if cfg.remove_unreachable_blocks():
+            self.instructions = cfg.instructions()
+
+    def eliminate_dead_code(self):
+        """
+        Removes assignments whose value is never read (dead stores), using
+        live-variable analysis over the CFG. Deleting one store can make the
+        stores feeding it dead, so the analysis is repeated until nothing changes.
+        """
+        while True:
+            cfg = ControlFlowGraph(self.instructions)
+            liveness = Liveness(cfg, self.live_on_exit).solve()
+            bits = liveness.bits
+            removed = 0
+            for block in cfg.blocks:
+                live = liveness.block_out[block.index]
+                kept = []
+                for instruction in reversed(block.instructions):
+                    var = instruction.defines()
+                    if var is not None:
+                        mask = bits[var]
+                        if not live & mask and instruction.op != INPUT:  # Reading input is a side effect
+                            removed += 1
+                            continue  # Nothing reads this value
+                        live &= ~mask
+                    for used in instruction.uses():
+                        live |= bits[used]
+                    kept.append(instruction)
+                kept.reverse()
+                block.instructions = kept
+            if not removed:
+                return
+            self.instructions = cfg.instructions()
 
     def remove_duplicate_labels(self):
         optimized_instructions = []
         seen_labels = set()
 
         for instruction in self.instructions:
-            if ":" in instruction:  # It is a label
-                label = instruction.split(":")[0]
+            if instruction.op == LABEL:
+                label = instruction.dst
                 if label in seen_labels:
                     continue  # Skip this label if it was already used
                 seen_labels.add(label)
@@ -76,9 +714,18 @@ class Optimizer:
 
         self.instructions = optimized_instructions
 
-    def optimize(self):
-        self.constant_folding()
-        self.peephole_optimization()
-        self.eliminate_dead_code()
-        self.remove_duplicate_labels()
-        return self.instructions  # Explicitly return the optimized code
+    def optimize(self, level=DEFAULT_OPTIMIZATION_LEVEL, max_iterations=None):
+        """
+        Runs the passes of an optimization level (see OPTIMIZATION_LEVELS) and
+        returns the optimized code. `max_iterations` overrides the level's cap
+        on fixed-point sweeps. Per-pass statistics are kept in self.pass_manager.
+        """
+        if level not in OPTIMIZATION_LEVELS:
+            raise ValueError(f"Unknown optimization level {level}")
+        passes, iterations = OPTIMIZATION_LEVELS[level]
+        if max_iterations is not None:
+            iterations = max_iterations
+        self.pass_manager = PassManager(self, iterations)
+        for name in passes:
+            self.pass_manager.register(name)
+        return self.pass_manager.run()  # Explicitly return the optimized code
@@ -1,131 +1,107 @@
-from lexer import lexer
-from collections import namedtuple
-from graphviz import Digraph
+import os
+from Parser_2 import NODE_TYPE_NAMES, N_BINARY
 
+# graphviz is only imported by render_parse_tree, so compiling
+# without a visualization never loads it. write_dot needs no graphviz at all.
 
-# Wrapper class for lexer to implement token() method
-class LexerWrapper:
-    def __init__(self, code):
-        self.lexer_gen = lexer(code)  # Generator from lexer function
+# Output formats render_parse_tree hands to Graphviz; anything else is written as DOT text
+RENDERED_FORMATS = ('png', 'svg', 'pdf')
 
-    def token(self):
-        try:
-            return next(self.lexer_gen)
-        except StopIteration:
-            return None  # Return None when there are no more tokens
 
+def node_label(tree, node):
+    value = tree.values[node]
+    if tree.kinds[node] == N_BINARY:
+        return value  # Operators are their own node type
+    name = NODE_TYPE_NAMES[tree.kinds[node]]
+    return name if value is None else f"{name}: {value}"
 
-def generate_sorted_parse_tree(tokens):
 
-    dot = Digraph()
+def dot_string(text):
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
 
-    # Helper to generate unique node names
-    counter = 0
 
-    def unique_node(label):
-        nonlocal counter
-        counter += 1
-        return f"{label}_{counter}"
-
-    # Root node
-    root_node = unique_node("Root")
-    dot.node(root_node, "Root")
-
-    # Separate tokens into sections
-    declarations = []
-    assignments = []
-    operations = []
-
-    for token in tokens:
-        if token[0] == "KEYWORD" and token[1] == "var":
-            declarations.append(token)
-        elif token[0] in {"ID", "ASSIGN", "NUMBER"}:
-            assignments.append(token)
-        elif token[0] in {"ID", "OPERATOR", "NUMBER"}:
-            operations.append(token)
-
-    # Add Declarations to the tree
-    declare_node = unique_node("Declarations")
-    dot.node(declare_node, "Declarations")
-    dot.edge(root_node, declare_node)
-
-    for token in declarations:
-        if token[0] == "KEYWORD" and token[1] == "var":
-            var_node = unique_node(f"Declare_{token[1]}")
-            dot.node(var_node, f"Declare: {token[1]}")
-            dot.edge(declare_node, var_node)
-
-    # Add Assignments to the tree
-    assign_node = unique_node("Assignments")
-    dot.node(assign_node, "Assignments")
-    dot.edge(root_node, assign_node)
-
-    for token in assignments:
-        if token[0] == "ID":
-            id_node = unique_node(f"ID_{token[1]}")
-            dot.node(id_node, f"ID: {token[1]}")
-            dot.edge(assign_node, id_node)
-        elif token[0] == "ASSIGN":
-            assign_op_node = unique_node("AssignOp")
-            dot.node(assign_op_node, "Assign Operation")
-            dot.edge(assign_node, assign_op_node)
-        elif token[0] == "NUMBER":
-            num_node = unique_node(f"Num_{token[1]}")
-            dot.node(num_node, f"Number: {token[1]}")
-            dot.edge(assign_node, num_node)
-
-    # Add Operations to the tree
-    operations_node = unique_node("Operations")
-    dot.node(operations_node, "Operations")
-    dot.edge(root_node, operations_node)
-
-    for token in operations:
-        if token[0] == "ID":
-            id_node = unique_node(f"ID_{token[1]}")
-            dot.node(id_node, f"ID: {token[1]}")
-            dot.edge(operations_node, id_node)
-        elif token[0] == "OPERATOR":
-            operator_node = unique_node(f"Operator_{token[1]}")
-            dot.node(operator_node, f"Operator: {token[1]}")
-            dot.edge(operations_node, operator_node)
-        elif token[0] == "NUMBER":
-            num_node = unique_node(f"Num_{token[1]}")
-            dot.node(num_node, f"Number: {token[1]}")
-            dot.edge(operations_node, num_node)
-
-    # Generate the sorted parse tree
-    dot.render("sorted_parse_tree", format="png", cleanup=True)
-    print("Sorted parse tree generated as sorted_parse_tree.png")
-
-
-def main():
-    code = """
-    var a;
-    var b;
-    a=5;
-    b=10;
-    if a == 5 {
-        print a;
-    } else {
-        while b < 10 {
-            print b;
-            b = b + 1;
-        }
-    }
+def subtree_size(tree, node):
     """
+    Counts the nodes of a subtree.
+    """
+    first_child = tree.first_child
+    next_sibling = tree.next_sibling
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        child = first_child[node]
+        while child != -1:
+            stack.append(child)
+            child = next_sibling[child]
+    return count
+
+
+def write_dot(root, file, max_depth=None, max_children=None):
+    """
+    Writes the syntax tree under `root` (a Parser_2.Node) to `file` as
+    Graphviz DOT, one line per node or edge as the tree is walked, so no
+    graph is ever held in memory. Large trees can be trimmed: nodes at
+    `max_depth` show their whole subtree as one "... N nodes" node, and
+    after `max_children` children of a node the rest are collapsed into one
+    "... N more" node. Returns the number of tree nodes written.
+    """
+    tree = root.tree
+    first_child = tree.first_child
+    next_sibling = tree.next_sibling
+    write = file.write
+    write("digraph AST {\n")
+    written = 0
+    collapsed = 0
+    stack = [(root.id, None, 0)]  # (node id, parent DOT name, depth)
+    while stack:
+        node, parent, depth = stack.pop()
+        name = f"n{node}"
+        write(f"  {name} [label={dot_string(node_label(tree, node))}];\n")
+        if parent is not None:
+            write(f"  {parent} -> {name};\n")
+        written += 1
+
+        children = []
+        child = first_child[node]
+        while child != -1:
+            children.append(child)
+            child = next_sibling[child]
+        if not children:
+            continue
+        if max_depth is not None and depth >= max_depth:
+            hidden = subtree_size(tree, node) - 1
+            collapsed += 1
+            write(f"  c{collapsed} [label=\"... {hidden} nodes\", shape=box, style=dashed];\n")
+            write(f"  {name} -> c{collapsed};\n")
+            continue
+        if max_children is not None and len(children) > max_children:
+            collapsed += 1
+            write(f"  c{collapsed} [label=\"... {len(children) - max_children} more\", shape=box, style=dashed];\n")
+            write(f"  {name} -> c{collapsed};\n")
+            children = children[:max_children]
+        for child in reversed(children):
+            stack.append((child, name, depth + 1))
+    write("}\n")
+    return written
+
+
+def render_parse_tree(root, path, max_depth=None, max_children=None):
+    """
+    Writes the syntax tree to `path`. A .png, .svg or .pdf path is rendered
+    with Graphviz (imported here) from a streamed DOT file; any other path
+    gets the DOT text itself. Returns the path written.
+    """
+    base, extension = os.path.splitext(path)
+    output_format = extension[1:].lower()
+    dot_path = base + ".dot" if output_format in RENDERED_FORMATS else path
+    with open(dot_path, 'w') as file:
+        write_dot(root, file, max_depth, max_children)
+    if output_format in RENDERED_FORMATS:
+        from graphviz import render
+        rendered = render('dot', output_format, dot_path)
+        os.replace(rendered, path)
+        os.unlink(dot_path)
+    return path
 
-    # Use LexerWrapper to get tokens
-    lexer_wrapper = LexerWrapper(code)
-    tokens = []
-    token = lexer_wrapper.token()
-    while token:
-        tokens.append((token.type, token.value))
-        token = lexer_wrapper.token()
-
-    print("\nTokens: ", tokens)  # Cleaner token output
-
-    generate_sorted_parse_tree(tokens)
-
-
-if __name__ == "__main__":
-    main()
@@ -1,202 +1,539 @@
-from graphviz import Digraph
-from lexer import lexer
+from array import array
+from lexer import (
+    Diagnostic, lexer, kind_name, ID, NUMBER, VAR, INT, FLOAT, IF, ELSE, WHILE, PRINT, INPUT, ASSIGN, PLUS, MINUS, STAR, SLASH,
+    LT, GT, LE, GE, EQ, NE, AND, OR, SEMI, LPAREN, RPAREN, LBRACE, RBRACE, EOF, ILLEGAL,
+)
+
+# AST node kinds
+(N_PROGRAM, N_BLOCK, N_VAR_DECL, N_ASSIGN, N_IF, N_WHILE, N_PRINT,
+ N_NUMBER, N_ID, N_BINARY, N_INPUT) = range(11)
+
+NODE_TYPE_NAMES = ['program', 'block', 'var_decl', 'assign', 'if', 'while', 'print',
+                   'number', 'id', 'binary', 'input']
+
+# Value types. T_NUMBER is a value that may be an int or a float at run time
+# (anything read by `input` into an untyped variable).
+T_UNKNOWN, T_INT, T_FLOAT, T_NUMBER = range(4)
+
+TYPE_NAMES = ['unknown', 'int', 'float', 'number']
+
+# Declaration keyword -> declared type, and back
+DECLARED_TYPES = {VAR: T_UNKNOWN, INT: T_INT, FLOAT: T_FLOAT}
+DECLARATION_KEYWORDS = ['var', 'int', 'float']
+
+
+class AST:
+    """
+    Struct-of-arrays storage for a syntax tree. Every node is an integer id
+    indexing parallel arrays; children are chained through first_child/next_sibling.
+    Leaf values (numbers, names, operators) are stored inline in `values`:
+      var_decl: value = variable name, type = declared type (T_UNKNOWN for 'var')
+      assign:   value = variable name, children = [expr]
+      if:       children = [condition, then_block] or [condition, then_block, else_block]
+      while:    children = [condition, body_block]
+      print:    children = [expr]
+      input:    value = variable name
+      program/block: children = statements
+      number/id: value = lexeme
+      binary:   value = operator, children = [left, right]
+    Children are always created before their parent.
+    `types` holds a T_* value type per node; the parser only sets the
+    declared types, the semantic analyzer fills in the rest. The analyzer
+    also resolves every var_decl, assign, input and id node to a symbol
+    slot in `slots` (-1 for none), and `slot_names` gives the name the
+    generated code uses for each slot; both are None until it has run.
+    """
+    __slots__ = ('kinds', 'values', 'first_child', 'next_sibling', 'lines', 'columns', 'types', 'slots',
+                 'slot_names', 'root')
+
+    def __init__(self):
+        self.kinds = array('B')
+        self.values = []
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.lines = array('i')
+        self.columns = array('i')
+        self.types = array('B')
+        self.slots = None
+        self.slot_names = None
+        self.root = -1
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def add(self, kind, value=None, children=(), line=0, column=0):
+        """ Appends a node and links its (already created) children; returns the node id. """
+        node = len(self.kinds)
+        self.kinds.append(kind)
+        self.values.append(value)
+        self.next_sibling.append(-1)
+        self.lines.append(line)
+        self.columns.append(column)
+        self.types.append(T_UNKNOWN)
+        if children:
+            self.first_child.append(children[0])
+            next_sibling = self.next_sibling
+            for i in range(len(children) - 1):
+                next_sibling[children[i]] = children[i + 1]
+        else:
+            self.first_child.append(-1)
+        return node
+
+    def children(self, node):
+        """ Returns the list of child ids of a node. """
+        result = []
+        child = self.first_child[node]
+        next_sibling = self.next_sibling
+        while child != -1:
+            result.append(child)
+            child = next_sibling[child]
+        return result
+
+    def node(self, node):
+        """ Returns a Node view of a node id. """
+        return Node(self, node)
+
 
 # AST Node
 class Node:
-    def __init__(self, node_type, children=None, value=None):
-        self.node_type = node_type
-        self.value = value
-        self.children = children or []
+    """
+    Lightweight view of one node stored in an AST arena.
+    """
+    __slots__ = ('tree', 'id')
+
+    def __init__(self, tree, node_id):
+        self.tree = tree
+        self.id = node_id
+
+    @property
+    def kind(self):
+        return self.tree.kinds[self.id]
+
+    @property
+    def node_type(self):
+        kind = self.tree.kinds[self.id]
+        if kind == N_BINARY:
+            return self.tree.values[self.id]  # Operators are their own node type
+        return NODE_TYPE_NAMES[kind]
+
+    @property
+    def value(self):
+        return self.tree.values[self.id]
+
+    @property
+    def line(self):
+        return self.tree.lines[self.id]
+
+    @property
+    def children(self):
+        tree = self.tree
+        return [Node(tree, child) for child in tree.children(self.id)]
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and other.tree is self.tree and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
 
     def __str__(self):
         return f"{self.node_type}: {self.value or ''}"
 
-    def add_child(self, child):
-        self.children.append(child)
-
     def render(self, graph=None, parent_name=None):
+        """ Adds this subtree to a Graphviz graph (importing graphviz on first use), walking it with an explicit stack. """
         if graph is None:
+            from graphviz import Digraph
             graph = Digraph('AST')
-        # Create a node for the current node
-        node_name = f"{id(self)}"
-        graph.node(node_name, label=self.node_type)
-        # Create edges to its children
-        if parent_name:
-            graph.edge(parent_name, node_name)
-        for child in self.children:
-            child.render(graph, node_name)
+        tree = self.tree
+        kinds = tree.kinds
+        values = tree.values
+        stack = [(self.id, parent_name)]
+        while stack:
+            node, parent = stack.pop()
+            # Create a node for the current node
+            node_name = f"{node}"
+            node_type = Node(tree, node).node_type
+            value = values[node]
+            label = node_type if value is None or kinds[node] == N_BINARY else f"{node_type}: {value}"
+            graph.node(node_name, label=label)
+            # Create edges to its children
+            if parent:
+                graph.edge(parent, node_name)
+            for child in reversed(tree.children(node)):
+                stack.append((child, node_name))
         return graph
 
     def generate_code(self):
-        """ Recursively generates code from the AST. """
-        if self.node_type == 'var_decl':
-            return f"var {self.children[0].value};"
-        elif self.node_type == 'assign':
-            var_name = self.children[0].value
-            expr_code = self.children[1].generate_code()
-            return f"{var_name} = {expr_code};"
-        elif self.node_type == 'number':
-            return str(self.value)
-        elif self.node_type == 'id':
-            return self.value
-        elif self.node_type == 'if':
-            condition_code = self.children[0].generate_code()
-            then_code = "\n".join([stmt.generate_code() for stmt in self.children[1]])
-            if len(self.children) > 2:
-                else_code = "\n".join([stmt.generate_code() for stmt in self.children[2]])
-                return f"if ({condition_code}) {{\n{then_code}\n}} else {{\n{else_code}\n}}"
-            return f"if ({condition_code}) {{\n{then_code}\n}}"
-        elif self.node_type == 'while':
-            condition_code = self.children[0].generate_code()
-            body_code = "\n".join([stmt.generate_code() for stmt in self.children[1]])
-            return f"while ({condition_code}) {{\n{body_code}\n}}"
-        elif self.node_type == 'function_def':
-            func_name = self.children[0].value
-            params_code = ", ".join([param.value for param in self.children[1].children])
-            body_code = "\n".join([stmt.generate_code() for stmt in self.children[2]])
-            return f"function {func_name}({params_code}) {{\n{body_code}\n}}"
-        elif self.node_type == 'function_call':
-            func_name = self.children[0].value
-            args_code = ", ".join([arg.generate_code() for arg in self.children[1:]])
-            return f"{func_name}({args_code})"
-        elif self.node_type == 'print' or self.node_type == 'input':
-            expr_code = self.children[0].generate_code()
-            return f"{self.node_type}({expr_code});"
-        elif self.node_type in {'+', '-', '*', '/', '>', '<', '==', '!='}:
-            left_code = self.children[0].generate_code()
-            right_code = self.children[1].generate_code()
-            return f"({left_code} {self.node_type} {right_code})"
-        else:
-            raise ValueError(f"Unknown node type: {self.node_type}")
+        """
+        Generates source code from the AST. Pending work is kept on an explicit
+        stack of strings and node ids, so arbitrarily deep trees are handled in
+        linear time without recursion.
+        """
+        tree = self.tree
+        kinds = tree.kinds
+        values = tree.values
+        out = []
+        stack = [self.id]
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                out.append(item)
+                continue
+            kind = kinds[item]
+            value = values[item]
+            children = tree.children(item)
+            if kind == N_BINARY:
+                parts = ["(", children[0], f" {value} ", children[1], ")"]
+            elif kind == N_NUMBER or kind == N_ID:
+                out.append(value)
+                continue
+            elif kind == N_ASSIGN:
+                parts = [value, " = ", children[0], ";"]
+            elif kind == N_VAR_DECL:
+                parts = [f"{DECLARATION_KEYWORDS[tree.types[item]]} {value};"]
+            elif kind == N_PROGRAM or kind == N_BLOCK:
+                parts = []
+                for stmt in children:
+                    if parts:
+                        parts.append("\n")
+                    parts.append(stmt)
+            elif kind == N_IF:
+                parts = ["if (", children[0], ") {\n", children[1], "\n}"]
+                if len(children) > 2:
+                    parts += [" else {\n", children[2], "\n}"]
+            elif kind == N_WHILE:
+                parts = ["while (", children[0], ") {\n", children[1], "\n}"]
+            elif kind == N_PRINT:
+                parts = ["print(", children[0], ");"]
+            elif kind == N_INPUT:
+                parts = [f"input({value});"]
+            else:
+                raise ValueError(f"Unknown node type: {NODE_TYPE_NAMES[kind]}")
+            stack.extend(reversed(parts))
+        return "".join(out)
+
+
+# Binary operator table: token kind -> (operator, precedence). All operators are left-associative.
+BINARY_OPERATORS = {
+    OR: ('||', 1),
+    AND: ('&&', 2),
+    EQ: ('==', 3), NE: ('!=', 3),
+    LT: ('<', 4), GT: ('>', 4), LE: ('<=', 4), GE: ('>=', 4),
+    PLUS: ('+', 5), MINUS: ('-', 5),
+    STAR: ('*', 6), SLASH: ('/', 6),
+}
+
+
+class ParseError(SyntaxError):
+    """
+    Raised for a program with syntax errors. `diagnostics` lists every error
+    found and `root` is the partial tree (see Parser.parse_program).
+    """
+
+    def __init__(self, diagnostics, root=None):
+        self.diagnostics = diagnostics
+        self.root = root
+        more = f" (and {len(diagnostics) - 1} more)" if len(diagnostics) > 1 else ""
+        super().__init__(f"{diagnostics[0]}{more}")
+
 
 class Parser:
     def __init__(self, tokens):
         self.tokens = iter(tokens)
         self.current_token = None
+        self.current_kind = EOF
+        self.last_token = None  # The final token, once the input is exhausted
+        self.errors = []  # Diagnostics of the syntax errors found so far
+        self.ast = AST()
+        # Statement dispatch table: token kind -> parse method
+        self.statement_parsers = {
+            VAR: self.parse_var_decl,
+            INT: self.parse_var_decl,
+            FLOAT: self.parse_var_decl,
+            ID: self.parse_assignment,
+            IF: self.parse_if_stmt,
+            WHILE: self.parse_while_stmt,
+            PRINT: self.parse_io_stmt,
+            INPUT: self.parse_io_stmt,
+        }
         self.next_token()
 
     def next_token(self):
         try:
             self.current_token = next(self.tokens)
+            self.current_kind = self.current_token.type
         except StopIteration:
+            if self.current_token is not None:
+                self.last_token = self.current_token
             self.current_token = None
+            self.current_kind = EOF
 
-    def expect(self, token_type, value=None):
-        if self.current_token and self.current_token.type == token_type and (value is None or self.current_token.value == value):
+    def expect(self, kind):
+        if self.current_kind == kind:
             token_value = self.current_token.value
             self.next_token()
             return token_value
-        raise SyntaxError(f"Expected {token_type} {value or ''}, got {self.current_token}")
+        raise self.syntax_error(f"Expected {kind_name(kind)}, got {self.describe_current()}")
+
+    def describe_current(self):
+        """ Formats the current token for error messages. """
+        token = self.current_token
+        if token is None:
+            return "end of input"
+        return f"{kind_name(token.type)} {token.value!r}"
 
-    def parse_program(self):
-        return self.parse_stmt_list()
+    def diagnostic(self, message):
+        """ Returns an error Diagnostic at the current token (just after the last one at the end of input). """
+        token = self.current_token
+        if token is None:
+            token = self.last_token
+            if token is None:
+                return Diagnostic('error', message, 1, 1)
+            return Diagnostic('error', message, token.line, token.column + len(token.value))
+        if token.type == ILLEGAL:
+            message = f"Illegal character {token.value!r}"
+        return Diagnostic('error', message, token.line, token.column)
+
+    def syntax_error(self, message):
+        """ Returns a ParseError for `message` at the current token, for the caller to raise. """
+        return ParseError([self.diagnostic(message)])
+
+    def synchronize(self):
+        """
+        Panic-mode recovery after a syntax error: skips the rest of the
+        statement, up to and including the next ';' or the '}' closing a
+        block opened while skipping (and an 'else' block after it). Stops
+        before a '}' that closes the enclosing block. Illegal characters
+        skipped on the way are reported as well.
+        """
+        error_token = self.current_token
+        depth = 0
+        kind = self.current_kind
+        while kind != EOF:
+            if kind == RBRACE:
+                if depth == 0:
+                    return
+                depth -= 1
+                self.next_token()
+                kind = self.current_kind
+                if depth == 0 and kind != ELSE:
+                    return
+                continue
+            if kind == SEMI and depth == 0:
+                self.next_token()
+                return
+            if kind == LBRACE:
+                depth += 1
+            elif kind == ILLEGAL and self.current_token is not error_token:
+                self.errors.append(self.diagnostic(f"Illegal character {self.current_token.value!r}"))
+            self.next_token()
+            kind = self.current_kind
+
+    def position(self):
+        """ Returns the (line, column) of the current token. """
+        token = self.current_token
+        if token is None:
+            return 0, 0
+        return token.line, token.column
+
+    def parse_program(self, partial=False):
+        """
+        Parses the whole token stream and returns the root 'program' Node.
+        A syntax error does not stop the parser: it is recorded in `errors`,
+        the rest of the statement is skipped (see synchronize()) and parsing
+        goes on, so one run finds every error. Statements with errors are
+        left out of the tree. If there were any, ParseError is raised with
+        all of them and the partial tree, unless `partial` is set; then the
+        partial tree is returned and the errors are only in `errors`.
+        """
+        stmts = self.parse_stmt_list()
+        while self.current_kind != EOF:  # A '}' without a matching '{'
+            self.errors.append(self.diagnostic(f"Unexpected token: {self.describe_current()}"))
+            self.next_token()
+            stmts += self.parse_stmt_list()
+        self.ast.root = self.ast.add(N_PROGRAM, None, stmts, 1, 1)
+        root = self.ast.node(self.ast.root)
+        if self.errors and not partial:
+            raise ParseError(self.errors, root)
+        return root
 
     def parse_stmt_list(self):
-        stmts = []
-        while self.current_token and (self.current_token.type != 'DELIM' or self.current_token.value != '}'):
-            stmts.append(self.parse_stmt())
-        return stmts
+        """
+        Parses statements up to the end of input or a '}' without a matching
+        '{', and returns the top-level ones. Blocks are kept on an explicit
+        stack of open blocks instead of being parsed recursively, so nesting
+        depth is limited only by memory. A statement with a syntax error is
+        recorded in `errors`, skipped (see synchronize()) and left out.
+        """
+        ast = self.ast
+        # Open blocks, outermost (the top-level statements) first: (statements, pending statement)
+        # The pending statement is the if/while waiting for the block:
+        #   [kind, line, column, condition, block line, block column (, then block)]
+        frames = [([], None)]
+        while True:
+            kind = self.current_kind
+            if kind == EOF or kind == RBRACE:
+                if len(frames) == 1:
+                    return frames[0][0]
+                if kind == EOF:
+                    # Statements in unclosed blocks are dropped along with them
+                    self.errors.append(self.diagnostic(f"Expected }}, got {self.describe_current()}"))
+                    return frames[0][0]
+                statements, pending = frames.pop()
+                self.next_token()
+                kind, line, column, condition, block_line, block_column = pending[:6]
+                block = ast.add(N_BLOCK, None, statements, block_line, block_column)
+                if kind == N_WHILE:
+                    node = ast.add(N_WHILE, None, (condition, block), line, column)
+                elif len(pending) == 7:
+                    node = ast.add(N_IF, None, (condition, pending[6], block), line, column)
+                elif self.current_kind == ELSE:
+                    self.next_token()
+                    block_line, block_column = self.position()
+                    if self.current_kind != LBRACE:
+                        self.errors.append(self.diagnostic(f"Expected {{, got {self.describe_current()}"))
+                        self.synchronize()
+                        continue
+                    self.next_token()
+                    frames.append(([], [N_IF, line, column, condition, block_line, block_column, block]))
+                    continue
+                else:
+                    node = ast.add(N_IF, None, (condition, block), line, column)
+                frames[-1][0].append(node)
+                continue
+            try:
+                statement = self.parse_stmt()
+            except ParseError as e:
+                self.errors += e.diagnostics
+                self.synchronize()
+                continue
+            if statement.__class__ is int:
+                frames[-1][0].append(statement)
+            else:
+                frames.append(([], statement))
 
     def parse_stmt(self):
-        if self.current_token.type == 'KEYWORD' and self.current_token.value == 'var':
-            return self.parse_var_decl()
-        elif self.current_token.type == 'ID':
-            return self.parse_assignment_or_call()
-        elif self.current_token.type == 'KEYWORD' and self.current_token.value == 'if':
-            return self.parse_if_stmt()
-        elif self.current_token.type == 'KEYWORD' and self.current_token.value == 'while':
-            return self.parse_while_stmt()
-        elif self.current_token.type == 'KEYWORD' and self.current_token.value == 'print':
-            return self.parse_io_stmt()
-        else:
-            raise SyntaxError(f"Unexpected token: {self.current_token}")
+        """
+        Parses one statement and returns its node id; for 'if' and 'while'
+        only the head up to the opening '{' is parsed, and the pending
+        statement is returned for parse_stmt_list() to finish.
+        """
+        parse = self.statement_parsers.get(self.current_kind)
+        if parse is None:
+            raise self.syntax_error(f"Unexpected token: {self.describe_current()}")
+        return parse()
 
     def parse_var_decl(self):
-        """ Parses a variable declaration like 'var x;' """
-        self.expect('KEYWORD', 'var')
-        var_name = self.expect('ID')
-        self.expect('DELIM', ';')
-        return Node("var_decl", [Node("id", [Node(var_name)])])
-
-    def parse_assignment_or_call(self):
-        id_name = self.expect('ID')
-        if self.current_token.type == 'ASSIGN':
+        """ Parses a variable declaration like 'var x;', 'int x;' or 'float x;' """
+        line, column = self.position()
+        declared_type = DECLARED_TYPES[self.current_kind]
+        self.next_token()
+        var_name = self.expect(ID)
+        self.expect(SEMI)
+        node = self.ast.add(N_VAR_DECL, var_name, (), line, column)
+        self.ast.types[node] = declared_type
+        return node
+
+    def parse_assignment(self):
+        line, column = self.position()
+        id_name = self.expect(ID)
+        if self.current_kind == ASSIGN:
             self.next_token()
             expr = self.parse_expr()
-            self.expect('DELIM', ';')
-            return Node("assign", [Node("id", [Node(id_name)]), expr])
-        elif self.current_token.type == 'DELIM' and self.current_token.value == '(':
-            return self.parse_function_call(Node(id_name))
+            self.expect(SEMI)
+            return self.ast.add(N_ASSIGN, id_name, (expr,), line, column)
         else:
-            raise SyntaxError(f"Unexpected token: {self.current_token}")
+            raise self.syntax_error(f"Unexpected token: {self.describe_current()}")
 
     def parse_expr(self):
-        left = self.parse_term()
-        while self.current_token and self.current_token.type == 'OPERATOR' and self.current_token.value in ('+', '-', '*', '/', '>', '<', '==', '!='):
-            operator = self.current_token.value
-            self.next_token()
-            right = self.parse_term()
-            left = Node(operator, [left, right])
-        return left
-
-    def parse_term(self):
-        factor = self.parse_factor()
-        while self.current_token and self.current_token.type == 'OPERATOR' and self.current_token.value in {'*', '/', '&&'}:
-            op = self.current_token.value
-            self.next_token()
-            factor = Node(op, [factor, self.parse_factor()])
-        return factor
-
-    def parse_factor(self):
-        if self.current_token.type == 'NUMBER':
-            value = self.expect('NUMBER')
-            return Node("number", [Node(value)])
-        elif self.current_token.type == 'ID':
-            value = self.expect('ID')
-            return Node("id", [Node(value)])
-        elif self.current_token.type == 'DELIM' and self.current_token.value == '(':
+        """
+        Parses an expression by precedence climbing over BINARY_OPERATORS.
+        Operands and pending operators live on explicit stacks, so nesting depth
+        is limited only by memory, not by Python's recursion limit.
+        """
+        ast = self.ast
+        operands = []
+        operators = []  # (precedence, operator, line, column), or None for an open '('
+        open_parens = 0
+
+        def reduce():
+            _, operator, line, column = operators.pop()
+            right = operands.pop()
+            left = operands.pop()
+            operands.append(ast.add(N_BINARY, operator, (left, right), line, column))
+
+        while True:
+            # Operand position: any number of '(' followed by a number or identifier
+            while self.current_kind == LPAREN:
+                operators.append(None)
+                open_parens += 1
+                self.next_token()
+            kind = self.current_kind
+            if kind == ID or kind == NUMBER:
+                token = self.current_token
+                operands.append(ast.add(N_ID if kind == ID else N_NUMBER, token.value, (), token.line, token.column))
+                self.next_token()
+            else:
+                raise self.syntax_error(f"Unexpected token in expression: {self.describe_current()}")
+
+            # Operator position: close any parentheses, then look for a binary operator
+            while open_parens and self.current_kind == RPAREN:
+                while operators[-1] is not None:
+                    reduce()
+                operators.pop()
+                open_parens -= 1
+                self.next_token()
+            entry = BINARY_OPERATORS.get(self.current_kind)
+            if entry is None:
+                break
+            operator, precedence = entry
+            while operators and operators[-1] is not None and operators[-1][0] >= precedence:
+                reduce()
+            token = self.current_token
+            operators.append((precedence, operator, token.line, token.column))
             self.next_token()
-            expr = self.parse_expr()
-            self.expect('DELIM', ')')
-            return expr
-        else:
-            raise SyntaxError(f"Unexpected token in factor: {self.current_token}")
+
+        if open_parens:
+            raise self.syntax_error(f"Expected ), got {self.describe_current()}")
+        while operators:
+            reduce()
+        return operands[0]
 
     def parse_if_stmt(self):
-        self.expect('KEYWORD', 'if')
-        self.expect('DELIM', '(')
-        condition = self.parse_expr()
-        self.expect('DELIM', ')')
-        self.expect('DELIM', '{')
-        then_branch = self.parse_stmt_list()
-        self.expect('DELIM', '}')
-        else_branch = None
-        if self.current_token and self.current_token.type == 'KEYWORD' and self.current_token.value == 'else':
-            self.next_token()
-            self.expect('DELIM', '{')
-            else_branch = self.parse_stmt_list()
-            self.expect('DELIM', '}')
-        if else_branch:
-            return Node("if", [condition, then_branch, else_branch])
-        return Node("if", [condition, then_branch])
+        """ Parses 'if (condition) {' and returns the pending if statement. """
+        line, column = self.position()
+        self.expect(IF)
+        return self.parse_condition_head(N_IF, line, column)
 
     def parse_while_stmt(self):
-        self.expect('KEYWORD', 'while')
-        self.expect('DELIM', '(')
+        """ Parses 'while (condition) {' and returns the pending while statement. """
+        line, column = self.position()
+        self.expect(WHILE)
+        return self.parse_condition_head(N_WHILE, line, column)
+
+    def parse_condition_head(self, kind, line, column):
+        self.expect(LPAREN)
         condition = self.parse_expr()
-        self.expect('DELIM', ')')
-        self.expect('DELIM', '{')
-        body = self.parse_stmt_list()
-        self.expect('DELIM', '}')
-        return Node("while", [condition, body])
+        self.expect(RPAREN)
+        block_line, block_column = self.position()
+        self.expect(LBRACE)
+        return [kind, line, column, condition, block_line, block_column]
 
     def parse_io_stmt(self):
-        io_keyword = self.expect('KEYWORD', 'print')
-        self.expect('DELIM', '(')
+        """ print(expr); or input(name); """
+        line, column = self.position()
+        if self.current_kind == INPUT:
+            self.next_token()
+            self.expect(LPAREN)
+            name = self.expect(ID)
+            self.expect(RPAREN)
+            self.expect(SEMI)
+            return self.ast.add(N_INPUT, name, (), line, column)
+        self.expect(PRINT)
+        self.expect(LPAREN)
         expr = self.parse_expr()
-        self.expect('DELIM', ')')
-        self.expect('DELIM', ';')
-        return Node(io_keyword, [expr])
+        self.expect(RPAREN)
+        self.expect(SEMI)
+        return self.ast.add(N_PRINT, None, (expr,), line, column)
 
 # Example usage
 if __name__ == "__main__":
@@ -212,26 +549,24 @@ if __name__ == "__main__":
     }
     """
 
-    # Tokenize the code
-    tokens = lexer(code)
-    
+    # Tokenize the code, keeping illegal characters for the parser to report
+    tokens = lexer(code, recover=True)
+
     # Initialize the parser with the tokens
     parser = Parser(tokens)
-    
-    try:
-        # Parse the program and generate the AST
-        parse_tree = parser.parse_program()
 
-        # Print the generated code from the AST
-        print("Generated Code:")
-        for stmt in parse_tree:
-            print(stmt.generate_code())
+    # Parse the program, reporting every syntax error and keeping what could be parsed
+    parse_tree = parser.parse_program(partial=True)
+    for error in parser.errors:
+        print(f"Syntax Error: {error}")
 
-        # Render the AST using Graphviz
-        if parse_tree:
-            ast_graph = parse_tree[0].render()  # Assuming parse_tree returns a list of nodes
-            ast_graph.render('parse_tree', format='png', cleanup=True)
-            print("AST visualization saved as 'parse_tree.png'")
+    # Print the generated code from the AST
+    print("Generated Code:")
+    for stmt in parse_tree.children:
+        print(stmt.generate_code())
 
-    except SyntaxError as e:
-        print(f"Syntax Error: {e}")
+    if not parser.errors:
+        # Render the AST using Graphviz
+        ast_graph = parse_tree.render()
+        ast_graph.render('parse_tree', format='png', cleanup=True)
+        print("AST visualization saved as 'parse_tree.png'")
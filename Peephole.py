@@ -0,0 +1,260 @@
+from ICG import Quad, COPY, LABEL, GOTO, IF_GOTO, NEGATED_RELATIONS
+
+
+class PeepholeOptimizer:
+    """
+    Table-driven peephole optimizer. A rule table is a sequence of
+    (pattern, rewrite) pairs: the pattern is a tuple of opcodes (None matches
+    any opcode) and its length is the window the rule looks at. The rewrite
+    gets the matched instructions and the context built by `prepare`, and
+    returns the replacement instructions or None if the rule does not apply.
+
+    Instructions are moved one at a time onto an output stack and the rules
+    are matched against its top. When a rule fires the window is popped and
+    the replacement is pushed back through the matcher, so rewrites can
+    enable further rewrites. Every rule must shrink the code or rewrite it
+    into a form no rule rewrites again, which keeps the sweep linear in the
+    number of instructions.
+    """
+
+    def __init__(self, rules, window=3, key=None, prepare=None):
+        self.window = window  # Largest pattern that is matched; longer rules are ignored
+        self.key = key if key is not None else _opcode  # instruction -> opcode
+        self.prepare = prepare  # instructions -> context passed to the rewrites
+        self.rules = {}  # opcode of the last instruction -> [(pattern, rewrite)], longest first
+        for pattern, rewrite in rules:
+            if len(pattern) <= window:
+                self.rules.setdefault(pattern[-1], []).append((pattern, rewrite))
+        # Rules for any opcode are tried alongside the specific ones
+        wildcard = self.rules.pop(None, [])
+        for candidates in self.rules.values():
+            candidates.extend(wildcard)
+            candidates.sort(key=lambda rule: -len(rule[0]))
+        wildcard.sort(key=lambda rule: -len(rule[0]))
+        self.wildcard = wildcard
+        self.rewrites = 0  # Rules fired by the last run
+
+    def run(self, instructions):
+        """
+        Returns the optimized copy of an instruction list.
+        """
+        context = self.prepare(instructions) if self.prepare is not None else None
+        key = self.key
+        rules = self.rules
+        wildcard = self.wildcard
+        output = []
+        keys = []  # opcodes of the instructions on the output stack
+        pending = []  # replacements waiting to be matched again, last one first
+        self.rewrites = 0
+        position = 0
+        count = len(instructions)
+        while pending or position < count:
+            if pending:
+                instruction = pending.pop()
+            else:
+                instruction = instructions[position]
+                position += 1
+            output.append(instruction)
+            keys.append(key(instruction))
+
+            for pattern, rewrite in rules.get(keys[-1], wildcard):
+                size = len(pattern)
+                if size > len(output) or not _matches(pattern, keys, size):
+                    continue
+                replacement = rewrite(output[-size:], context)
+                if replacement is None:
+                    continue
+                del output[-size:]
+                del keys[-size:]
+                pending.extend(reversed(replacement))
+                self.rewrites += 1
+                break
+        return output
+
+
+def _opcode(instruction):
+    return instruction.op
+
+
+def _matches(pattern, keys, size):
+    offset = len(keys) - size
+    for index in range(size):
+        expected = pattern[index]
+        if expected is not None and keys[offset + index] != expected:
+            return False
+    return True
+
+
+# Intermediate code rules (ICG.Quad instructions)
+
+def jump_chain_targets(instructions):
+    """
+    Maps every label that is immediately followed (possibly after more labels)
+    by `goto M` to the final label of that chain of jumps. Chains that loop
+    back on themselves are left alone.
+    """
+    forward = {}  # label -> label its goto jumps to
+    labels = []  # labels seen since the last non-label instruction
+    for instruction in instructions:
+        op = instruction.op
+        if op == LABEL:
+            labels.append(instruction.dst)
+            continue
+        if op == GOTO:
+            for label in labels:
+                forward[label] = instruction.dst
+        labels = []
+
+    targets = {}
+    for label in forward:
+        if label in targets:
+            continue
+        chain = [label]
+        seen = {label}
+        target = forward[label]
+        while target in forward and target not in targets and target not in seen:
+            chain.append(target)
+            seen.add(target)
+            target = forward[target]
+        if target in targets:
+            target = targets[target]
+        elif target in seen:
+            target = None  # A cycle of gotos: nothing to thread
+        for label in chain:
+            targets[label] = target if target is not None else label
+    return targets
+
+
+def _thread_jump(window, targets):
+    # goto L / if ... goto L, where L: goto M  ->  jump straight to M
+    jump = window[0]
+    target = targets.get(jump.dst)
+    if target is None or target == jump.dst:
+        return None
+    return [Quad(jump.op, target, jump.src1, jump.src2, jump.relop)]
+
+
+def _drop_jump_to_next(window, targets):
+    # goto L; L:  ->  L:
+    jump, label = window
+    return [label] if jump.dst == label.dst else None
+
+
+def _drop_after_goto(window, targets):
+    # goto L; x := y  ->  goto L   (nothing jumps to an instruction that is not labelled)
+    return [window[0]] if window[1].op != LABEL else None
+
+
+def _invert_branch(window, targets):
+    # if a < b goto L1; goto L2; L1:  ->  if a >= b goto L2; L1:
+    branch, jump, label = window
+    if branch.dst != label.dst:
+        return None
+    return [Quad(IF_GOTO, jump.dst, branch.src1, branch.src2, NEGATED_RELATIONS[branch.relop]), label]
+
+
+def _drop_self_copy(window, targets):
+    # x := x  ->  (nothing)
+    copy = window[0]
+    return [] if copy.src1.__class__ is str and copy.src1 == copy.dst else None
+
+
+def _is_int(operand, value):
+    return operand.__class__ is int and operand == value
+
+
+def _algebraic_identity(window, targets):
+    # x + 0, 0 + x, x - 0, x * 1, 1 * x, x / 1  ->  x. Only int 0 and 1 are
+    # neutral: adding 0.0 would turn an int into a float.
+    instruction = window[0]
+    op = instruction.op
+    left = instruction.src1
+    right = instruction.src2
+    if op == '+':
+        if _is_int(right, 0):
+            return [Quad(COPY, instruction.dst, left)]
+        if _is_int(left, 0):
+            return [Quad(COPY, instruction.dst, right)]
+    elif op == '*':
+        if _is_int(right, 1):
+            return [Quad(COPY, instruction.dst, left)]
+        if _is_int(left, 1):
+            return [Quad(COPY, instruction.dst, right)]
+    elif (op == '-' or op == '/') and _is_int(right, 0 if op == '-' else 1):
+        return [Quad(COPY, instruction.dst, left)]
+    return None
+
+
+IR_RULES = (
+    ((GOTO,), _thread_jump),
+    ((IF_GOTO,), _thread_jump),
+    ((GOTO, LABEL), _drop_jump_to_next),
+    ((GOTO, None), _drop_after_goto),
+    ((IF_GOTO, GOTO, LABEL), _invert_branch),
+    ((COPY,), _drop_self_copy),
+    (('+',), _algebraic_identity),
+    (('-',), _algebraic_identity),
+    (('*',), _algebraic_identity),
+    (('/',), _algebraic_identity),
+)
+
+
+# Target code rules (TargetCodeGenerator tuples: (mnemonic, operand, ...))
+
+def _mnemonic(instruction):
+    return instruction[0]
+
+
+def _drop_self_move(window, context):
+    # mov a, a  ->  (nothing)
+    move = window[0]
+    return [] if len(move) == 3 and move[1] == move[2] else None
+
+
+def _drop_move_back(window, context):
+    # mov a, b; mov b, a  ->  mov a, b
+    first, second = window
+    if len(first) == 3 and len(second) == 3 and first[1] == second[2] and first[2] == second[1]:
+        return [first]
+    return None
+
+
+def _drop_overwritten_move(window, context):
+    # mov a, b; mov a, c  ->  mov a, c   (when c is not a itself)
+    first, second = window
+    if len(first) == 3 and len(second) == 3 and first[1] == second[1] and second[2] != second[1]:
+        return [second]
+    return None
+
+
+def _drop_target_jump_to_next(window, context):
+    # jmp L; L:  ->  L:
+    jump, label = window
+    return [label] if jump[1] == label[1] else None
+
+
+TARGET_RULES = (
+    (('mov',), _drop_self_move),
+    (('mov', 'mov'), _drop_move_back),
+    (('mov', 'mov'), _drop_overwritten_move),
+    (('jmp', 'label'), _drop_target_jump_to_next),
+)
+
+
+# Default window sizes: the longest pattern of each table
+IR_WINDOW = 3
+TARGET_WINDOW = 2
+
+
+def optimize_intermediate_code(instructions, window=IR_WINDOW):
+    """
+    Runs the intermediate code rules over a list of ICG.Quad instructions.
+    """
+    return PeepholeOptimizer(IR_RULES, window, prepare=jump_chain_targets).run(instructions)
+
+
+def optimize_target_code(instructions, window=TARGET_WINDOW):
+    """
+    Runs the target code rules over a list of TargetCodeGenerator instructions.
+    """
+    return PeepholeOptimizer(TARGET_RULES, window, key=_mnemonic).run(instructions)
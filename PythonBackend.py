@@ -0,0 +1,284 @@
+import hashlib
+import importlib.util
+import marshal
+import os
+import tempfile
+
+from Parser_2 import (
+    N_PROGRAM, N_BLOCK, N_VAR_DECL, N_ASSIGN, N_IF, N_WHILE, N_PRINT, N_NUMBER, N_ID, N_BINARY, N_INPUT,
+)
+from ICG import RELATIONAL_OPERATORS, constant_operand, divide
+from Compiler import Compilation
+from VirtualMachine import parse_input, run_bytecode
+
+# Bump when the generated code changes, so stale cache entries are not reused
+BACKEND_VERSION = 3
+
+# Compiled programs kept in memory, oldest evicted first
+MAX_CACHED_PROGRAMS = 128
+
+FUNCTION_NAME = '_minilang_program'
+
+
+def local_name(name):
+    """
+    Returns the Python local for a symbol slot name: `v_x` for `x`, and
+    `v3_x` for the slot `x%3` of a second declaration of `x`.
+    """
+    base, _, slot = name.partition('%')
+    return f"v{slot}_{base}"
+
+
+class PythonCodeGenerator:
+    """
+    Translates a parsed program into the source of one Python function.
+    MiniLang variables become locals, one per symbol slot the semantic
+    analyzer resolved (prefixed with `v_` so they cannot clash with Python
+    names), `if`/`while` become Python statements, and
+    expressions become Python expressions with MiniLang semantics:
+    comparisons and logical operators yield 1/0 (plain booleans are used
+    when the value is only tested), both operands of && and || are always
+    evaluated, and / goes through ICG.divide. The tree is walked with
+    explicit stacks, like the rest of the compiler.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.locals = []
+
+    def generate(self, root):
+        """
+        Returns the Python source for the program rooted at `root` (a
+        Parser_2.Node), which must have been through semantic analysis.
+        """
+        tree = root.tree
+        kinds = tree.kinds
+        slots = tree.slots
+        locals_ = self.locals = [local_name(name) for name in tree.slot_names]
+
+        lines = self.lines = [f"def {FUNCTION_NAME}(print_, input_, parse_input, divide, variables):"]
+        for name, local in zip(tree.slot_names, locals_):
+            lines.append(f"    {local} = variables.get({name!r}, 0)")
+
+        stack = [(root.id, 1)]  # (node id, indentation level) or a line of text
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                lines.append(item)
+                continue
+            node, level = item
+            indent = "    " * level
+            kind = kinds[node]
+            if kind == N_ASSIGN:
+                lines.append(f"{indent}{locals_[slots[node]]} = {self.expression(tree, tree.first_child[node])}")
+            elif kind == N_PRINT:
+                lines.append(f"{indent}print_({self.expression(tree, tree.first_child[node])})")
+            elif kind == N_INPUT:
+                lines.append(f"{indent}{locals_[slots[node]]} = parse_input(input_())")
+            elif kind == N_IF:
+                children = tree.children(node)
+                lines.append(f"{indent}if {self.expression(tree, children[0], True)}:")
+                pending = [(children[1], level + 1)]
+                if len(children) > 2:
+                    pending += [f"{indent}else:", (children[2], level + 1)]
+                stack.extend(reversed(pending))
+            elif kind == N_WHILE:
+                condition, body = tree.children(node)
+                lines.append(f"{indent}while {self.expression(tree, condition, True)}:")
+                stack.append((body, level + 1))
+            elif kind == N_BLOCK or kind == N_PROGRAM:
+                statements = [child for child in tree.children(node) if kinds[child] != N_VAR_DECL]
+                if not statements and kind == N_BLOCK:
+                    lines.append(f"{indent}pass")
+                stack.extend((child, level) for child in reversed(statements))
+            elif kind != N_VAR_DECL:
+                raise ValueError(f"Cannot generate Python for node kind {kind}")
+
+        returned = ", ".join(f"{name!r}: {local}" for name, local in zip(tree.slot_names, locals_))
+        lines.append("    return {" + returned + "}")
+        return "\n".join(lines) + "\n"
+
+    def expression(self, tree, node, condition=False):
+        """
+        Returns the Python text of an expression. With `condition` the text
+        only has to be truthy exactly when the MiniLang value is non-zero.
+        """
+        kinds = tree.kinds
+        values = tree.values
+        slots = tree.slots
+        locals_ = self.locals
+        first_child = tree.first_child
+        next_sibling = tree.next_sibling
+        results = []
+        stack = [(node, condition)]  # (node id, condition context); ~id marks an operator to combine
+        while stack:
+            item, test = stack.pop()
+            if item < 0:
+                item = ~item
+                right = results.pop()
+                left = results.pop()
+                op = values[item]
+                if op == '&&' or op == '||':
+                    text = f"({left} {'&' if op == '&&' else '|'} {right})"
+                    results.append(text if test else f"(1 if {text} else 0)")
+                elif op in RELATIONAL_OPERATORS:
+                    text = f"({left} {op} {right})"
+                    results.append(text if test else f"(1 if {text} else 0)")
+                elif op == '/':
+                    results.append(f"divide({left}, {right})" if not test else f"(divide({left}, {right}) != 0)")
+                else:
+                    text = f"({left} {op} {right})"
+                    results.append(f"({text} != 0)" if test else text)
+                continue
+            kind = kinds[item]
+            if kind == N_BINARY:
+                op = values[item]
+                operand_test = op == '&&' or op == '||'  # Logical operands are only tested
+                left = first_child[item]
+                stack += [(~item, test), (next_sibling[left], operand_test), (left, operand_test)]
+            elif kind == N_NUMBER:
+                value = constant_operand(tree, item)
+                results.append(f"({value!r} != 0)" if test else repr(value))
+            elif kind == N_ID:
+                local = locals_[slots[item]]
+                results.append(f"({local} != 0)" if test else local)
+            else:
+                raise ValueError(f"Cannot generate Python for expression node kind {kind}")
+        return results[0]
+
+
+class CompiledProgram:
+    """
+    A MiniLang program compiled to a Python code object. `python_source`
+    is the generated function; `code` is what compile() made of it.
+    Programs nested too deeply for Python's compiler carry `bytecode`
+    instead and run on the bytecode VM.
+    """
+    __slots__ = ('key', 'python_source', 'code', 'function', 'bytecode')
+
+    def __init__(self, key, python_source, code, bytecode=None):
+        self.key = key
+        self.python_source = python_source
+        self.code = code
+        self.bytecode = bytecode
+        self.function = None
+        if code is not None:
+            namespace = {}
+            exec(code, namespace)
+            self.function = namespace[FUNCTION_NAME]
+
+    def run(self, input_function=input, output_function=print, variables=None):
+        """
+        Runs the program and returns the final values of its variables.
+        """
+        if self.function is None:
+            return run_bytecode(self.bytecode, input_function, output_function, variables).variables()
+        try:
+            return self.function(output_function, input_function, parse_input, divide, variables or {})
+        except ZeroDivisionError:
+            raise RuntimeError("Division by zero")
+
+
+class PythonBackend:
+    """
+    Compiles MiniLang source to Python code objects, caching them by the
+    SHA-256 of the source. Entries are kept in memory (at most
+    `max_programs`, oldest evicted first) and, when `cache_dir` is given,
+    also written there as marshalled code objects so other processes can
+    reuse them. The key includes the backend version and the Python bytecode
+    magic number, since marshalled code only loads on the same Python.
+    """
+
+    def __init__(self, cache_dir=None, max_programs=MAX_CACHED_PROGRAMS):
+        self.cache_dir = cache_dir
+        self.max_programs = max_programs
+        self.programs = {}  # key -> CompiledProgram, in insertion order
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(source):
+        digest = hashlib.sha256()
+        digest.update(f"minilang-python-{BACKEND_VERSION}-".encode())
+        digest.update(importlib.util.MAGIC_NUMBER)
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def compile_source(self, source, compilation=None):
+        """
+        Returns the CompiledProgram for a MiniLang source text, compiling it only on a cache miss.
+        The program goes through semantic analysis first, so this raises
+        ParseError (a SyntaxError) or SemanticError for invalid MiniLang.
+        Pass the Compilation of `source` when there is one to reuse its AST
+        and analysis.
+        """
+        key = self.cache_key(source)
+        program = self.programs.get(key)
+        if program is not None:
+            self.hits += 1
+            return program
+
+        code = self.load(key)
+        if code is not None:
+            self.hits += 1
+            program = CompiledProgram(key, None, code)  # Only the code object is kept on disk
+        else:
+            self.misses += 1
+            if compilation is None:
+                compilation = Compilation(source)
+            root = compilation.checked_tree()
+            python_source = PythonCodeGenerator().generate(root)
+            try:
+                code = compile(python_source, f"<minilang {key[:12]}>", 'exec')
+            except (SyntaxError, RecursionError, MemoryError):
+                # Nested deeper than Python's compiler allows: fall back to the VM
+                program = CompiledProgram(key, python_source, None, compilation.bytecode)
+            else:
+                self.store(key, code)
+                program = CompiledProgram(key, python_source, code)
+        if len(self.programs) >= self.max_programs:
+            del self.programs[next(iter(self.programs))]
+        self.programs[key] = program
+        return program
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pyc")
+
+    def load(self, key):
+        """
+        Returns a cached code object from cache_dir, or None.
+        """
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self.path(key), 'rb') as file:
+                return marshal.load(file)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+
+    def store(self, key, code):
+        """
+        Writes a code object to cache_dir through a temporary file, so a
+        concurrent reader never sees a partial entry.
+        """
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                marshal.dump(code, file)
+            os.replace(temporary, self.path(key))
+        except OSError:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+
+
+_default_backend = PythonBackend()
+
+
+def compile_source(source, compilation=None):
+    """
+    Compiles MiniLang source with the shared in-memory cache.
+    """
+    return _default_backend.compile_source(source, compilation)
@@ -1,38 +1,291 @@
+from bisect import insort
+
+from ControlFlowGraph import ControlFlowGraph
+from DataFlow import Liveness
+from ICG import COPY, LABEL, GOTO, IF_GOTO, PRINT, INPUT, ARITHMETIC_OPERATORS, RELATIONAL_OPERATORS, LOGICAL_OPERATORS
+from Peephole import optimize_target_code
+
+# Registers handed out by the allocator. eax is never allocated: it is the
+# scratch register for memory-to-memory moves and intermediate results.
+ALLOCATABLE_REGISTERS = ('ebx', 'ecx', 'edx', 'esi', 'edi')
+SCRATCH_REGISTER = 'eax'
+
+# Instruction selected for each IR operator. The target is a two-address
+# machine: `add d, s` computes d := d + s, and `set<cc> d` stores 1 or 0.
+ARITHMETIC_MNEMONICS = {'+': 'add', '-': 'sub', '*': 'imul', '/': 'idiv'}
+LOGICAL_MNEMONICS = {'&&': 'and', '||': 'or'}
+CONDITION_CODES = {'<': 'l', '>': 'g', '<=': 'le', '>=': 'ge', '==': 'e', '!=': 'ne'}
+COMMUTATIVE_MNEMONICS = frozenset(('add', 'imul', 'and', 'or'))
+
+# Relation that holds after the operands of a comparison are swapped
+SWAPPED_RELATIONS = {'<': '>', '>': '<', '<=': '>=', '>=': '<=', '==': '==', '!=': '!='}
+
+
+def format_target_instruction(instruction):
+    """
+    Formats a target instruction tuple (mnemonic, operand, ...) as assembly text.
+    """
+    if instruction[0] == 'label':
+        return f"{instruction[1]}:"
+    return f"{instruction[0]} {', '.join(str(operand) for operand in instruction[1:])}"
+
+
+def is_memory(location):
+    """
+    Returns True for a memory operand such as [x].
+    """
+    return location.__class__ is str and location[0] == '['
+
+
+def is_immediate(location):
+    return location.__class__ is not str
+
+
+class LiveInterval:
+    """
+    The range of instruction positions over which a variable may hold a
+    value that is still needed, and the register it was given (None when
+    it lives in memory).
+    """
+    __slots__ = ('var', 'start', 'end', 'register')
+
+    def __init__(self, var, position):
+        self.var = var
+        self.start = position
+        self.end = position
+        self.register = None
+
+    def __repr__(self):
+        return f"LiveInterval({self.var!r}, {self.start}, {self.end}, {self.register!r})"
+
+
+def compute_live_intervals(cfg, liveness):
+    """
+    Builds one interval per variable over the instruction positions of the
+    CFG in block order. Besides its own uses and definitions, a variable
+    covers the start of every block it is live into and the end of every
+    block it is live out of, so an interval spans whole loops it is live in.
+    Returns the intervals sorted by start position.
+    """
+    intervals = {}
+
+    def extend(var, position):
+        interval = intervals.get(var)
+        if interval is None:
+            intervals[var] = LiveInterval(var, position)
+        elif position < interval.start:
+            interval.start = position
+        elif position > interval.end:
+            interval.end = position
+
+    position = 0
+    for block in cfg.blocks:
+        start = position
+        for var in liveness.live_in(block.index):
+            extend(var, start)
+        for instruction in block.instructions:
+            for var in instruction.uses():
+                extend(var, position)
+            var = instruction.defines()
+            if var is not None:
+                extend(var, position)
+            position += 1
+        for var in liveness.live_out(block.index):
+            extend(var, position - 1)
+    return sorted(intervals.values(), key=lambda interval: interval.start)
+
+
+class LinearScanAllocator:
+    """
+    Linear-scan register allocation (Poletto and Sarkar). Intervals are
+    visited by increasing start; the active ones are kept sorted by end so
+    expired registers are freed from the front. When no register is free,
+    whichever of the new interval and the active interval ending last ends
+    later is spilled to memory.
+    """
+
+    def __init__(self, registers=ALLOCATABLE_REGISTERS):
+        self.registers = registers
+        self.spilled = 0  # Intervals left in memory by the last allocate()
+
+    def allocate(self, intervals):
+        """
+        Sets the register of every interval (given sorted by start) and returns them.
+        """
+        free = list(reversed(self.registers))
+        active = []  # (end, order, interval), sorted
+        self.spilled = 0
+        for order, interval in enumerate(intervals):
+            expired = 0
+            while expired < len(active) and active[expired][0] < interval.start:
+                free.append(active[expired][2].register)
+                expired += 1
+            if expired:
+                del active[:expired]
+
+            if free:
+                interval.register = free.pop()
+                insort(active, (interval.end, order, interval))
+                continue
+            self.spilled += 1
+            if active and active[-1][0] > interval.end:
+                spill = active.pop()[2]
+                interval.register = spill.register
+                spill.register = None
+                insort(active, (interval.end, order, interval))
+        return intervals
+
+
 class TargetCodeGenerator:
-    def __init__(self):
-        self.target_code = []  # List to store the target code
+    def __init__(self, optimize=True, registers=ALLOCATABLE_REGISTERS):
+        self.target_code = []  # List to store the target code as (mnemonic, operand, ...) tuples
+        self.optimize = optimize  # Run the peephole rules over the generated code
+        self.registers = registers  # Registers available to the allocator
+        self.locations = {}  # variable -> register or memory operand
 
-    def emit(self, instruction):
+    def emit(self, mnemonic, *operands):
         """
         Adds an instruction to the target code.
         """
-        self.target_code.append(instruction)
+        self.target_code.append((mnemonic,) + operands)
 
-    def generate_target_code(self, intermediate_code):
+    def generate_target_code(self, intermediate_code, live_on_exit=None):
         """
         Generate target code (e.g., assembly) based on intermediate code.
-        The intermediate code will typically consist of assignments, arithmetic operations, jumps, etc.
+        The intermediate code is a list of ICG.Quad instructions: assignments, arithmetic operations, jumps, etc.
+        Variables are assigned registers by linear scan over their live
+        intervals; the ones that do not fit stay in memory. Variables in a
+        register are loaded on entry if they are live there, and stored back
+        at the end if they are live on exit (see DataFlow.Liveness).
         """
+        cfg = ControlFlowGraph(intermediate_code)
+        liveness = Liveness(cfg, live_on_exit).solve()
+        intervals = LinearScanAllocator(self.registers).allocate(compute_live_intervals(cfg, liveness))
+        locations = self.locations = {}
+        for interval in intervals:
+            locations[interval.var] = interval.register if interval.register is not None else f"[{interval.var}]"
+
+        if cfg.blocks:
+            for var in sorted(liveness.live_in(0)):
+                if not is_memory(locations[var]):
+                    self.emit('mov', locations[var], f"[{var}]")
+
         for instruction in intermediate_code:
-            if ":=" in instruction:
-                var, expr = instruction.split(":=")
-                var = var.strip()
-                expr = expr.strip()
-                self.emit(f"mov {var}, {expr}")  # Example for assigning a value
-            elif "if" in instruction:
-                # Handle conditional jump
-                condition = instruction.split("goto")[0].strip()
-                label = instruction.split("goto")[1].strip()
-                operand1, operator, operand2 = condition.split()[1], condition.split()[2], condition.split()[3]
-                self.emit(f"cmp {operand1}, {operand2}")  # Compare operands
-                self.emit(f"je {label}")  # Jump if equal
-            elif "goto" in instruction:
-                label = instruction.split()[1]
-                self.emit(f"jmp {label}")  # Unconditional jump to label
+            op = instruction.op
+            if op == COPY:
+                self.move(self.location(instruction.dst), self.location(instruction.src1))
+            elif op in ARITHMETIC_OPERATORS:
+                self.generate_arithmetic(instruction)
+            elif op in RELATIONAL_OPERATORS:
+                relop = self.compare(self.location(instruction.src1), self.location(instruction.src2), op)
+                self.emit('set' + CONDITION_CODES[relop], self.location(instruction.dst))
+            elif op in LOGICAL_OPERATORS:
+                self.generate_logical(instruction)
+            elif op == IF_GOTO:
+                relop = self.compare(self.location(instruction.src1), self.location(instruction.src2), instruction.relop)
+                self.emit('j' + CONDITION_CODES[relop], instruction.dst)
+            elif op == GOTO:
+                self.emit('jmp', instruction.dst)  # Unconditional jump to label
+            elif op == LABEL:
+                self.emit('label', instruction.dst)
+            elif op == PRINT:
+                self.emit('print', self.location(instruction.src1))
+            elif op == INPUT:
+                self.emit('input', self.location(instruction.dst))
+
+        for var in sorted(liveness.to_names(liveness.boundary)):
+            if var in locations and not is_memory(locations[var]):
+                self.emit('mov', f"[{var}]", locations[var])
+
+        if self.optimize:
+            self.target_code = optimize_target_code(self.target_code)
+        return self.target_code
+
+    def location(self, operand):
+        """
+        Returns where an IR operand lives: a register, a memory operand or an immediate.
+        """
+        if operand.__class__ is not str:
+            return operand
+        return self.locations[operand]
+
+    def move(self, destination, source):
+        """
+        Emits a move, going through the scratch register between two memory operands.
+        """
+        if destination == source:
+            return
+        if is_memory(destination) and is_memory(source):
+            self.emit('mov', SCRATCH_REGISTER, source)
+            source = SCRATCH_REGISTER
+        self.emit('mov', destination, source)
+
+    def compare(self, left, right, relop):
+        """
+        Emits `cmp left, right` and returns the relation to test afterwards.
+        An immediate cannot come first, so the operands are swapped (and the
+        relation mirrored) or the left one is loaded into the scratch register.
+        """
+        if is_immediate(left):
+            if is_immediate(right):
+                self.emit('mov', SCRATCH_REGISTER, left)
+                left = SCRATCH_REGISTER
+            else:
+                left, right, relop = right, left, SWAPPED_RELATIONS[relop]
+        elif is_memory(left) and is_memory(right):
+            self.emit('mov', SCRATCH_REGISTER, left)
+            left = SCRATCH_REGISTER
+        self.emit('cmp', left, right)
+        return relop
+
+    def generate_arithmetic(self, instruction):
+        """
+        dst := a op b becomes `mov dst, a; op dst, b` when dst is a register,
+        and is computed in the scratch register otherwise.
+        """
+        mnemonic = ARITHMETIC_MNEMONICS[instruction.op]
+        destination = self.location(instruction.dst)
+        left = self.location(instruction.src1)
+        right = self.location(instruction.src2)
+        if not is_memory(destination):
+            if destination != right or destination == left:
+                self.move(destination, left)
+                self.emit(mnemonic, destination, right)
+                return
+            if mnemonic in COMMUTATIVE_MNEMONICS:
+                self.emit(mnemonic, destination, left)
+                return
+        self.emit('mov', SCRATCH_REGISTER, left)
+        self.emit(mnemonic, SCRATCH_REGISTER, right)
+        self.emit('mov', destination, SCRATCH_REGISTER)
+
+    def generate_logical(self, instruction):
+        """
+        dst := a && b (or ||) turns both operands into 1/0, the first in dst
+        and the second in the scratch register, and combines them with and/or.
+        """
+        destination = self.location(instruction.dst)
+        first = self.location(instruction.src1)
+        second = self.location(instruction.src2)
+        if destination == second:
+            first, second = second, first  # Do not overwrite an operand before reading it
+        self.booleanize(destination, first)
+        self.booleanize(SCRATCH_REGISTER, second)
+        self.emit(LOGICAL_MNEMONICS[instruction.op], destination, SCRATCH_REGISTER)
+
+    def booleanize(self, destination, operand):
+        """
+        Stores 1 in destination if operand is non-zero and 0 otherwise.
+        """
+        if is_immediate(operand):
+            self.emit('mov', destination, int(operand != 0))
+        else:
+            self.emit('cmp', operand, 0)
+            self.emit('setne', destination)
 
     def print_target_code(self):
         """
         Print the generated target code.
         """
         for instruction in self.target_code:
-            print(instruction)
\ No newline at end of file
+            print(format_target_instruction(instruction))
@@ -0,0 +1,290 @@
+from array import array
+
+from ICG import COPY, LABEL, GOTO, IF_GOTO, PRINT, INPUT, is_temporary, divide
+
+# Bytecode opcodes. Every instruction is four ints: opcode, a, b, c.
+#   OP_MOVE      a := b
+#   OP_ADD ..    a := b op c        (arithmetic, comparisons, logical)
+#   OP_JUMP      goto a
+#   OP_JUMP_LT.. if b rel c goto a
+#   OP_PRINT     print b
+#   OP_INPUT     read a value into a
+#   OP_HALT      stop
+# Operands are register slots; jump targets are instruction indices.
+(OP_HALT, OP_MOVE, OP_ADD, OP_SUB, OP_MUL, OP_DIV, OP_LT, OP_GT, OP_LE, OP_GE, OP_EQ, OP_NE,
+ OP_AND, OP_OR, OP_JUMP, OP_JUMP_LT, OP_JUMP_GT, OP_JUMP_LE, OP_JUMP_GE, OP_JUMP_EQ, OP_JUMP_NE,
+ OP_PRINT, OP_INPUT) = range(23)
+
+OPCODE_NAMES = ['halt', 'move', 'add', 'sub', 'mul', 'div', 'lt', 'gt', 'le', 'ge', 'eq', 'ne',
+                'and', 'or', 'jump', 'jump_lt', 'jump_gt', 'jump_le', 'jump_ge', 'jump_eq', 'jump_ne',
+                'print', 'input']
+
+BINARY_OPCODES = {
+    '+': OP_ADD, '-': OP_SUB, '*': OP_MUL, '/': OP_DIV,
+    '<': OP_LT, '>': OP_GT, '<=': OP_LE, '>=': OP_GE, '==': OP_EQ, '!=': OP_NE,
+    '&&': OP_AND, '||': OP_OR,
+}
+JUMP_OPCODES = {'<': OP_JUMP_LT, '>': OP_JUMP_GT, '<=': OP_JUMP_LE, '>=': OP_JUMP_GE,
+                '==': OP_JUMP_EQ, '!=': OP_JUMP_NE}
+
+INSTRUCTION_WIDTH = 4
+
+
+class Bytecode:
+    """
+    A compiled program: a flat array of 4-int instructions, the names of the
+    variable slots and the constant pool. Registers 0..len(names)-1 hold
+    variables and temporaries; the constants are preloaded into the
+    registers after them, so every operand is just a slot number.
+    `labels` maps the IR labels to the instruction indices they resolved to;
+    it is only kept for disassembly and debugging.
+    """
+    __slots__ = ('code', 'names', 'constants', 'labels')
+
+    def __init__(self, code=None, names=None, constants=None, labels=None):
+        self.code = code if code is not None else array('i')
+        self.names = names if names is not None else []
+        self.constants = constants if constants is not None else []
+        self.labels = labels if labels is not None else {}
+
+    def __len__(self):
+        return len(self.code) // INSTRUCTION_WIDTH
+
+    def registers(self):
+        """
+        Returns a fresh register file: variables start at 0, then the constants.
+        """
+        return [0] * len(self.names) + list(self.constants)
+
+    def disassemble(self):
+        """
+        Returns the instructions as lines of text, with slots shown by name.
+        """
+        slot_names = list(self.names) + [repr(constant) for constant in self.constants]
+        label_names = {}
+        for label, index in self.labels.items():
+            label_names.setdefault(index, []).append(label)
+        code = self.code
+        lines = []
+        for pc in range(0, len(code), INSTRUCTION_WIDTH):
+            for label in label_names.get(pc // INSTRUCTION_WIDTH, ()):
+                lines.append(f"{label}:")
+            op, a, b, c = code[pc:pc + INSTRUCTION_WIDTH]
+            name = OPCODE_NAMES[op]
+            if op == OP_MOVE:
+                text = f"{name} {slot_names[a]}, {slot_names[b]}"
+            elif OP_ADD <= op <= OP_OR:
+                text = f"{name} {slot_names[a]}, {slot_names[b]}, {slot_names[c]}"
+            elif op == OP_JUMP:
+                text = f"{name} {a}"
+            elif OP_JUMP_LT <= op <= OP_JUMP_NE:
+                text = f"{name} {slot_names[b]}, {slot_names[c]}, {a}"
+            elif op == OP_PRINT:
+                text = f"{name} {slot_names[b]}"
+            elif op == OP_INPUT:
+                text = f"{name} {slot_names[a]}"
+            else:
+                text = name
+            lines.append(f"{pc // INSTRUCTION_WIDTH:5}  {text}")
+        return lines
+
+
+class BytecodeCompiler:
+    """
+    Translates a list of ICG.Quad instructions into Bytecode. Labels are
+    resolved to instruction indices in a first pass, so the VM never looks
+    anything up by name.
+    """
+
+    def __init__(self):
+        self.slots = {}  # variable -> register slot
+        self.constant_slots = {}  # (type, constant) -> index in the constant pool
+        self.bytecode = Bytecode()
+
+    def slot(self, operand):
+        """
+        Returns the register slot of a variable or constant operand.
+        Constant slots are numbered from 0 here and shifted past the variables at the end.
+        """
+        if operand.__class__ is str:
+            slot = self.slots.get(operand)
+            if slot is None:
+                slot = self.slots[operand] = len(self.bytecode.names)
+                self.bytecode.names.append(operand)
+            return slot
+        key = (operand.__class__, operand)
+        index = self.constant_slots.get(key)
+        if index is None:
+            index = self.constant_slots[key] = len(self.bytecode.constants)
+            self.bytecode.constants.append(operand)
+        return ~index
+
+    def compile(self, instructions):
+        """
+        Compiles the instructions and returns the Bytecode.
+        """
+        targets = {}  # label -> instruction index
+        index = 0
+        for instruction in instructions:
+            if instruction.op == LABEL:
+                targets[instruction.dst] = index
+            else:
+                index += 1
+
+        emitted = []
+        slot = self.slot
+        for instruction in instructions:
+            op = instruction.op
+            if op == LABEL:
+                continue
+            if op == COPY:
+                emitted.append((OP_MOVE, slot(instruction.dst), slot(instruction.src1), 0))
+            elif op == GOTO:
+                emitted.append((OP_JUMP, targets[instruction.dst], 0, 0))
+            elif op == IF_GOTO:
+                emitted.append((JUMP_OPCODES[instruction.relop], targets[instruction.dst],
+                                slot(instruction.src1), slot(instruction.src2)))
+            elif op == PRINT:
+                emitted.append((OP_PRINT, 0, slot(instruction.src1), 0))
+            elif op == INPUT:
+                emitted.append((OP_INPUT, slot(instruction.dst), 0, 0))
+            else:
+                emitted.append((BINARY_OPCODES[op], slot(instruction.dst),
+                                slot(instruction.src1), slot(instruction.src2)))
+        emitted.append((OP_HALT, 0, 0, 0))
+
+        # Constants live in the registers after the variables
+        bytecode = self.bytecode
+        bytecode.labels = targets
+        base = len(bytecode.names)
+        code = bytecode.code
+        for op, a, b, c in emitted:
+            code.extend((op, a if a >= 0 else base + ~a, b if b >= 0 else base + ~b, c if c >= 0 else base + ~c))
+        return bytecode
+
+
+def compile_bytecode(instructions):
+    """
+    Compiles a list of ICG.Quad instructions into Bytecode.
+    """
+    return BytecodeCompiler().compile(instructions)
+
+
+def parse_input(text):
+    """
+    Converts a line read by `input` into an int or a float.
+    """
+    text = text.strip()
+    try:
+        return float(text) if '.' in text else int(text)
+    except ValueError:
+        raise RuntimeError(f"Invalid numeric input: {text!r}")
+
+
+class VirtualMachine:
+    """
+    Executes Bytecode. The instruction array is decoded once into tuples and
+    run by a single dispatch loop over local variables; `input_function`
+    supplies lines for `input` and `output_function` receives printed values.
+    """
+
+    def __init__(self, bytecode, input_function=input, output_function=print):
+        self.bytecode = bytecode
+        self.input_function = input_function
+        self.output_function = output_function
+        self.registers = None  # Register file after the last run
+        self.steps = 0  # Instructions executed by the last run
+
+    def run(self, variables=None):
+        """
+        Executes the program from the start and returns self. `variables`
+        optionally gives initial values by name (every other variable starts at 0).
+        """
+        code = self.bytecode.code
+        width = INSTRUCTION_WIDTH
+        program = [tuple(code[pc:pc + width]) for pc in range(0, len(code), width)]
+        registers = self.registers = self.bytecode.registers()
+        if variables:
+            for slot, name in enumerate(self.bytecode.names):
+                if name in variables:
+                    registers[slot] = variables[name]
+        output = self.output_function
+        read = self.input_function
+        pc = 0
+        steps = 0
+        try:
+            while True:
+                op, a, b, c = program[pc]
+                pc += 1
+                steps += 1
+                if op == OP_MOVE:
+                    registers[a] = registers[b]
+                elif op == OP_ADD:
+                    registers[a] = registers[b] + registers[c]
+                elif op == OP_SUB:
+                    registers[a] = registers[b] - registers[c]
+                elif op == OP_MUL:
+                    registers[a] = registers[b] * registers[c]
+                elif op == OP_JUMP:
+                    pc = a
+                elif op == OP_JUMP_LT:
+                    if registers[b] < registers[c]:
+                        pc = a
+                elif op == OP_JUMP_GE:
+                    if registers[b] >= registers[c]:
+                        pc = a
+                elif op == OP_JUMP_GT:
+                    if registers[b] > registers[c]:
+                        pc = a
+                elif op == OP_JUMP_LE:
+                    if registers[b] <= registers[c]:
+                        pc = a
+                elif op == OP_JUMP_EQ:
+                    if registers[b] == registers[c]:
+                        pc = a
+                elif op == OP_JUMP_NE:
+                    if registers[b] != registers[c]:
+                        pc = a
+                elif op == OP_DIV:
+                    registers[a] = divide(registers[b], registers[c])
+                elif op == OP_LT:
+                    registers[a] = 1 if registers[b] < registers[c] else 0
+                elif op == OP_GT:
+                    registers[a] = 1 if registers[b] > registers[c] else 0
+                elif op == OP_LE:
+                    registers[a] = 1 if registers[b] <= registers[c] else 0
+                elif op == OP_GE:
+                    registers[a] = 1 if registers[b] >= registers[c] else 0
+                elif op == OP_EQ:
+                    registers[a] = 1 if registers[b] == registers[c] else 0
+                elif op == OP_NE:
+                    registers[a] = 1 if registers[b] != registers[c] else 0
+                elif op == OP_AND:
+                    registers[a] = 1 if registers[b] != 0 and registers[c] != 0 else 0
+                elif op == OP_OR:
+                    registers[a] = 1 if registers[b] != 0 or registers[c] != 0 else 0
+                elif op == OP_PRINT:
+                    output(registers[b])
+                elif op == OP_INPUT:
+                    registers[a] = parse_input(read())
+                else:  # OP_HALT
+                    break
+        except ZeroDivisionError:
+            raise RuntimeError(f"Division by zero at instruction {pc - 1}")
+        finally:
+            self.steps = steps
+        return self
+
+    def variables(self):
+        """
+        Returns the final values of the program's variables (temporaries excluded).
+        """
+        names = self.bytecode.names
+        return {name: self.registers[slot] for slot, name in enumerate(names) if not is_temporary(name)}
+
+
+def run_bytecode(bytecode, input_function=input, output_function=print, variables=None):
+    """
+    Runs Bytecode and returns the VirtualMachine, which holds the final registers.
+    """
+    return VirtualMachine(bytecode, input_function, output_function).run(variables)
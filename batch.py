@@ -0,0 +1,202 @@
+"""
+Compiles many MiniLang files in parallel.
+
+Usage:
+    python batch.py [-j N] [-O LEVEL] [--emit object|ir|asm] [--output-dir DIR]
+                    [--cache-dir DIR] [--quiet] [--report FILE] PATH...
+
+Every PATH is a source file or a directory searched recursively for
+*.ml files. Each file is compiled on its own in a pool of worker
+processes and written next to its source (or under --output-dir, keeping
+the layout below each directory argument). A file that fails to compile
+is reported and the rest of the batch carries on; the exit status is 1
+if any file failed.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Optimizer import OPTIMIZATION_LEVELS, DEFAULT_OPTIMIZATION_LEVEL
+from TargetCodeGenerator import format_target_instruction
+from ObjectFile import write_object
+from Compiler import Compilation
+from CompileCache import CompileCache, DEFAULT_MAX_BYTES
+
+SOURCE_SUFFIX = '.ml'
+
+# Output file suffix of every --emit kind
+OUTPUT_SUFFIXES = {'object': '.mlo', 'ir': '.ir', 'asm': '.s'}
+
+# Tasks handed to a worker at a time; small enough to balance uneven files,
+# large enough that tens of thousands of tiny files are not dominated by IPC
+MAX_CHUNK_SIZE = 64
+
+
+class FileResult:
+    """
+    The outcome of compiling one file: where the output went, how long it
+    took and, for a failure, the error message.
+    """
+    __slots__ = ('path', 'output', 'seconds', 'instructions', 'error')
+
+    def __init__(self, path, output, seconds, instructions=0, error=None):
+        self.path = path
+        self.output = output
+        self.seconds = seconds
+        self.instructions = instructions  # Optimized IR instructions
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def as_dict(self):
+        return {'path': self.path, 'output': self.output, 'seconds': self.seconds,
+                'instructions': self.instructions, 'error': self.error}
+
+
+def collect_sources(paths, output_dir=None, emit='object'):
+    """
+    Expands files and directories into sorted (source, output) pairs.
+    """
+    suffix = OUTPUT_SUFFIXES[emit]
+    tasks = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for directory, subdirectories, files in os.walk(path):
+                subdirectories.sort()
+                found += [os.path.join(directory, name) for name in files if name.endswith(SOURCE_SUFFIX)]
+            root = path
+        else:
+            found = [path]
+            root = os.path.dirname(path)
+        for source in sorted(found):
+            stem = os.path.splitext(source)[0]
+            if output_dir is not None:
+                stem = os.path.join(output_dir, os.path.relpath(stem, root))
+            tasks.append((source, stem + suffix))
+    return tasks
+
+
+# Per-process state of the workers, set by init_worker
+_level = DEFAULT_OPTIMIZATION_LEVEL
+_emit = 'object'
+_cache = None
+
+
+def init_worker(level, emit, cache_dir, cache_size):
+    global _level, _emit, _cache
+    _level = level
+    _emit = emit
+    _cache = CompileCache(cache_dir, cache_size) if cache_dir else None
+
+
+def write_text(path, lines):
+    with open(path, 'w') as file:
+        for line in lines:
+            file.write(f"{line}\n")
+
+
+def compile_file(task):
+    """
+    Compiles one (source, output) pair and returns its FileResult. Errors are
+    caught and recorded, so one bad file never stops the batch.
+    """
+    source, output = task
+    start = time.perf_counter()
+    try:
+        with open(source) as file:
+            compilation = Compilation(file.read(), _level, _cache)
+        directory = os.path.dirname(output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if _emit == 'object':
+            write_object(compilation.bytecode, output)
+        elif _emit == 'ir':
+            write_text(output, compilation.optimized_code)
+        else:
+            write_text(output, (format_target_instruction(instruction) for instruction in compilation.target_code))
+        instructions = len(compilation.optimized_code)
+    except Exception as e:
+        return FileResult(source, output, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+    return FileResult(source, output, time.perf_counter() - start, instructions)
+
+
+def compile_batch(tasks, jobs=None, level=DEFAULT_OPTIMIZATION_LEVEL, emit='object',
+                  cache_dir=None, cache_size=DEFAULT_MAX_BYTES):
+    """
+    Compiles (source, output) pairs across `jobs` processes (default: one
+    per CPU) and yields a FileResult for each, in task order.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    settings = (level, emit, cache_dir, cache_size)
+    if jobs == 1 or len(tasks) <= 1:
+        init_worker(*settings)
+        for task in tasks:
+            yield compile_file(task)
+        return
+    chunk_size = max(1, min(MAX_CHUNK_SIZE, len(tasks) // (jobs * 4)))
+    with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=settings) as executor:
+        yield from executor.map(compile_file, tasks, chunksize=chunk_size)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Compile MiniLang files in parallel")
+    parser.add_argument("paths", nargs="+", metavar="PATH", help=f"source files or directories of *{SOURCE_SUFFIX} files")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("-O", dest="level", type=int, choices=sorted(OPTIMIZATION_LEVELS),
+                        default=DEFAULT_OPTIMIZATION_LEVEL, help="optimization level (default: %(default)s)")
+    parser.add_argument("--emit", choices=sorted(OUTPUT_SUFFIXES), default="object",
+                        help="object file, optimized IR or target assembly (default: %(default)s)")
+    parser.add_argument("--output-dir", metavar="DIR",
+                        help="write outputs under DIR instead of next to the sources")
+    parser.add_argument("--cache-dir", metavar="DIR", default=os.environ.get("MINILANG_CACHE_DIR"),
+                        help="reuse compiler phase results stored in DIR (default: $MINILANG_CACHE_DIR)")
+    parser.add_argument("--cache-size", metavar="MB", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="evict least recently used cache entries beyond this size (default: %(default)s)")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="only print failures and the summary")
+    parser.add_argument("--report", metavar="FILE",
+                        help="write per-file results and timings as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    tasks = collect_sources(args.paths, args.output_dir, args.emit)
+    if not tasks:
+        print(f"No *{SOURCE_SUFFIX} files found")
+        return 1
+
+    start = time.perf_counter()
+    results = []
+    for result in compile_batch(tasks, args.jobs, args.level, args.emit,
+                                args.cache_dir, args.cache_size * 1024 * 1024):
+        results.append(result)
+        if not result.ok:
+            print(f"FAIL {result.seconds * 1000:9.2f} ms  {result.path}: {result.error}")
+        elif not args.quiet:
+            print(f"ok   {result.seconds * 1000:9.2f} ms  {result.path} -> {result.output}")
+    elapsed = time.perf_counter() - start
+
+    failures = [result for result in results if not result.ok]
+    compile_seconds = sum(result.seconds for result in results)
+    print(f"\n{len(results)} files, {len(results) - len(failures)} compiled, {len(failures)} failed "
+          f"in {elapsed:.2f}s ({compile_seconds:.2f}s of compile time, {len(results) / elapsed:,.0f} files/s)")
+    if results:
+        slowest = max(results, key=lambda result: result.seconds)
+        print(f"slowest: {slowest.path} ({slowest.seconds * 1000:.2f} ms)")
+
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump({'elapsed': elapsed, 'files': [result.as_dict() for result in results]}, file, indent=1)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,693 @@
+"""
+Benchmarks for the MiniLang compiler phases.
+
+Usage:
+    python benchmark.py lexer [--size-mb N]
+    python benchmark.py parser [--size-mb N]
+    python benchmark.py icg [--size-mb N]
+    python benchmark.py dataflow [--instructions N]
+    python benchmark.py optimizer [--instructions N] [-O LEVEL]
+    python benchmark.py backend [--instructions N]
+    python benchmark.py vm [--iterations N]
+    python benchmark.py object [--instructions N]
+    python benchmark.py cache [--size-kb N]
+    python benchmark.py symbols [--depth N] [--names N]
+    python benchmark.py generate [--seed N] [--statements N] [--depth N] [--expression-size N] [--loop-density P]
+    python benchmark.py suite [generator options] [-O LEVEL] [--repeat N] [--save FILE] [--baseline FILE]
+
+`suite` times every compiler phase on a generated program and reports its
+throughput and peak memory. With --baseline it compares against results
+saved earlier with --save and exits with status 1 on a regression.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from lexer import lexer, lex_file
+
+SAMPLE_DECLARATIONS = """
+var a;
+var b;
+"""
+
+SAMPLE_STATEMENTS = """a = 5;
+b = 10;  # running total
+if (a + b > 10) {
+    print(a);
+} else {
+    while (b < 100) {
+        b = b + a * 2;
+    }
+    print(b);
+}
+"""
+
+SAMPLE_PROGRAM = SAMPLE_DECLARATIONS + SAMPLE_STATEMENTS
+
+
+def make_source(size_bytes):
+    """
+    Builds a MiniLang source of at least `size_bytes` bytes by repeating the
+    sample program's statements (its variables are declared once, so the
+    result passes semantic analysis).
+    """
+    repeats = size_bytes // len(SAMPLE_STATEMENTS) + 1
+    return SAMPLE_DECLARATIONS + SAMPLE_STATEMENTS * repeats
+
+
+def time_call(function):
+    """
+    Runs `function` once and returns (result, elapsed seconds).
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def count_tokens(tokens):
+    count = 0
+    for _ in tokens:
+        count += 1
+    return count
+
+
+def report(name, count, seconds, unit="tokens"):
+    rate = count / seconds if seconds else float('inf')
+    print(f"{name:<28} {count:>10} {unit} {seconds:8.3f}s {rate:14,.0f} {unit}/s")
+
+
+def bench_lexer(size_mb):
+    code = make_source(int(size_mb * 1024 * 1024))
+    print(f"Lexer benchmark on {len(code) / (1024 * 1024):.1f} MB of source")
+
+    fd, path = tempfile.mkstemp(suffix=".ml")
+    try:
+        with os.fdopen(fd, "w") as source_file:
+            source_file.write(code)
+
+        # The previous generator printed every match; debug mode reproduces that cost
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            count, seconds = time_call(lambda: count_tokens(lexer(code, debug=True)))
+        report("lexer (debug tracing)", count, seconds)
+
+        count, seconds = time_call(lambda: count_tokens(lexer(code)))
+        report("lexer (string)", count, seconds)
+
+        count, seconds = time_call(lambda: count_tokens(lex_file(path)))
+        report("lex_file (chunked)", count, seconds)
+
+        count, seconds = time_call(lambda: count_tokens(lex_file(path, use_mmap=True)))
+        report("lex_file (mmap)", count, seconds)
+    finally:
+        os.remove(path)
+
+
+def bench_parser(size_mb):
+    from Parser_2 import Parser
+
+    code = make_source(int(size_mb * 1024 * 1024))
+    tokens = list(lexer(code))
+    print(f"Parser benchmark on {len(tokens)} tokens")
+
+    _, seconds = time_call(lambda: Parser(tokens).parse_program())
+    report("Parser.parse_program", len(tokens), seconds)
+
+    tracemalloc.start()
+    root = Parser(tokens).parse_program()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{len(root.tree)} AST nodes, peak memory while parsing {peak / (1024 * 1024):.1f} MB")
+
+    # Deeply nested expressions are parsed and printed without recursion
+    depth = 10000
+    nested = "x = " + "(" * depth + "1" + " + 1)" * depth + ";"
+    root, seconds = time_call(lambda: Parser(lexer(nested)).parse_program())
+    report(f"nested expression (depth {depth})", len(root.tree), seconds, unit="nodes")
+    _, seconds = time_call(root.generate_code)
+    report("generate_code (nested)", len(root.tree), seconds, unit="nodes")
+
+
+def bench_icg(size_mb):
+    from Parser_2 import Parser
+    from ICG import IntermediateCodeGenerator
+
+    code = make_source(int(size_mb * 1024 * 1024))
+    root = Parser(lexer(code)).parse_program()
+    print(f"ICG benchmark on {len(root.children)} top-level statements")
+
+    icg = IntermediateCodeGenerator()
+    instructions, seconds = time_call(lambda: icg.generate_code_for_program(root))
+    report("generate_code_for_program", len(instructions), seconds, unit="instrs")
+
+
+def generate_ir(instruction_count):
+    """
+    Lowers repeated copies of the sample program until there are at least
+    `instruction_count` IR instructions.
+    """
+    from Parser_2 import Parser
+    from ICG import IntermediateCodeGenerator
+
+    icg = IntermediateCodeGenerator()
+    per_copy = len(IntermediateCodeGenerator().generate_code_for_program(Parser(lexer(SAMPLE_PROGRAM)).parse_program()))
+    code = SAMPLE_PROGRAM * (instruction_count // per_copy + 1)
+    return icg.generate_code_for_program(Parser(lexer(code)).parse_program())
+
+
+def bench_dataflow(instruction_count):
+    from ControlFlowGraph import ControlFlowGraph
+    from DataFlow import Liveness, ReachingDefinitions
+    from Optimizer import Optimizer
+
+    instructions = generate_ir(instruction_count)
+    print(f"Dataflow benchmark on {len(instructions)} IR instructions")
+
+    cfg, seconds = time_call(lambda: ControlFlowGraph(instructions))
+    report(f"CFG build ({len(cfg.blocks)} blocks)", len(instructions), seconds, unit="instrs")
+    _, seconds = time_call(lambda: Liveness(cfg).solve())
+    report("liveness", len(instructions), seconds, unit="instrs")
+    _, seconds = time_call(lambda: ReachingDefinitions(cfg).solve())
+    report("reaching definitions", len(instructions), seconds, unit="instrs")
+    optimizer = Optimizer(list(instructions))
+    _, seconds = time_call(optimizer.eliminate_dead_code)
+    report("eliminate_dead_code", len(instructions), seconds, unit="instrs")
+    _, seconds = time_call(lambda: Optimizer(list(instructions)).optimize())
+    report("Optimizer.optimize", len(instructions), seconds, unit="instrs")
+
+
+def bench_optimizer(instruction_count, level):
+    from Optimizer import Optimizer
+
+    instructions = generate_ir(instruction_count)
+    print(f"Optimizer benchmark on {len(instructions)} IR instructions at -O{level}")
+    optimizer = Optimizer(list(instructions))
+    _, seconds = time_call(lambda: optimizer.optimize(level))
+    report("Optimizer.optimize", len(instructions), seconds, unit="instrs")
+    optimizer.pass_manager.print_statistics()
+
+
+def count_memory_operands(target_code):
+    from TargetCodeGenerator import is_memory
+
+    return sum(1 for instruction in target_code for operand in instruction[1:] if is_memory(operand))
+
+
+def bench_backend(instruction_count):
+    from TargetCodeGenerator import TargetCodeGenerator
+
+    for count in (instruction_count // 4, instruction_count // 2, instruction_count):
+        instructions = generate_ir(count)
+        print(f"Backend on {len(instructions)} IR instructions")
+        for name, registers in (("no registers", ()), ("linear scan", None)):
+            generator = TargetCodeGenerator() if registers is None else TargetCodeGenerator(registers=registers)
+            target_code, seconds = time_call(lambda: generator.generate_target_code(instructions))
+            report(f"  {name}", len(instructions), seconds, unit="instrs")
+            print(f"    {len(target_code)} target instructions, {count_memory_operands(target_code)} memory operands")
+
+
+LOOP_PROGRAM = """
+var i;
+var s;
+var n;
+n = %d;
+i = 0;
+s = 0;
+while (i < n) {
+    s = s + i * 2 / 3;
+    if (s > 1000000) {
+        s = s - 1000000;
+    }
+    i = i + 1;
+}
+print(s);
+"""
+
+
+class NaiveInterpreter:
+    """
+    Baseline for the VM benchmark: walks Parser_2.Node views recursively and
+    keeps variables in a dict, dispatching on node type names.
+    """
+
+    def __init__(self, output_function=print):
+        from ICG import BINARY_OPERATIONS, make_operand
+        from VirtualMachine import parse_input
+
+        self.variables = {}
+        self.output_function = output_function
+        self.operations = BINARY_OPERATIONS
+        self.make_operand = make_operand
+        self.parse_input = parse_input
+
+    def execute(self, node):
+        node_type = node.node_type
+        if node_type == 'program' or node_type == 'block':
+            for child in node.children:
+                self.execute(child)
+        elif node_type == 'assign':
+            self.variables[node.value] = self.evaluate(node.children[0])
+        elif node_type == 'if':
+            children = node.children
+            if self.evaluate(children[0]) != 0:
+                self.execute(children[1])
+            elif len(children) > 2:
+                self.execute(children[2])
+        elif node_type == 'while':
+            condition, body = node.children
+            while self.evaluate(condition) != 0:
+                self.execute(body)
+        elif node_type == 'print':
+            self.output_function(self.evaluate(node.children[0]))
+        elif node_type == 'input':
+            self.variables[node.value] = self.parse_input(input())
+
+    def evaluate(self, node):
+        node_type = node.node_type
+        if node_type == 'number':
+            return self.make_operand(node.value)
+        if node_type == 'id':
+            return self.variables.get(node.value, 0)
+        left, right = node.children
+        return self.operations[node_type](self.evaluate(left), self.evaluate(right))
+
+
+def bench_vm(iterations):
+    from Parser_2 import Parser
+    from ICG import IntermediateCodeGenerator
+    from Optimizer import Optimizer
+    from VirtualMachine import compile_bytecode, VirtualMachine
+    from PythonBackend import PythonBackend
+
+    source = LOOP_PROGRAM % iterations
+    root = Parser(lexer(source)).parse_program()
+    print(f"Execution benchmark: loop of {iterations} iterations")
+    outputs = []
+
+    interpreter = NaiveInterpreter(outputs.append)
+    _, baseline = time_call(lambda: interpreter.execute(root))
+    report("AST-walking interpreter", iterations, baseline, unit="iters")
+
+    for level in (0, 2):
+        instructions = Optimizer(IntermediateCodeGenerator().generate_code_for_program(root)).optimize(level)
+        bytecode = compile_bytecode(instructions)
+        vm = VirtualMachine(bytecode, output_function=outputs.append)
+        _, seconds = time_call(vm.run)
+        report(f"bytecode VM -O{level}", iterations, seconds, unit="iters")
+        print(f"    {len(bytecode)} instructions, {vm.steps} executed, {baseline / seconds:.1f}x faster")
+
+    backend = PythonBackend()
+    program, compile_seconds = time_call(lambda: backend.compile_source(source))
+    _, cached_seconds = time_call(lambda: backend.compile_source(source))
+    _, seconds = time_call(lambda: program.run(output_function=outputs.append))
+    report("Python backend", iterations, seconds, unit="iters")
+    print(f"    {baseline / seconds:.1f}x faster; compiled in {compile_seconds * 1000:.2f} ms, "
+          f"{cached_seconds * 1000:.3f} ms from cache")
+    if len(set(outputs)) != 1:
+        print(f"  Output mismatch: {outputs}")
+
+
+def bench_object(instruction_count):
+    from ICG import IntermediateCodeGenerator
+    from Parser_2 import Parser
+    from VirtualMachine import compile_bytecode
+    from ObjectFile import ObjectFile, write_object
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in (instruction_count // 100, instruction_count // 10, instruction_count):
+            per_copy = len(IntermediateCodeGenerator().generate_code_for_program(
+                Parser(lexer(SAMPLE_PROGRAM)).parse_program()))
+            code = SAMPLE_PROGRAM * (count // per_copy + 1)
+            bytecode = compile_bytecode(IntermediateCodeGenerator().generate_code_for_program(
+                Parser(lexer(code)).parse_program()))
+            path = os.path.join(directory, f"program_{count}.mlo")
+            size, write_seconds = time_call(lambda: write_object(bytecode, path))
+
+            def load():
+                with ObjectFile.open(path) as obj:
+                    return obj.instruction(len(bytecode) - 1)
+
+            loads = 200
+            _, seconds = time_call(lambda: [load() for _ in range(loads)])
+            print(f"{len(bytecode):>9} instructions {size:>11,} bytes  write {write_seconds * 1000:8.2f} ms  "
+                  f"open + last instruction {seconds / loads * 1e6:8.1f} us")
+
+
+class ProgramGenerator:
+    """
+    Generates valid MiniLang programs from a seed, so every run of a
+    benchmark compiles exactly the same input. `statements` is the total
+    number of statements (nested ones included), `max_depth` how deeply
+    if/while may nest, `expression_size` the number of operators in an
+    expression and `loop_density` the chance that a statement is a loop.
+    Loops count a variable of their own up to a small bound, and divisors
+    and multipliers are small constants, so generated programs also run to
+    completion in reasonable time.
+    """
+    ARITHMETIC = ('+', '-', '*', '/')
+    RELATIONAL = ('<', '>', '<=', '>=', '==', '!=')
+    LOGICAL = ('&&', '||')
+    IF_DENSITY = 0.15
+    PRINT_DENSITY = 0.1
+    VARIABLES = 8
+
+    def __init__(self, seed=0, statements=1000, max_depth=3, expression_size=4, loop_density=0.2):
+        self.random = random.Random(seed)
+        self.statements = statements
+        self.max_depth = max_depth
+        self.expression_size = expression_size
+        self.loop_density = loop_density
+
+    def generate(self):
+        """
+        Returns the source text of one program.
+        """
+        lines = [f"var v{i};" for i in range(self.VARIABLES)]
+        lines += [f"var c{depth};" for depth in range(self.max_depth)]
+        lines += [f"v{i} = {self.random.randint(1, 100)};" for i in range(self.VARIABLES)]
+        self.remaining = self.statements
+        while self.remaining > 0:
+            self.statement(lines, 0)
+        return "\n".join(lines) + "\n"
+
+    def statement(self, lines, depth):
+        self.remaining -= 1
+        indent = "    " * depth
+        choice = self.random.random()
+        if depth < self.max_depth and choice < self.loop_density:
+            counter = f"c{depth}"
+            lines.append(f"{indent}{counter} = 0;")
+            lines.append(f"{indent}while ({counter} < {self.random.randint(2, 10)}) {{")
+            self.block(lines, depth + 1)
+            lines.append(f"{indent}    {counter} = {counter} + 1;")
+            lines.append(f"{indent}}}")
+        elif depth < self.max_depth and choice < self.loop_density + self.IF_DENSITY:
+            lines.append(f"{indent}if ({self.condition()}) {{")
+            self.block(lines, depth + 1)
+            if self.random.random() < 0.5:
+                lines.append(f"{indent}}} else {{")
+                self.block(lines, depth + 1)
+            lines.append(f"{indent}}}")
+        elif choice > 1 - self.PRINT_DENSITY:
+            lines.append(f"{indent}print({self.expression()});")
+        else:
+            lines.append(f"{indent}v{self.random.randrange(self.VARIABLES)} = {self.expression()};")
+
+    def block(self, lines, depth):
+        for _ in range(self.random.randint(1, 4)):
+            if self.remaining <= 0:
+                break
+            self.statement(lines, depth)
+        if self.remaining <= 0 and lines[-1].endswith("{"):
+            lines.append("    " * depth + "v0 = v0 + 1;")
+
+    def operand(self):
+        if self.random.random() < 0.6:
+            return f"v{self.random.randrange(self.VARIABLES)}"
+        return str(self.random.randint(0, 50))
+
+    def expression(self, operators=None):
+        """
+        Returns a fully parenthesized expression with `operators` operators.
+        """
+        rnd = self.random
+        operands = [self.operand() for _ in range((self.expression_size if operators is None else operators) + 1)]
+        while len(operands) > 1:
+            i = rnd.randrange(len(operands) - 1)
+            op = rnd.choice(self.ARITHMETIC)
+            right = operands.pop(i + 1)
+            if op == '/' or op == '*':
+                right = str(rnd.randint(1, 9))  # Never divide by zero; values grow at most geometrically
+            operands[i] = f"({operands[i]} {op} {right})"
+        return operands[0]
+
+    def condition(self):
+        rnd = self.random
+        half = max(0, self.expression_size // 2 - 1)
+        text = f"{self.expression(half)} {rnd.choice(self.RELATIONAL)} {self.expression(half)}"
+        if rnd.random() < 0.3:
+            text = f"({text}) {rnd.choice(self.LOGICAL)} ({self.operand()} {rnd.choice(self.RELATIONAL)} {self.operand()})"
+        return text
+
+
+def generate_program(args):
+    return ProgramGenerator(args.seed, args.statements, args.depth, args.expression_size,
+                            args.loop_density).generate()
+
+
+def measure(function, repeat):
+    """
+    Returns (result, best seconds of `repeat` runs, peak traced bytes of one more run).
+    Like timeit, the runs are timed with the garbage collector off, so a
+    collection triggered by earlier phases does not land in this one.
+    Memory is traced in a separate run, since tracemalloc slows everything down.
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            result, seconds = time_call(function)
+        finally:
+            gc.enable()
+        best = seconds if best is None else min(best, seconds)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, best, peak
+
+
+def run_suite(source, level, repeat):
+    """
+    Times each phase on its own, feeding it the previous phase's output.
+    Returns {phase: {'seconds', 'items', 'unit', 'peak_bytes'}} in phase order.
+    """
+    from Parser_2 import Parser
+    from semantic_analyzer import SemanticAnalyzer
+    from ICG import IntermediateCodeGenerator
+    from Optimizer import Optimizer
+    from TargetCodeGenerator import TargetCodeGenerator
+
+    results = {}
+
+    def phase(name, function, items, unit):
+        result, seconds, peak = measure(function, repeat)
+        results[name] = {'seconds': seconds, 'items': items, 'unit': unit, 'peak_bytes': peak}
+        return result
+
+    tokens = phase("lexer", lambda: list(lexer(source)), len(source), "bytes")
+    root = phase("parser", lambda: Parser(tokens).parse_program(), len(tokens), "tokens")
+
+    phase("semantic", lambda: SemanticAnalyzer().analyze(root), len(root.tree), "nodes")
+    instructions = phase("icg", lambda: IntermediateCodeGenerator().generate_code_for_program(root),
+                         len(root.tree), "nodes")
+    optimized = phase("optimizer", lambda: Optimizer(list(instructions)).optimize(level), len(instructions), "instrs")
+    phase("target", lambda: TargetCodeGenerator().generate_target_code(optimized), len(optimized), "instrs")
+    return results
+
+
+def print_suite(results, baseline=None, tolerance=0.0):
+    """
+    Prints one line per phase, with the change against `baseline` when given.
+    Returns the phases that are slower or use more memory than the baseline
+    by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    print(f"{'phase':<12} {'items':>10} {'unit':<7} {'time':>10} {'rate':>14} {'peak memory':>12}")
+    for name, result in results.items():
+        rate = result['items'] / result['seconds'] if result['seconds'] else float('inf')
+        line = (f"{name:<12} {result['items']:>10} {result['unit']:<7} {result['seconds'] * 1000:8.2f}ms "
+                f"{rate:12,.0f}/s {result['peak_bytes'] / (1024 * 1024):9.2f} MB")
+        old = baseline.get(name) if baseline else None
+        if old:
+            time_ratio = result['seconds'] / old['seconds'] if old['seconds'] else 1.0
+            memory_ratio = result['peak_bytes'] / old['peak_bytes'] if old['peak_bytes'] else 1.0
+            line += f"   time {time_ratio - 1:+7.1%}  memory {memory_ratio - 1:+7.1%}"
+            if time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+def bench_suite(args):
+    """
+    Runs the per-phase suite; returns False if --baseline found a regression.
+    """
+    source = generate_program(args)
+    config = {'seed': args.seed, 'statements': args.statements, 'depth': args.depth,
+              'expression_size': args.expression_size, 'loop_density': args.loop_density, 'level': args.level}
+    print(f"Phase benchmark: {len(source):,} bytes of generated source, -O{args.level}, "
+          f"best of {args.repeat} run(s)")
+    results = run_suite(source, args.level, args.repeat)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            saved = json.load(file)
+        if saved['config'] != config:
+            print(f"Baseline {args.baseline} was measured on a different program: {saved['config']}")
+            return False
+        baseline = saved['phases']
+    regressions = print_suite(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump({'config': config, 'phases': results}, file, indent=1)
+        print(f"Saved results to {args.save}")
+    if regressions:
+        print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return False
+    return True
+
+
+def bench_symbols(depth, names):
+    from symbol_table import SymbolTable
+
+    variables = [f"v{i}" for i in range(names)]
+    print(f"Symbol table benchmark: {depth} nested scopes, {names} names each")
+
+    def nest():
+        table = SymbolTable()
+        for _ in range(depth):
+            table.enter_scope()
+            for name in variables:
+                table.declare(name)
+        for _ in range(depth):
+            for name in variables:
+                table.lookup(name)
+            table.leave_scope()
+        return table
+
+    table, seconds = time_call(nest)
+    report("declare + lookup + leave", depth * names, seconds, unit="names")
+
+    # A lookup costs the same however deep the scope that declared the name
+    table = SymbolTable()
+    table.declare("outer")
+    for _ in range(depth):
+        table.enter_scope()
+    lookups = 1000000
+    _, seconds = time_call(lambda: [table.lookup("outer") for _ in range(lookups)])
+    report(f"lookup at depth {depth}", lookups, seconds, unit="lookups")
+
+
+def bench_cache(size_kb):
+    from Compiler import Compilation
+    from CompileCache import CompileCache
+
+    code = make_source(int(size_kb * 1024))
+    with tempfile.TemporaryDirectory() as directory:
+        cache = CompileCache(directory)
+        _, uncached = time_call(lambda: Compilation(code).target_code)
+        _, cold = time_call(lambda: Compilation(code, cache=cache).target_code)
+        _, warm = time_call(lambda: Compilation(code, cache=cache).target_code)
+
+        def warm_main():
+            # What main.py needs on a hit: the tokens and AST too, since it prints them
+            compilation = Compilation(code, cache=cache)
+            return compilation.tokens, compilation.tree, compilation.optimized_code, compilation.target_code
+
+        _, warm_all = time_call(warm_main)
+        size = sum(entry[1] for entry in cache.entries())
+    print(f"{len(code):,} bytes of source, {size:,} bytes cached")
+    print(f"{'no cache':<28} {uncached * 1000:10.2f} ms")
+    print(f"{'cold cache (miss + write)':<28} {cold * 1000:10.2f} ms")
+    print(f"{'warm cache (target code)':<28} {warm * 1000:10.2f} ms  {uncached / warm:8.1f}x")
+    print(f"{'warm cache (all phases)':<28} {warm_all * 1000:10.2f} ms  {uncached / warm_all:8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MiniLang compiler benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    lexer_parser = subparsers.add_parser("lexer", help="tokens per second of the lexer entry points")
+    lexer_parser.add_argument("--size-mb", type=float, default=4.0)
+
+    parser_parser = subparsers.add_parser("parser", help="tokens per second of Parser.parse_program")
+    parser_parser.add_argument("--size-mb", type=float, default=1.0)
+
+    icg_parser = subparsers.add_parser("icg", help="instructions per second of the AST lowering")
+    icg_parser.add_argument("--size-mb", type=float, default=1.0)
+
+    dataflow_parser = subparsers.add_parser("dataflow", help="CFG construction, dataflow analyses and optimizer passes")
+    dataflow_parser.add_argument("--instructions", type=int, default=50000)
+
+    optimizer_parser = subparsers.add_parser("optimizer", help="time and effect of every pass at an optimization level")
+    optimizer_parser.add_argument("--instructions", type=int, default=50000)
+    optimizer_parser.add_argument("-O", dest="level", type=int, default=2)
+
+    backend_parser = subparsers.add_parser("backend", help="register allocation and instruction selection")
+    backend_parser.add_argument("--instructions", type=int, default=200000)
+
+    vm_parser = subparsers.add_parser("vm", help="bytecode VM and Python backend against an AST-walking interpreter")
+    vm_parser.add_argument("--iterations", type=int, default=200000)
+
+    object_parser = subparsers.add_parser("object", help="object file write and load times by program size")
+    object_parser.add_argument("--instructions", type=int, default=500000)
+
+    cache_parser = subparsers.add_parser("cache", help="compile time with a cold and a warm phase cache")
+    cache_parser.add_argument("--size-kb", type=float, default=64.0)
+
+    symbols_parser = subparsers.add_parser("symbols", help="scope entry/exit and lookups of the symbol table")
+    symbols_parser.add_argument("--depth", type=int, default=10000)
+    symbols_parser.add_argument("--names", type=int, default=20)
+
+    def add_generator_options(subparser):
+        subparser.add_argument("--seed", type=int, default=0)
+        subparser.add_argument("--statements", type=int, default=5000)
+        subparser.add_argument("--depth", type=int, default=3, help="maximum if/while nesting")
+        subparser.add_argument("--expression-size", type=int, default=4, help="operators per expression")
+        subparser.add_argument("--loop-density", type=float, default=0.2, help="chance that a statement is a loop")
+
+    generate_parser = subparsers.add_parser("generate", help="print a generated MiniLang program")
+    add_generator_options(generate_parser)
+
+    suite_parser = subparsers.add_parser("suite", help="time and peak memory of every phase on a generated program")
+    add_generator_options(suite_parser)
+    suite_parser.add_argument("-O", dest="level", type=int, default=2)
+    suite_parser.add_argument("--repeat", type=int, default=3, help="runs per phase; the fastest counts")
+    suite_parser.add_argument("--save", metavar="FILE", help="write the results as a JSON baseline")
+    suite_parser.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    suite_parser.add_argument("--tolerance", type=float, default=0.2,
+                              help="allowed slowdown or memory growth before a regression (default: %(default)s)")
+
+    args = parser.parse_args()
+    if args.benchmark == "lexer":
+        bench_lexer(args.size_mb)
+    elif args.benchmark == "parser":
+        bench_parser(args.size_mb)
+    elif args.benchmark == "icg":
+        bench_icg(args.size_mb)
+    elif args.benchmark == "dataflow":
+        bench_dataflow(args.instructions)
+    elif args.benchmark == "optimizer":
+        bench_optimizer(args.instructions, args.level)
+    elif args.benchmark == "backend":
+        bench_backend(args.instructions)
+    elif args.benchmark == "vm":
+        bench_vm(args.iterations)
+    elif args.benchmark == "object":
+        bench_object(args.instructions)
+    elif args.benchmark == "cache":
+        bench_cache(args.size_kb)
+    elif args.benchmark == "symbols":
+        bench_symbols(args.depth, args.names)
+    elif args.benchmark == "generate":
+        sys.stdout.write(generate_program(args))
+    elif args.benchmark == "suite":
+        if not bench_suite(args):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
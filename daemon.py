@@ -0,0 +1,118 @@
+"""
+A long-running MiniLang compiler server.
+
+Usage:
+    python daemon.py serve [--socket PATH] [-j N] [--cache-dir DIR]
+    python daemon.py compile FILE [--socket PATH] [-O LEVEL] [--emit ir,target]
+    python daemon.py stop [--socket PATH]
+
+The server listens on a Unix socket and keeps worker processes with the
+compiler already imported, so a request pays neither interpreter startup
+nor imports. The protocol is one JSON object per line in each direction;
+requests on one connection may be answered out of order and are matched
+by their "id":
+
+    {"id": 1, "source": "var x; x = 1; print(x);", "level": 2, "emit": ["target"]}
+    {"id": 1, "ok": true, "target": ["mov ebx, 1", ...], "diagnostics": [], "seconds": 0.0004}
+
+A program that does not compile gets "ok": false and its errors in
+"diagnostics", each with a severity, a message and, when known, a line and
+column. Warnings are reported there too, also for programs that compile.
+{"op": "ping"}, {"op": "stats"} and {"op": "shutdown"} are also accepted.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# The server and the compiler are imported by `serve` only, so the
+# `compile` and `stop` clients start as fast as the interpreter does.
+
+DEFAULT_SOCKET = os.environ.get("MINILANG_DAEMON_SOCKET") or os.path.join(
+    tempfile.gettempdir(), f"minilang-{os.getuid()}.sock")
+
+# Copies of Optimizer.DEFAULT_OPTIMIZATION_LEVEL, CompileCache.DEFAULT_MAX_BYTES
+# and CompilerServer.EMIT_KINDS, which the clients do not import
+DEFAULT_OPTIMIZATION_LEVEL = 2
+DEFAULT_CACHE_MB = 256
+EMIT_KINDS = ('tokens', 'ir', 'target', 'bytecode')
+
+
+def request(message, socket_path=DEFAULT_SOCKET):
+    """
+    Sends one request to a running daemon and returns its response (a blocking client for scripts and tests).
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(message).encode() + b'\n')
+        with client.makefile('rb') as responses:
+            return json.loads(responses.readline())
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="MiniLang compiler daemon")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET,
+                        help="Unix socket path (default: $MINILANG_DAEMON_SOCKET or %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the daemon in the foreground")
+    serve_parser.add_argument("-j", "--jobs", type=int, default=None,
+                              help="worker processes (default: one per CPU)")
+    serve_parser.add_argument("--cache-dir", metavar="DIR", default=os.environ.get("MINILANG_CACHE_DIR"),
+                              help="reuse compiler phase results stored in DIR (default: $MINILANG_CACHE_DIR)")
+    serve_parser.add_argument("--cache-size", metavar="MB", type=int, default=DEFAULT_CACHE_MB,
+                              help="evict least recently used cache entries beyond this size (default: %(default)s)")
+
+    compile_parser = commands.add_parser("compile", help="compile a file on a running daemon")
+    compile_parser.add_argument("file")
+    compile_parser.add_argument("-O", dest="level", type=int, default=DEFAULT_OPTIMIZATION_LEVEL,
+                                help="optimization level (default: %(default)s)")
+    compile_parser.add_argument("--emit", default="target",
+                                help=f"comma-separated outputs from {', '.join(EMIT_KINDS)} (default: %(default)s)")
+
+    commands.add_parser("stop", help="ask a running daemon to shut down")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    if args.command == "serve":
+        import asyncio
+        from CompilerServer import CompilerServer
+
+        server = CompilerServer(args.socket, args.jobs, args.cache_dir, args.cache_size * 1024 * 1024)
+        try:
+            asyncio.run(server.serve())
+        except RuntimeError as e:
+            print(e)
+            return 1
+        return 0
+
+    message = {'op': 'shutdown'}
+    if args.command == "compile":
+        try:
+            with open(args.file) as file:
+                message = {'source': file.read(), 'level': args.level, 'emit': args.emit.split(',')}
+        except OSError as e:
+            print(f"Cannot read {args.file}: {e}")
+            return 1
+    try:
+        response = request(message, args.socket)
+    except OSError as e:
+        print(f"Cannot reach the compiler daemon on {args.socket}: {e}")
+        return 1
+    if args.command == "stop":
+        return 0
+    for kind in EMIT_KINDS:
+        for line in response.get(kind, ()):
+            print(line)
+    for error in response['diagnostics']:
+        position = f"{args.file}:{error['line']}:{error['column']}: " if 'line' in error else f"{args.file}: "
+        print(f"{position}{error['severity']}: {error['message']}")
+    return 0 if response['ok'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
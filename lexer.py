@@ -1,46 +1,193 @@
+import mmap
 import re
+import sys
 from collections import namedtuple
 
-# Define the Token structure
-Token = namedtuple('Token', ['type', 'value'])
+# Define the Token structure (type is an integer token kind; line and column are 1-based)
+Token = namedtuple('Token', ['type', 'value', 'line', 'column'])
 
-# Define token patterns
+
+class Diagnostic(namedtuple('Diagnostic', ['severity', 'message', 'line', 'column'])):
+    """
+    A problem found in a program: severity is 'error' or 'warning'.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        return f"{self.message} at line {self.line}, column {self.column}"
+
+
+# Token kinds. Keywords, operators and delimiters each get their own kind so the
+# parser can dispatch on a small integer instead of comparing strings.
+(ID, NUMBER, STRING,
+ VAR, INT, FLOAT, IF, ELSE, WHILE, FUNCTION, RETURN, PRINT, DEF, INPUT, MOMO,
+ ASSIGN, PLUS, MINUS, STAR, SLASH, LT, GT, LE, GE, EQ, NE, AND, OR, NOT,
+ SEMI, COMMA, LPAREN, RPAREN, LBRACE, RBRACE,
+ EOF, ILLEGAL) = range(37)
+
+# Keyword and symbol lookup tables (lexeme -> token kind)
+KEYWORDS = {
+    'var': VAR, 'int': INT, 'float': FLOAT, 'if': IF, 'else': ELSE, 'while': WHILE,
+    'function': FUNCTION, 'return': RETURN, 'print': PRINT, 'def': DEF,
+    'input': INPUT, 'momo': MOMO,
+}
+SYMBOLS = {
+    '=': ASSIGN, '+': PLUS, '-': MINUS, '*': STAR, '/': SLASH,
+    '<': LT, '>': GT, '<=': LE, '>=': GE, '==': EQ, '!=': NE,
+    '&&': AND, '||': OR, '!': NOT,
+    ';': SEMI, ',': COMMA, '(': LPAREN, ')': RPAREN, '{': LBRACE, '}': RBRACE,
+}
+
+# Display name of every kind, and the token category the earlier phases expect
+KIND_NAMES = ['ID', 'NUMBER', 'STRING'] + list(KEYWORDS) + list(SYMBOLS) + ['EOF', 'ILLEGAL']
+KIND_CATEGORIES = (['ID', 'NUMBER', 'STRING'] + ['KEYWORD'] * len(KEYWORDS) + ['ASSIGN']
+                   + ['OPERATOR'] * (NOT - PLUS + 1) + ['DELIM'] * (RBRACE - SEMI + 1) + ['EOF', 'ILLEGAL'])
+
+# Define token patterns. Keywords are matched as names and resolved through KEYWORDS.
 token_specification = [
-    ('KEYWORD',  r'\b(momo|int|float|var|if|else|while|function|return|print|def|input)\b'),
-    ('NUMBER',   r'\d+(\.\d*)?'),
-    ('ASSIGN',   r'='),
-    ('ID',       r'[A-Za-z_][A-Za-z0-9_]*'),
-    ('STRING',   r'"[^"\n]*"'),            
-    ('OPERATOR', r'(==|!=|<=|>=|&&|\|\||[\+\-\*/<>\!])'),
-    ('DELIM',    r'[;,\(\)\{\}]'),
-    ('COMMENT',  r'#.*'),
-    ('NEWLINE',  r'\n'),
-    ('WHITESPACE', r'\s+'),
-    ('MISMATCH', r'.'),
+    ('NAME',       r'[A-Za-z_][A-Za-z0-9_]*'),
+    ('NUMBER',     r'\d+(?:\.\d*)?'),
+    ('STRING',     r'"[^"\n]*"'),
+    ('SYMBOL',     r'==|!=|<=|>=|&&|\|\||[=\+\-\*/<>\!;,\(\)\{\}]'),
+    ('COMMENT',    r'#.*'),
+    ('NEWLINE',    r'\n'),
+    ('WHITESPACE', r'[ \t\r\f\v]+'),
+    ('MISMATCH',   r'.'),
 ]
 
-# Combine the patterns into a single regex
+# Combine the patterns into a single regex; match.lastindex identifies the pattern
 master_pattern = '|'.join(f'(?P<{pair[0]}>{pair[1]})' for pair in token_specification)
+master_regex = re.compile(master_pattern)
+(_NAME, _NUMBER, _STRING, _SYMBOL, _COMMENT, _NEWLINE, _WHITESPACE, _MISMATCH) = range(1, 9)
 
-# Define the lexer function
-def lexer(code):
-    line_num = 1
+
+def kind_name(kind):
+    """
+    Returns a readable name for a token kind (e.g. 'ID' or 'while').
+    """
+    return KIND_NAMES[kind]
+
+
+def token_category(kind):
+    """
+    Returns the category of a token kind: KEYWORD, ID, NUMBER, STRING, ASSIGN, OPERATOR, DELIM or ILLEGAL.
+    """
+    return KIND_CATEGORIES[kind]
+
+
+# Size of the blocks read from disk by lex_file
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+def _tokenize(code, line_num=1, debug=False, recover=False):
+    """
+    Tokenizes a piece of source text that starts at the beginning of line `line_num`.
+    Yields tokens and finally returns the number of the line following the text.
+    An illegal character raises RuntimeError, or with `recover` becomes an
+    ILLEGAL token for the parser to report along with its own errors.
+    """
+    keywords = KEYWORDS
+    symbols = SYMBOLS
+    intern = sys.intern
     line_start = 0
-    for match in re.finditer(master_pattern, code):
-        kind = match.lastgroup
+    for match in master_regex.finditer(code):
+        group = match.lastindex
         value = match.group()
 
-        # Debug output to see what the lexer is processing
-        print(f"Token kind: {kind}, value: {repr(value)}")
+        if debug:
+            print(f"Token kind: {token_specification[group - 1][0]}, value: {repr(value)}")
 
-        if kind in ('WHITESPACE', 'NEWLINE'):  # Ignore whitespace and newlines
+        if group == _NAME:
+            kind = keywords.get(value)
+            if kind is None:
+                kind = ID
+                value = intern(value)
+        elif group == _SYMBOL:
+            kind = symbols[value]
+        elif group == _WHITESPACE:
             continue
-        elif kind == 'MISMATCH':
-            raise RuntimeError(f'Illegal character at line {line_num}, column {match.start() - line_start}')
-        
-        # Yield token as a named tuple
-        yield Token(kind, value)
-
-        if value == '\n':
+        elif group == _NUMBER:
+            kind = NUMBER
+        elif group == _NEWLINE:
             line_num += 1
             line_start = match.end()
+            continue
+        elif group == _STRING:
+            kind = STRING
+        elif group == _COMMENT:
+            continue
+        elif recover:
+            kind = ILLEGAL
+        else:
+            raise RuntimeError(f'Illegal character {value!r} at line {line_num}, column {match.start() - line_start + 1}')
+
+        # Yield token as a named tuple
+        yield Token(kind, value, line_num, match.start() - line_start + 1)
+    return line_num
+
+
+def lexer(code, debug=False, recover=False):
+    """
+    Tokenizes an in-memory string of MiniLang source code.
+    Set `debug` to print every regex match while lexing, and `recover` to
+    turn illegal characters into ILLEGAL tokens instead of stopping.
+    """
+    yield from _tokenize(code, 1, debug, recover)
+
+
+def _read_chunks(stream, chunk_size):
+    """
+    Reads a binary stream in blocks and yields decoded text cut on line boundaries,
+    so that no token is ever split between two chunks.
+    """
+    pending = b''
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            break
+        pending += block
+        cut = pending.rfind(b'\n') + 1
+        if cut:
+            yield pending[:cut].decode('utf-8')
+            pending = pending[cut:]
+    if pending:
+        yield pending.decode('utf-8')
+
+
+def _map_chunks(buffer, chunk_size):
+    """
+    Yields decoded text from a memory-mapped file, cut on line boundaries.
+    """
+    size = len(buffer)
+    pos = 0
+    while pos < size:
+        end = min(pos + chunk_size, size)
+        if end < size:
+            cut = buffer.rfind(b'\n', pos, end) + 1
+            if not cut:
+                # A single line longer than the chunk: extend to the end of that line
+                cut = buffer.find(b'\n', end) + 1 or size
+            end = cut
+        yield buffer[pos:end].decode('utf-8')
+        pos = end
+
+
+def lex_file(path, chunk_size=DEFAULT_CHUNK_SIZE, use_mmap=False, debug=False, recover=False):
+    """
+    Streams tokens from a source file without loading the whole file into a string.
+    The file is read in chunks of about `chunk_size` bytes, or through a
+    memory map when `use_mmap` is set. `debug` and `recover` are as for lexer().
+    """
+    line_num = 1
+    with open(path, 'rb') as source:
+        if use_mmap:
+            try:
+                buffer = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # Empty files cannot be mapped
+                return
+            with buffer:
+                for chunk in _map_chunks(buffer, chunk_size):
+                    line_num = yield from _tokenize(chunk, line_num, debug, recover)
+        else:
+            for chunk in _read_chunks(source, chunk_size):
+                line_num = yield from _tokenize(chunk, line_num, debug, recover)
@@ -1,12 +1,65 @@
+import argparse
+import os
+import subprocess
 import sys
-from lexer import lexer
-from semantic_analyzer import SemanticAnalyzer
-from ICG import IntermediateCodeGenerator
-from Optimizer import Optimizer
-from TargetCodeGenerator import TargetCodeGenerator  # Import the new TargetCodeGenerator
-from Parse_Tree_Visualizer import generate_sorted_parse_tree  # Import the function
+from lexer import token_category
+from Parser_2 import ParseError
+from Optimizer import OPTIMIZATION_LEVELS, DEFAULT_OPTIMIZATION_LEVEL
+from TargetCodeGenerator import format_target_instruction
+from VirtualMachine import run_bytecode
+from Compiler import Compilation
+from CompileCache import CompileCache, DEFAULT_MAX_BYTES
+from Instrumentation import Instrumentation, phase
+from PythonBackend import compile_source
+from ObjectFile import ObjectFile, ObjectFormatError, write_object
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="MiniLang compiler")
+    parser.add_argument("-O", dest="level", type=int, choices=sorted(OPTIMIZATION_LEVELS),
+                        default=DEFAULT_OPTIMIZATION_LEVEL, help="optimization level (default: %(default)s)")
+    parser.add_argument("--pass-stats", action="store_true",
+                        help="print the time and effect of every optimization pass")
+    parser.add_argument("--run", action="store_true",
+                        help="execute the program after compiling it")
+    parser.add_argument("--backend", choices=("vm", "python"), default="vm",
+                        help="how --run executes: bytecode VM or generated Python (default: %(default)s)")
+    parser.add_argument("-o", dest="output", metavar="FILE",
+                        help="write the compiled program to a MiniLang object file")
+    parser.add_argument("--exec", dest="exec_object", metavar="FILE",
+                        help="run a compiled object file instead of reading source code")
+    parser.add_argument("--cache-dir", metavar="DIR", default=os.environ.get("MINILANG_CACHE_DIR"),
+                        help="reuse compiler phase results stored in DIR (default: $MINILANG_CACHE_DIR)")
+    parser.add_argument("--cache-size", metavar="MB", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="evict least recently used cache entries beyond this size (default: %(default)s)")
+    parser.add_argument("--parse-tree", metavar="FILE",
+                        help="draw the syntax tree: .png/.svg/.pdf via Graphviz, any other name gets DOT text")
+    parser.add_argument("--tree-depth", type=int, metavar="N",
+                        help="collapse the parse tree below depth N")
+    parser.add_argument("--tree-max-children", type=int, metavar="N",
+                        help="collapse all but the first N children of a parse tree node")
+    parser.add_argument("--metrics", choices=("json", "text"),
+                        help="report the time, CPU time and output size of every phase")
+    parser.add_argument("--metrics-file", metavar="FILE",
+                        help="write the --metrics report to FILE instead of standard error")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="include peak memory per phase in --metrics (slower)")
+    return parser.parse_args()
+
+def run_object(path):
+    try:
+        with ObjectFile.open(path) as obj:
+            run_bytecode(obj.bytecode())
+    except (OSError, ObjectFormatError) as e:
+        print(f"Cannot load {path}: {e}")
+    except RuntimeError as e:
+        print(f"Runtime Error: {e}")
 
 def main():
+    args = parse_arguments()
+    if args.exec_object:
+        run_object(args.exec_object)
+        return
+
     # Initialize an empty string to store the code
     code = ""
 
@@ -23,90 +76,97 @@ def main():
         # Append the line to the code string
         code += line + "\n"  # Add newline to preserve line structure
 
+    cache = CompileCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache_dir else None
+    instrumentation = Instrumentation(args.trace_memory) if args.metrics else None
+    compilation = Compilation(code, args.level, cache, instrumentation)
+    try:
+        compile_code(args, code, compilation, instrumentation)
+    finally:
+        if instrumentation is not None:
+            report_metrics(args, compilation, instrumentation)
+
+def report_metrics(args, compilation, instrumentation):
+    instrumentation.close()
+    instrumentation.extra['source_bytes'] = len(compilation.source.encode())
+    instrumentation.extra['level'] = compilation.level
+    # Sizes of the phase results, by what they count
+    counts = {'tokens': 'tokens', 'ast': 'ast_nodes', 'icg': 'ir_instructions',
+              'ir': 'optimized_instructions', 'target': 'target_instructions'}
+    instrumentation.extra['counts'] = {counts[metrics.name]: metrics.count
+                                       for metrics in instrumentation.phases if metrics.name in counts}
+    if compilation.optimizer is not None and compilation.optimizer.pass_manager is not None:
+        instrumentation.extra['passes'] = [
+            {'name': stats.name, 'runs': stats.runs, 'seconds': stats.seconds,
+             'removed': stats.removed, 'changed': stats.changed}
+            for stats in compilation.optimizer.pass_manager.statistics.values()]
+
+    output = open(args.metrics_file, "w") if args.metrics_file else sys.stderr
+    try:
+        if args.metrics == "json":
+            print(instrumentation.to_json(), file=output)
+        else:
+            instrumentation.print_metrics(output)
+    finally:
+        if output is not sys.stderr:
+            output.close()
+
+def compile_code(args, code, compilation, instrumentation):
     # Step 1: Tokenize the code using the lexer
-    tokens = list(lexer(code))
+    tokens = compilation.tokens
     
-    # Step 2: Filter out unwanted tokens (NEWLINE, WHITESPACE)
-    filtered_tokens = [(token.type, token.value) for token in tokens if token.type not in ["NEWLINE", "WHITESPACE"]]
+    # Step 2: Convert the tokens to (category, value) pairs (the lexer already drops whitespace)
+    filtered_tokens = [(token_category(token.type), token.value) for token in tokens]
 
     # Print tokens exactly as required
     print("Tokens:", filtered_tokens)
 
-    # Step 3: Generate sorted parse tree (you can now call this after tokenizing)
-    generate_sorted_parse_tree(filtered_tokens)  # Call the function to generate the parse tree
-
-    # Step 4: Perform semantic analysis
-    analyzer = SemanticAnalyzer()
-    analyzer.analyze(filtered_tokens)
+    # Step 3: Parse the tokens into an AST
+    try:
+        compilation.tree
+    except ParseError as e:
+        print()
+        for error in e.diagnostics:
+            print(f"Syntax Error: {error}")
+        return
+
+    # Step 4: Perform semantic analysis on the AST
+    analyzer = compilation.analysis
     errors = analyzer.get_errors()
 
     print("\nSemantic Analysis:")
+    for diagnostic in analyzer.diagnostics:
+        print(f"{diagnostic.severity.capitalize()}: {diagnostic}")
     if errors:
-        for error in errors:
-            print(f"Error: {error}")
         return  # Exit if errors are found
-    else:
+    if not analyzer.diagnostics:
         print("No errors found.")
 
-    # Step 5: Generate intermediate code from the tokens
-    icg = IntermediateCodeGenerator()
-    var_name = None
-    current_type = None
-    i = 0  # Token index for manual iteration through tokens
-    loop_start_label = icg.new_label()
-    loop_end_label = icg.new_label()
-
-    # Step 6: Process the tokens and generate intermediate code
-    while i < len(filtered_tokens):
-        token_type, token_value = filtered_tokens[i]
-
-        if token_type == "KEYWORD" and token_value == "var":
-            current_type = None  # Reset type for variable declarations
-        elif token_type == "KEYWORD" and token_value in ("int", "float", "string"):
-            current_type = token_value  # Set current type for variable declarations
-        elif token_type == "ID":
-            var_name = token_value  # Store variable name
-        elif token_type == "ASSIGN":
-            pass  # Handle assignment (handled below)
-        elif token_type in ("NUMBER", "STRING"):
-            # Handle value assignment (e.g., x = 5)
-            if var_name:
-                icg.generate_code_for_assignment(var_name, token_value)
-                var_name = None  # Reset variable after assignment
-        elif token_type == "OPERATOR":
-            # Handle arithmetic operations (e.g., x + y)
-            if var_name:
-                operand1 = var_name
-                operator = token_value
-                i += 1  # Move to the next token (operand)
-                if i < len(filtered_tokens):
-                    operand2 = filtered_tokens[i][1]  # Get the operand
-                    temp_var = icg.generate_code_for_arithmetic(operand1, operator, operand2)
-                    var_name = temp_var  # Use the temporary variable result
-        elif token_type == "KEYWORD" and token_value == "while":
-            # Handle while loop
-            icg.emit(f"{loop_start_label}:")  # Label for the start of the loop
-            i += 1  # Move to condition tokens
-            condition_operand1 = filtered_tokens[i][1]  # Left operand of condition
-            i += 1
-            operator = filtered_tokens[i][1]  # Comparison operator
-            i += 1
-            condition_operand2 = filtered_tokens[i][1]  # Right operand of condition
-            icg.generate_code_for_comparison(condition_operand1, operator, condition_operand2, loop_end_label, loop_start_label)
-        elif token_type == "DELIM" and token_value == "}":
-            # Handle closing curly brace (end of while loop)
-            icg.emit(f"goto {loop_start_label}")  # Jump back to the start of the loop
-            icg.emit(f"{loop_end_label}:")  # Label for the end of the loop
-
-        i += 1  # Move to the next token
+    # Step 5: Draw the parse tree only when asked for (Graphviz is imported just for this)
+    if args.parse_tree:
+        from Parse_Tree_Visualizer import render_parse_tree
+        try:
+            with phase(instrumentation, "parse_tree"):
+                render_parse_tree(compilation.tree, args.parse_tree, args.tree_depth, args.tree_max_children)
+            print(f"\nParse tree written to {args.parse_tree}")
+        except (ImportError, OSError, RuntimeError, subprocess.SubprocessError) as e:
+            print(f"\nCannot draw the parse tree: {e}")
+
+    # Step 6: Generate intermediate code from the AST
+    intermediate_code = compilation.intermediate_code
 
     # Step 7: Print the generated intermediate code before optimization
     print("\nGenerated Intermediate Code (Before Optimization):")
-    icg.print_instructions()
+    for instruction in intermediate_code:
+        print(instruction)
 
-    # Step 8: Optimize the intermediate code
-    optimizer = Optimizer(icg.instruction_list)
-    optimized_code = optimizer.optimize()
+    # Step 8: Optimize the intermediate code (or take it from the cache)
+    optimized_code = compilation.optimized_code
+    if args.pass_stats:
+        print(f"\nOptimization Passes (-O{args.level}):")
+        if compilation.optimizer is not None:
+            compilation.optimizer.pass_manager.print_statistics()
+        else:
+            print("(optimized code taken from the cache)")
 
     # Step 9: Output the optimized intermediate code
     print("\nOptimized Intermediate Code:")
@@ -114,12 +174,33 @@ def main():
         print(instruction)
 
     # Step 10: Generate the target code from the optimized intermediate code
-    target_code_generator = TargetCodeGenerator()
-    target_code_generator.generate_target_code(optimized_code)
+    target_code = compilation.target_code
 
     # Step 11: Output the generated target code 
     print("\nGenerated Target Code:")
-    target_code_generator.print_target_code()
+    for instruction in target_code:
+        print(format_target_instruction(instruction))
+    if compilation.cache is not None:
+        print(f"\nCache: {', '.join(compilation.cached_phases) or 'no'} phases reused from {args.cache_dir}")
+
+    # Step 12: Save the compiled program
+    if args.output:
+        bytecode = compilation.bytecode
+        with phase(instrumentation, "object"):
+            size = write_object(bytecode, args.output)
+        print(f"\nWrote {size} bytes to {args.output}")
+
+    # Step 13: Run the program on the bytecode VM or as generated Python
+    if args.run:
+        print("\nProgram Output:")
+        try:
+            with phase(instrumentation, "run"):
+                if args.backend == "python":
+                    compile_source(code, compilation).run()
+                else:
+                    run_bytecode(compilation.bytecode)
+        except RuntimeError as e:
+            print(f"Runtime Error: {e}")
 
 if __name__ == "__main__":
     main()
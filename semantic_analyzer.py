@@ -1,38 +1,252 @@
-from lexer import lexer
-from symbol_table import SymbolTable
+from array import array
+
+from lexer import Diagnostic
+from Parser_2 import (
+    N_BLOCK, N_VAR_DECL, N_ASSIGN, N_IF, N_WHILE, N_PRINT, N_NUMBER, N_BINARY, N_INPUT,
+    T_UNKNOWN, T_INT, T_FLOAT, T_NUMBER, TYPE_NAMES,
+)
+from symbol_table import SymbolTable, SCOPE_BLOCK
+
+ARITHMETIC_OPERATORS = frozenset(('+', '-', '*', '/'))
+
+
+def _arithmetic_type(left, right):
+    if left == T_FLOAT or right == T_FLOAT:
+        return T_FLOAT
+    if left == T_NUMBER or right == T_NUMBER:
+        return T_NUMBER
+    return T_INT
+
+
+# Type of an arithmetic result, indexed by the types of its operands.
+# Comparisons and logical operators always give an int (0 or 1).
+ARITHMETIC_TYPES = [[_arithmetic_type(left, right) for right in range(4)] for left in range(4)]
+
+# Markers kept on the work stack between statements
+LEAVE_SCOPE, ELSE_BRANCH, END_IF, END_WHILE = range(4)
+
+
+class SemanticError(Exception):
+    """
+    Raised for a program that fails semantic analysis; `diagnostics` lists its errors.
+    """
+
+    def __init__(self, diagnostics):
+        self.diagnostics = diagnostics
+        more = f" (and {len(diagnostics) - 1} more)" if len(diagnostics) > 1 else ""
+        super().__init__(f"{diagnostics[0]}{more}")
+
 
 class SemanticAnalyzer:
+    """
+    Checks a Parser_2 AST in one walk over its nodes:
+      - every variable is declared before it is used, and only once per
+        scope; a block may shadow a variable of an enclosing scope
+      - a variable is assigned before it is read: an error if no assignment
+        comes before the read at all, a warning if one does but not on every
+        path (e.g. only in one branch of an `if`, or only inside a loop body)
+      - int and float values are not mixed up: a variable declared `int` or
+        `float` only takes values of that type, and a `var` takes the type of
+        its first assignment. The backends never convert between the two, so
+        this is what keeps a float variable from silently holding an int.
+        Arithmetic on an int and a float gives a float, comparisons an int.
+    Every expression, assignment and input node gets its type in tree.types
+    and every name its symbol slot in tree.slots, so the code generators
+    need no lookups of their own. Each identifier is looked up once, in one dict.
+    Definite assignment is tracked per slot; an `if` or `while` only undoes
+    the assignments made inside it, so the walk stays linear.
+    """
+
     def __init__(self):
         self.symbol_table = SymbolTable()
+        self.diagnostics = []  # Errors and warnings in source order
         self.errors = []
-        self.state = "initial"
-
-    def analyze(self, tokens):
-        current_type = None
-        var_name = None
-
-        print("=== Debug: Starting Semantic Analysis ===")
-
-        for token_type, token_value in tokens:
-            try:
-                print(f"=== Debug: Processing Node: ({token_type}, {token_value}) ===")
-                if self.state == "initial":
-                    if token_value == "var":
-                        self.state = "declaration"
-                    elif token_value == "if":
-                        self.state = "if_condition"
-                    elif token_value == "while":
-                        self.state = "while_condition"
-                    elif token_value == "print" or token_value == "input":
-                        self.state = "output"
-                    elif token_type == "ID":
-                        var_name = token_value  # Assign variable name directly
-                    elif token_value == "=":
-                        self.state = "assignment"
-                    # Add further rules for syntax or type-checking here
-            except Exception as e:
-                print(f"Error occurred during semantic analysis: {e}")
+        self.nodes = 0  # Nodes in the analyzed tree
+        self.undeclared = set()  # Undeclared names already reported
+        self.definite = bytearray()  # Slot -> assigned on every path so far
+        self.assigned = []  # Slots that became definite, in order, so a branch can undo its own
+
+    def error(self, message, tree, node):
+        diagnostic = Diagnostic('error', message, tree.lines[node], tree.columns[node])
+        self.diagnostics.append(diagnostic)
+        self.errors.append(diagnostic)
+
+    def warning(self, message, tree, node):
+        self.diagnostics.append(Diagnostic('warning', message, tree.lines[node], tree.columns[node]))
+
+    def analyze(self, root):
+        """
+        Checks the program under `root` (a Node), annotates its tree and returns the diagnostics.
+        """
+        tree = root.tree
+        kinds = tree.kinds
+        values = tree.values
+        first_child = tree.first_child
+        next_sibling = tree.next_sibling
+        types = tree.types
+        self.nodes = len(kinds)
+        slots = tree.slots = array('i', [-1]) * len(kinds)
+        table = self.symbol_table
+        bindings = table.bindings
+        definite = self.definite
+        assigned = self.assigned
+        check_expression = self.check_expression
+
+        stack = [root.id]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is tuple:
+                marker = node[0]
+                if marker == LEAVE_SCOPE:
+                    table.leave_scope()
+                    continue
+                start = node[1]
+                branch = assigned[start:]
+                for slot in branch:
+                    definite[slot] = 0
+                del assigned[start:]
+                if marker == ELSE_BRANCH:
+                    node[2].extend(branch)  # Remember the then-branch for END_IF
+                elif marker == END_IF:
+                    # After an if/else only what both branches assigned is definite
+                    for slot in set(node[2]).intersection(branch):
+                        definite[slot] = 1
+                        assigned.append(slot)
+                continue
+
+            kind = kinds[node]
+            if kind == N_ASSIGN or kind == N_INPUT:
+                name = values[node]
+                symbol = bindings.get(name)
+                if kind == N_ASSIGN:
+                    expression = first_child[node]
+                    check_expression(tree, expression)
+                    value_type = types[expression]
+                else:
+                    value_type = T_NUMBER
+                if symbol is None:
+                    self.report_undeclared(name, tree, node)
+                    continue
+                target_type = symbol.type
+                if target_type == T_UNKNOWN:
+                    symbol.type = value_type
+                elif target_type != value_type and target_type != T_NUMBER and kind == N_ASSIGN:
+                    if value_type == T_NUMBER:
+                        other_type = T_FLOAT if target_type == T_INT else T_INT
+                        self.warning(f"Variable '{name}' is {TYPE_NAMES[target_type]} but the value assigned "
+                                     f"may be {TYPE_NAMES[other_type]}", tree, node)
+                    else:
+                        self.error(f"Cannot assign {TYPE_NAMES[value_type]} to {TYPE_NAMES[target_type]} "
+                                   f"variable '{name}'", tree, node)
+                slot = symbol.slot
+                symbol.initialized = True
+                if not definite[slot]:
+                    definite[slot] = 1
+                    assigned.append(slot)
+                slots[node] = slot
+                types[node] = symbol.type
+            elif kind == N_PRINT:
+                check_expression(tree, first_child[node])
+            elif kind == N_VAR_DECL:
+                self.declare(tree, node)
+            elif kind == N_IF:
+                condition = first_child[node]
+                check_expression(tree, condition)
+                then_branch = next_sibling[condition]
+                else_branch = next_sibling[then_branch]
+                start = len(assigned)
+                if else_branch == -1:
+                    stack.append((END_WHILE, start))  # Undo the then-branch, like a loop body
+                else:
+                    then_assigned = []
+                    stack.append((END_IF, start, then_assigned))
+                    stack.append(else_branch)
+                    stack.append((ELSE_BRANCH, start, then_assigned))
+                stack.append(then_branch)
+            elif kind == N_WHILE:
+                condition = first_child[node]
+                check_expression(tree, condition)
+                stack.append((END_WHILE, len(assigned)))
+                stack.append(next_sibling[condition])
+            else:  # N_PROGRAM or N_BLOCK
+                if kind == N_BLOCK:
+                    table.enter_scope(SCOPE_BLOCK)
+                    stack.append((LEAVE_SCOPE,))
+                statements = []
+                child = first_child[node]
+                while child != -1:
+                    statements.append(child)
+                    child = next_sibling[child]
+                statements.reverse()
+                stack += statements
+        tree.slot_names = table.slot_names()
+        return self.diagnostics
+
+    def declare(self, tree, node):
+        name = tree.values[node]
+        table = self.symbol_table
+        existing = table.lookup_local(name)
+        if existing is not None:
+            self.error(f"Variable '{name}' is already declared on line {existing.line}", tree, node)
+            tree.slots[node] = existing.slot
+            return
+        symbol = table.declare(name, tree.types[node], tree.lines[node], tree.columns[node])
+        self.definite.append(0)
+        tree.slots[node] = symbol.slot
+
+    def report_undeclared(self, name, tree, node):
+        if name not in self.undeclared:
+            self.undeclared.add(name)
+            self.error(f"Variable '{name}' is not declared", tree, node)
+
+    def check_expression(self, tree, node):
+        """
+        Types the expression under `node` and resolves its names, operands before operators.
+        """
+        kinds = tree.kinds
+        values = tree.values
+        first_child = tree.first_child
+        next_sibling = tree.next_sibling
+        types = tree.types
+        slots = tree.slots
+        bindings = self.symbol_table.bindings
+        definite = self.definite
+        arithmetic_types = ARITHMETIC_TYPES
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node < 0:  # ~operator, after both of its operands
+                node = ~node
+                left = first_child[node]
+                if values[node] in ARITHMETIC_OPERATORS:
+                    types[node] = arithmetic_types[types[left]][types[next_sibling[left]]]
+                else:
+                    types[node] = T_INT
                 continue
+            kind = kinds[node]
+            if kind == N_BINARY:
+                left = first_child[node]
+                stack.append(~node)
+                stack.append(next_sibling[left])
+                stack.append(left)
+            elif kind == N_NUMBER:
+                types[node] = T_FLOAT if '.' in values[node] else T_INT
+            else:  # N_ID
+                name = values[node]
+                symbol = bindings.get(name)
+                if symbol is None:
+                    self.report_undeclared(name, tree, node)
+                    types[node] = T_NUMBER
+                    continue
+                slot = symbol.slot
+                slots[node] = slot
+                if not definite[slot]:
+                    if symbol.initialized:
+                        self.warning(f"Variable '{name}' may be used before being assigned", tree, node)
+                    else:
+                        self.error(f"Variable '{name}' is used before being assigned", tree, node)
+                # A variable never assigned reads as 0
+                types[node] = symbol.type or T_INT
 
     def get_errors(self):
         # Return the list of semantic errors
@@ -1,20 +1,141 @@
+import sys
+
+# Kinds of scope
+SCOPE_GLOBAL, SCOPE_FUNCTION, SCOPE_BLOCK = range(3)
+
+SCOPE_KIND_NAMES = ['global', 'function', 'block']
+
+
+class Symbol:
+    """
+    One declared variable. `slot` numbers every declaration of the program
+    from 0, so later phases can keep per-variable data in lists indexed by
+    slot instead of dicts keyed by name; two declarations of the same name
+    in different scopes get different slots. `shadowed` is the symbol of the
+    same name this one hides while its scope is open.
+    """
+    __slots__ = ('name', 'slot', 'type', 'initialized', 'depth', 'line', 'column', 'shadowed')
+
+    def __init__(self, name, slot, var_type=None, depth=0, line=0, column=0, shadowed=None):
+        self.name = name
+        self.slot = slot
+        self.type = var_type
+        self.initialized = False
+        self.depth = depth  # Nesting depth of the declaring scope (0 = global)
+        self.line = line
+        self.column = column
+        self.shadowed = shadowed
+
+    def __repr__(self):
+        return f"Symbol({self.name!r}, slot={self.slot}, type={self.type!r}, depth={self.depth})"
+
+
 class SymbolTable:
+    """
+    Nested scopes over one dict. `bindings` maps every visible name to its
+    innermost Symbol, so a lookup is a single dict access at any depth.
+    Each open scope keeps the names it declared; leaving it puts back the
+    symbols they shadowed. Entering a scope is O(1) and leaving it costs one
+    step per declaration it made, so deeply nested programs stay linear.
+    Symbols outlive their scope in `symbols`, indexed by slot.
+    """
+
     def __init__(self):
-        self.symbols = {}
+        self.bindings = {}  # name -> innermost visible Symbol
+        self.scopes = [[]]  # Names declared in each open scope, innermost last
+        self.scope_kinds = [SCOPE_GLOBAL]
+        self.symbols = []  # Every Symbol ever declared, by slot
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def depth(self):
+        return len(self.scopes) - 1
+
+    def enter_scope(self, kind=SCOPE_BLOCK):
+        self.scopes.append([])
+        self.scope_kinds.append(kind)
+
+    def leave_scope(self):
+        if len(self.scopes) == 1:
+            raise RuntimeError("Cannot leave the global scope")
+        bindings = self.bindings
+        for name in self.scopes.pop():
+            shadowed = bindings[name].shadowed
+            if shadowed is None:
+                del bindings[name]
+            else:
+                bindings[name] = shadowed
+        self.scope_kinds.pop()
+
+    def declare(self, var_name, var_type=None, line=0, column=0):
+        """
+        Declares a name in the innermost scope and returns its new Symbol.
+        Redeclaring a name in the same scope returns the existing symbol; use
+        lookup_local() first to report it.
+        """
+        outer = self.bindings.get(var_name)
+        depth = len(self.scopes) - 1
+        if outer is not None and outer.depth == depth:
+            return outer
+        symbol = Symbol(var_name, len(self.symbols), var_type, depth, line, column, outer)
+        self.symbols.append(symbol)
+        self.bindings[var_name] = symbol
+        self.scopes[-1].append(var_name)
+        return symbol
+
+    def lookup(self, var_name):
+        """
+        Returns the innermost visible Symbol for a name, or None.
+        """
+        return self.bindings.get(var_name)
+
+    def lookup_local(self, var_name):
+        """
+        Returns the Symbol for a name declared in the innermost scope, or None.
+        """
+        symbol = self.bindings.get(var_name)
+        if symbol is not None and symbol.depth == len(self.scopes) - 1:
+            return symbol
+        return None
+
+    def resolve(self, var_name):
+        """
+        Returns the slot of the visible declaration of a name, or -1.
+        """
+        symbol = self.bindings.get(var_name)
+        return -1 if symbol is None else symbol.slot
 
-    def declare(self, var_name):
-        if var_name not in self.symbols:
-            self.symbols[var_name] = {'type': None, 'initialized': False}
+    def slot_names(self):
+        """
+        Returns a distinct variable name for every slot, for the generated
+        code: the first declaration of a name keeps it, later ones (which
+        shadow it or live in a sibling scope) become `name%slot`. '%' cannot
+        appear in a MiniLang identifier, so these never clash.
+        """
+        names = []
+        seen = set()
+        for symbol in self.symbols:
+            name = symbol.name
+            if name in seen:
+                name = sys.intern(f"{name}%{symbol.slot}")
+            else:
+                seen.add(name)
+            names.append(name)
+        return names
 
     def assign(self, var_name, var_type):
-        if var_name in self.symbols:
-            self.symbols[var_name]['initialized'] = True  # Mark as initialized
-            self.symbols[var_name]['type'] = var_type  # Store the type
-        else:
+        symbol = self.bindings.get(var_name)
+        if symbol is None:
             raise RuntimeError(f"Variable '{var_name}' not declared.")
+        symbol.initialized = True  # Mark as initialized
+        symbol.type = var_type  # Store the type
 
     def is_initialized(self, var_name):
-        return self.symbols.get(var_name, {}).get('initialized', False)
+        symbol = self.bindings.get(var_name)
+        return symbol is not None and symbol.initialized
 
     def get_type(self, var_name):
-        return self.symbols.get(var_name, {}).get('type', None)
+        symbol = self.bindings.get(var_name)
+        return None if symbol is None else symbol.type
@@ -0,0 +1,214 @@
+"""
+The bytecode VM, the target code and the Python backend must print the
+same values for the same program at every optimization level.
+"""
+import operator
+
+import pytest
+
+from Compiler import Compilation
+from ICG import divide
+from PythonBackend import PythonBackend
+from semantic_analyzer import SemanticError
+from TargetCodeGenerator import TargetCodeGenerator
+from VirtualMachine import run_bytecode, parse_input
+
+# name -> (source, input lines, expected output)
+PROGRAMS = {
+    'arithmetic': ("""
+        var a; var b;
+        a = 7; b = 2;
+        print(a / b);
+        print(a - b * 3);
+        print((a + b) * (a - b));
+        print((0 - a) / b);
+        print(a / (0 - b));
+    """, [], [3, 1, 45, -3, -3]),
+    'floats': ("""
+        float f; var g;
+        f = 7.0;
+        g = f / 2;
+        print(g);
+        print(f * 1.5 - 0.5);
+        print(f > 6.5);
+    """, [], [3.5, 10.0, 1]),
+    'loops': ("""
+        var i; var j; var total;
+        total = 0; i = 0;
+        while (i < 5) {
+            j = 0;
+            while (j < i) {
+                total = total + i * j;
+                j = j + 1;
+            }
+            i = i + 1;
+        }
+        print(total);
+        print(i);
+    """, [], [35, 5]),
+    'conditions': ("""
+        var x; var y;
+        x = 3; y = 0;
+        if (x > 2 && y == 0) { print(1); } else { print(2); }
+        if (x < 2 || y != 0) { print(3); } else { print(4); }
+        if (x >= 3) { if (y <= 0 - 1) { print(5); } else { print(6); } }
+        print(x == 3 && (y || 1));
+    """, [], [1, 4, 6, 1]),
+    'input': ("""
+        var n; var s; var i;
+        input(n);
+        s = 0; i = 1;
+        while (i <= n) {
+            s = s + i * i;
+            i = i + 1;
+        }
+        print(s);
+    """, ["5"], [55]),
+    # Variables named like the compiler's temporaries used to be rejected
+    'temporary names': ("""
+        var t0; var t1;
+        t0 = 5;
+        input(t1);
+        t1 = t0 * 2 + t1;
+        print(t1 + t0 * t1);
+    """, ["3"], [78]),
+    # A block's declaration hides the outer variable until the block ends
+    'shadowing': ("""
+        var x; var i;
+        x = 1; i = 0;
+        while (i < 3) {
+            float x;
+            x = 0.5 * i;
+            print(x);
+            if (i == 1) { var x; x = 10; print(x + i); }
+            i = i + 1;
+        }
+        if (x == 1) { var i; i = 7; x = x + i; }
+        print(x); print(i);
+    """, [], [0.0, 0.5, 11, 1.0, 8, 3]),
+    # More live variables than registers, so some of them are spilled to memory
+    'spills': ("""
+        var a; var b; var c; var d; var e; var f; var g; var h; var k;
+        input(k);
+        a = k + 1; b = a * 2; c = b + a; d = c * b; e = d - c;
+        f = e + d; g = f - e; h = g + f;
+        while (k > 0) {
+            a = a + b; b = b + c; c = c + d; d = d + e;
+            e = e + f; f = f + g; g = g + h; h = h + a;
+            k = k - 1;
+        }
+        print(a); print(b); print(c); print(d); print(e); print(f); print(g); print(h);
+    """, ["3"], None),
+}
+
+LEVELS = (0, 1, 2)
+
+RELATIONS = {'l': operator.lt, 'g': operator.gt, 'le': operator.le, 'ge': operator.ge,
+             'e': operator.eq, 'ne': operator.ne}
+
+
+def run_target(code, input_lines):
+    """
+    Runs target code (see TargetCodeGenerator) on a model of the two-address
+    machine and returns what it printed. Registers and memory start at 0.
+    """
+    labels = {instruction[1]: pc for pc, instruction in enumerate(code) if instruction[0] == 'label'}
+    registers = {}
+    memory = {}
+    lines = iter(input_lines)
+    output = []
+    flags = None
+
+    def read(operand):
+        if operand.__class__ is not str:
+            return operand
+        if operand[0] == '[':
+            return memory.get(operand[1:-1], 0)
+        return registers.get(operand, 0)
+
+    def write(operand, value):
+        if operand[0] == '[':
+            memory[operand[1:-1]] = value
+        else:
+            registers[operand] = value
+
+    pc = 0
+    while pc < len(code):
+        mnemonic, *operands = code[pc]
+        pc += 1
+        if mnemonic == 'mov':
+            write(operands[0], read(operands[1]))
+        elif mnemonic == 'add':
+            write(operands[0], read(operands[0]) + read(operands[1]))
+        elif mnemonic == 'sub':
+            write(operands[0], read(operands[0]) - read(operands[1]))
+        elif mnemonic == 'imul':
+            write(operands[0], read(operands[0]) * read(operands[1]))
+        elif mnemonic == 'idiv':
+            write(operands[0], divide(read(operands[0]), read(operands[1])))
+        elif mnemonic == 'and':
+            write(operands[0], int(read(operands[0]) != 0 and read(operands[1]) != 0))
+        elif mnemonic == 'or':
+            write(operands[0], int(read(operands[0]) != 0 or read(operands[1]) != 0))
+        elif mnemonic == 'cmp':
+            flags = (read(operands[0]), read(operands[1]))
+        elif mnemonic.startswith('set'):
+            write(operands[0], int(RELATIONS[mnemonic[3:]](*flags)))
+        elif mnemonic == 'jmp':
+            pc = labels[operands[0]]
+        elif mnemonic == 'print':
+            output.append(read(operands[0]))
+        elif mnemonic == 'input':
+            write(operands[0], parse_input(next(lines)))
+        elif mnemonic == 'label':
+            pass
+        elif mnemonic[0] == 'j':
+            if RELATIONS[mnemonic[1:]](*flags):
+                pc = labels[operands[0]]
+        else:
+            raise AssertionError(f"unknown target instruction {mnemonic}")
+    return output
+
+
+def run_vm(compilation, input_lines):
+    lines = iter(input_lines)
+    output = []
+    run_bytecode(compilation.bytecode, lambda: next(lines), output.append)
+    return output
+
+
+def run_python(source, input_lines):
+    lines = iter(input_lines)
+    output = []
+    PythonBackend().compile_source(source).run(lambda: next(lines), output.append)
+    return output
+
+
+@pytest.mark.parametrize('level', LEVELS)
+@pytest.mark.parametrize('name', sorted(PROGRAMS))
+def test_backends_agree(name, level):
+    source, input_lines, expected = PROGRAMS[name]
+    compilation = Compilation(source, level)
+    vm_output = run_vm(compilation, input_lines)
+    target_output = run_target(TargetCodeGenerator().generate_target_code(compilation.optimized_code), input_lines)
+    python_output = run_python(source, input_lines)
+    assert vm_output == target_output == python_output
+    if expected is not None:
+        assert vm_output == expected
+    assert [type(value) for value in vm_output] == [type(value) for value in python_output]
+
+
+@pytest.mark.parametrize('name', sorted(PROGRAMS))
+def test_levels_agree(name):
+    source, input_lines, _ = PROGRAMS[name]
+    outputs = [run_vm(Compilation(source, level), input_lines) for level in LEVELS]
+    assert outputs[0] == outputs[1] == outputs[2]
+
+
+def test_python_backend_rejects_semantic_errors():
+    with pytest.raises(SemanticError) as error:
+        PythonBackend().compile_source("int i; i = 1.5; print(i + y);")
+    assert [diagnostic.message for diagnostic in error.value.diagnostics] == [
+        "Cannot assign float to int variable 'i'",
+        "Variable 'y' is not declared",
+    ]
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+from ObjectFile import ObjectFile
+from VirtualMachine import run_bytecode
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROGRAMS = {
+    'one.ml': ("var x; x = 6; print(x * 7);", [42]),
+    'loops/two.ml': ("var i; i = 0; while (i < 5) { i = i + 1; } print(i);", [5]),
+    'loops/three.ml': ("float f; f = 1.5; print(f + f);", [3.0]),
+}
+
+
+def write_sources(directory, programs):
+    for name, (source, _) in programs.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+
+
+def batch(*arguments):
+    return subprocess.run([sys.executable, os.path.join(REPOSITORY, 'batch.py'), *arguments],
+                          capture_output=True, text=True, cwd=REPOSITORY)
+
+
+def test_batch_compiles_in_parallel(tmp_path):
+    sources = tmp_path / 'src'
+    write_sources(sources, PROGRAMS)
+    out = tmp_path / 'out'
+    result = batch('-j', '2', '--output-dir', str(out), str(sources))
+    assert result.returncode == 0, result.stdout
+    assert "3 files, 3 compiled, 0 failed" in result.stdout
+    for name, (_, expected) in PROGRAMS.items():
+        output = []
+        with ObjectFile.open(str(out / name.replace('.ml', '.mlo'))) as obj:
+            run_bytecode(obj.bytecode(), output_function=output.append)
+        assert output == expected
+
+
+def test_batch_reports_a_syntax_error_and_carries_on(tmp_path):
+    sources = tmp_path / 'src'
+    write_sources(sources, dict(PROGRAMS, **{'broken.ml': ("var x; x = 1 +; print(x);", None)}))
+    out = tmp_path / 'out'
+    report = tmp_path / 'report.json'
+    result = batch('-j', '2', '--emit', 'ir', '--output-dir', str(out), '--report', str(report), str(sources))
+    assert result.returncode == 1
+    assert "4 files, 3 compiled, 1 failed" in result.stdout
+    failures = [line for line in result.stdout.splitlines() if line.startswith("FAIL")]
+    assert len(failures) == 1 and "broken.ml: ParseError: Unexpected token in expression" in failures[0]
+
+    assert sorted(os.path.relpath(os.path.join(directory, name), out)
+                  for directory, _, names in os.walk(out) for name in names) == [
+        'loops/three.ir', 'loops/two.ir', 'one.ir']
+    files = json.loads(report.read_text())['files']
+    assert [os.path.basename(entry['path']) for entry in files] == ['broken.ml', 'three.ml', 'two.ml', 'one.ml']
+    assert [entry['error'] is None for entry in files] == [False, True, True, True]
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+import CompileCache as compile_cache
+from CompileCache import CompileCache, ENTRY_SUFFIX
+from Compiler import Compilation
+
+SOURCE = "var x; x = 1; while (x < 10) { x = x * 2; } print(x);"
+
+
+def target(size):
+    return [('mov', 'eax', index) for index in range(size)]
+
+
+def entry_names(directory):
+    return sorted(name for name in os.listdir(directory))
+
+
+def test_keys_depend_on_source_and_options():
+    key = CompileCache.key(SOURCE, 'fingerprint', 2)
+    assert key == CompileCache.key(SOURCE, 'fingerprint', 2)
+    assert key != CompileCache.key(SOURCE, 'fingerprint', 1)
+    assert key != CompileCache.key(SOURCE + " ", 'fingerprint', 2)
+    assert key != CompileCache.key(SOURCE, 'other compiler', 2)
+
+
+def test_miss_then_hit(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    key = cache.key(SOURCE)
+    assert cache.get('target', key) is None
+    cache.put('target', key, target(3))
+    assert cache.get('target', key) == target(3)
+    assert cache.get('ir', key) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_compilations_share_phases(tmp_path):
+    cache = CompileCache(str(tmp_path))
+    first = Compilation(SOURCE, 2, cache)
+    code = first.target_code
+    assert first.cached_phases == []
+
+    again = Compilation(SOURCE, 2, cache)
+    assert again.target_code == code
+    assert again.cached_phases == ['target']  # Nothing before the target code runs
+
+    other_level = Compilation(SOURCE, 0, cache)
+    other_level.target_code
+    assert 'ast' in other_level.cached_phases and 'target' not in other_level.cached_phases
+
+
+def test_replace_is_atomic(tmp_path, monkeypatch):
+    cache = CompileCache(str(tmp_path))
+    key = cache.key(SOURCE)
+    cache.put('target', key, target(2))
+    cache.put('target', key, target(4))  # Overwrites in place
+    assert cache.get('target', key) == target(4)
+    assert entry_names(tmp_path) == [f"{key}.target{ENTRY_SUFFIX}"]
+
+    def fail(source, destination):
+        raise OSError("disk full")
+    monkeypatch.setattr(compile_cache.os, 'replace', fail)
+    cache.put('target', key, target(8))
+    # The failed write leaves neither a temporary file nor a damaged entry
+    assert entry_names(tmp_path) == [f"{key}.target{ENTRY_SUFFIX}"]
+    assert cache.get('target', key) == target(4)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    probe = CompileCache(str(tmp_path / 'probe'))
+    probe.put('target', 'probe', target(50))
+    size = os.path.getsize(probe.path('target', 'probe'))
+
+    cache = CompileCache(str(tmp_path / 'cache'), max_bytes=int(size * 3.5))
+    for age, name in enumerate('abc'):
+        cache.put('target', name, target(50))
+        os.utime(cache.path('target', name), (1000 + age, 1000 + age))
+    assert cache.get('target', 'a') is not None  # Now the most recently used
+    cache.put('target', 'd', target(50))  # Four entries: over the limit
+
+    # Down to EVICTION_TARGET (75%) of the limit, oldest first
+    assert cache.evicted == 2
+    assert [name for name in 'abcd' if os.path.exists(cache.path('target', name))] == ['a', 'd']
+    assert cache.size == 2 * size
+
+
+@pytest.mark.parametrize('damage', (b'', b'garbage', b'MLC\x01\xff\x00'))
+def test_damaged_entry_is_a_miss(tmp_path, damage):
+    cache = CompileCache(str(tmp_path))
+    first = Compilation(SOURCE, 1, cache)
+    code = [str(quad) for quad in first.optimized_code]
+    path = cache.path('ir', first.optimized_key)
+    with open(path, 'wb') as file:
+        file.write(damage)
+    assert cache.get('ir', first.optimized_key) is None
+
+    # The next compilation recomputes the phase and writes a good entry back
+    again = Compilation(SOURCE, 1, cache)
+    assert [str(quad) for quad in again.optimized_code] == code
+    assert 'ir' not in again.cached_phases
+    assert [str(quad) for quad in cache.get('ir', first.optimized_key)] == code
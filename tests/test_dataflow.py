@@ -0,0 +1,48 @@
+from ControlFlowGraph import ControlFlowGraph
+from DataFlow import Liveness, ReachingDefinitions
+from ICG import Quad, COPY, LABEL, GOTO, IF_GOTO, PRINT
+
+
+def loop_cfg():
+    """
+    x := 0; i := 0; while (i < 3) { x := x + i; i := i + 1 } print x, in four blocks:
+    0 the entry, 1 the loop test, 2 the body and 3 the exit.
+    """
+    return ControlFlowGraph([
+        Quad(COPY, 'x', 0),
+        Quad(COPY, 'i', 0),
+        Quad(LABEL, 'L'),
+        Quad(IF_GOTO, 'E', 'i', 3, '>='),
+        Quad('+', 'x', 'x', 'i'),
+        Quad('+', 'i', 'i', 1),
+        Quad(GOTO, 'L'),
+        Quad(LABEL, 'E'),
+        Quad(PRINT, None, 'x'),
+    ])
+
+
+def test_loop_cfg_shape():
+    cfg = loop_cfg()
+    assert [sorted(block.successors) for block in cfg.blocks] == [[1], [2, 3], [1], []]
+
+
+def test_reaching_definitions_around_a_loop():
+    analysis = ReachingDefinitions(loop_cfg()).solve()
+    entry_x, entry_i, body_x, body_i = (0, 0, 'x'), (0, 1, 'i'), (2, 0, 'x'), (2, 1, 'i')
+    assert analysis.definitions == [entry_x, entry_i, body_x, body_i]
+    assert analysis.reaching_in(0) == []
+    assert analysis.reaching_out(0) == [entry_x, entry_i]
+    # The back edge brings the body's definitions to the loop test
+    assert analysis.reaching_in(1) == [entry_x, entry_i, body_x, body_i]
+    # The body kills the entry definitions of the variables it assigns
+    assert analysis.reaching_out(2) == [body_x, body_i]
+    assert analysis.reaching_in(3) == [entry_x, entry_i, body_x, body_i]
+
+
+def test_liveness_around_a_loop():
+    analysis = Liveness(loop_cfg(), live_on_exit=()).solve()
+    assert analysis.live_in(0) == set()
+    assert analysis.live_in(1) == {'x', 'i'}
+    assert analysis.live_out(2) == {'x', 'i'}
+    assert analysis.live_in(3) == {'x'}
+    assert analysis.live_out(3) == set()
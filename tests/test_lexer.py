@@ -0,0 +1,77 @@
+import pytest
+
+from lexer import (
+    lexer, lex_file, ID, NUMBER, ASSIGN, SEMI, EQ, AND, LE, NE, ILLEGAL,
+)
+
+SOURCE = """var counter;
+counter = 12.5;  # a comment == && here
+while (counter <= 100 && counter != 7) {
+\tcounter = counter * 2;
+}
+if (counter == 200) { print(counter); }
+"""
+
+
+def positions(tokens):
+    return [(token.value, token.line, token.column) for token in tokens]
+
+
+def test_lines_and_columns():
+    tokens = list(lexer("x = 1;\n\n  yy == 2.5;\r\nz&&w"))
+    assert positions(tokens) == [
+        ('x', 1, 1), ('=', 1, 3), ('1', 1, 5), (';', 1, 6),
+        ('yy', 3, 3), ('==', 3, 6), ('2.5', 3, 9), (';', 3, 12),
+        ('z', 4, 1), ('&&', 4, 2), ('w', 4, 4),
+    ]
+    assert [token.type for token in tokens[:4]] == [ID, ASSIGN, NUMBER, SEMI]
+    assert tokens[5].type == EQ and tokens[9].type == AND
+
+
+def test_comments_and_blank_lines_keep_the_count():
+    tokens = list(lexer("# first\n\n# third == &&\nx;"))
+    assert positions(tokens) == [('x', 4, 1), (';', 4, 2)]
+
+
+def test_illegal_character():
+    with pytest.raises(RuntimeError, match=r"Illegal character '\$' at line 2, column 3"):
+        list(lexer("x;\nx $ 1;"))
+    tokens = list(lexer("x;\nx $ 1;", recover=True))
+    assert (tokens[3].type, tokens[3].line, tokens[3].column) == (ILLEGAL, 2, 3)
+
+
+@pytest.mark.parametrize('use_mmap', (False, True))
+@pytest.mark.parametrize('chunk_size', (1, 2, 3, 5, 8, 64, 1 << 16))
+def test_chunks_never_split_tokens(tmp_path, chunk_size, use_mmap):
+    # Blocks this small are read with cuts in the middle of names, numbers and two-character operators
+    path = tmp_path / 'program.ml'
+    path.write_bytes(SOURCE.encode())
+    tokens = list(lex_file(str(path), chunk_size=chunk_size, use_mmap=use_mmap))
+    assert tokens == list(lexer(SOURCE))
+    assert {'counter', '12.5', '<=', '&&', '!=', '==', '200'} <= {token.value for token in tokens}
+    assert {LE, NE, EQ, AND} <= {token.type for token in tokens}
+
+
+def test_mmap_and_buffered_reads_agree_on_a_large_file(tmp_path):
+    path = tmp_path / 'large.ml'
+    path.write_bytes((SOURCE * 2000).encode())
+    buffered = list(lex_file(str(path), chunk_size=1000))
+    mapped = list(lex_file(str(path), chunk_size=1000, use_mmap=True))
+    assert buffered == mapped
+    assert buffered[-1].line == SOURCE.count('\n') * 2000
+
+
+def test_line_longer_than_a_chunk(tmp_path):
+    source = "x = " + " + ".join(str(i) for i in range(500)) + ";\ny == 1;"
+    path = tmp_path / 'long.ml'
+    path.write_bytes(source.encode())
+    expected = list(lexer(source))
+    assert list(lex_file(str(path), chunk_size=16)) == expected
+    assert list(lex_file(str(path), chunk_size=16, use_mmap=True)) == expected
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'empty.ml'
+    path.write_bytes(b'')
+    assert list(lex_file(str(path))) == []
+    assert list(lex_file(str(path), use_mmap=True)) == []
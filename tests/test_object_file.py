@@ -0,0 +1,74 @@
+import struct
+
+import pytest
+
+from Compiler import Compilation
+from ObjectFile import ObjectFile, ObjectFormatError, write_object, encode_object, HEADER_SIZE, FORMAT_VERSION
+from VirtualMachine import run_bytecode
+
+SOURCE = """
+var n; var big; float f; var i;
+input(n);
+big = 100000000000000000000000;
+f = 2.5; i = 0;
+while (i < n) { f = f * 2.0; big = big + i; i = i + 1; }
+print(f); print(big); print(i);
+"""
+
+
+def run(bytecode):
+    output = []
+    run_bytecode(bytecode, lambda: "4", output.append)
+    return output
+
+
+@pytest.fixture
+def bytecode():
+    return Compilation(SOURCE, 1).bytecode
+
+
+def test_round_trip(tmp_path, bytecode):
+    path = tmp_path / 'program.mlo'
+    size = write_object(bytecode, str(path))
+    assert size == path.stat().st_size
+    with ObjectFile.open(str(path)) as obj:
+        assert list(obj.code) == list(bytecode.code)
+        assert obj.names == list(bytecode.names)
+        assert obj.constants == list(bytecode.constants)
+        assert [type(value) for value in obj.constants] == [type(value) for value in bytecode.constants]
+        assert obj.labels == dict(bytecode.labels)
+        assert obj.instruction(obj.instruction_count - 1) == tuple(bytecode.code[-4:])
+        assert run(obj.bytecode()) == run(bytecode) == [40.0, 100000000000000000000006, 4]
+
+
+def write_bytes(tmp_path, data):
+    path = tmp_path / 'broken.mlo'
+    path.write_bytes(bytes(data))
+    return str(path)
+
+
+def test_bad_magic_is_rejected(tmp_path, bytecode):
+    data = bytearray(encode_object(bytecode))
+    data[0:4] = b'ELF\x00'
+    with pytest.raises(ObjectFormatError, match="Not a MiniLang object file"):
+        ObjectFile.open(write_bytes(tmp_path, data))
+
+
+def test_other_version_is_rejected(tmp_path, bytecode):
+    data = bytearray(encode_object(bytecode))
+    struct.pack_into('<H', data, 4, FORMAT_VERSION + 1)
+    with pytest.raises(ObjectFormatError, match="Unsupported object file version"):
+        ObjectFile.open(write_bytes(tmp_path, data))
+
+
+@pytest.mark.parametrize('cut', (1, 64))
+def test_truncated_file_is_rejected(tmp_path, bytecode, cut):
+    data = encode_object(bytecode)
+    with pytest.raises(ObjectFormatError, match="truncated"):
+        ObjectFile.open(write_bytes(tmp_path, data[:-cut]))
+
+
+def test_file_shorter_than_the_header_is_rejected(tmp_path, bytecode):
+    data = encode_object(bytecode)
+    with pytest.raises(ObjectFormatError, match="too short"):
+        ObjectFile.open(write_bytes(tmp_path, data[:HEADER_SIZE - 1]))
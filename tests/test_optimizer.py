@@ -0,0 +1,44 @@
+from Compiler import Compilation
+from ICG import Quad, LABEL
+from Optimizer import Optimizer, PREHEADER_PREFIX
+from VirtualMachine import compile_bytecode, run_bytecode
+
+# The loop header has two entries (after the if and around it), so hoisting
+# `n * 4` needs a new preheader block
+LOOP = """
+var i; var n; var s;
+input(n); s = 0; i = 0;
+if (n > 2) { i = 1; }
+while (i < n) { s = s + n * 4; i = i + 1; }
+print(s);
+"""
+
+
+def labels(instructions):
+    return [instruction.dst for instruction in instructions if instruction.op == LABEL]
+
+
+def run(instructions, value):
+    output = []
+    run_bytecode(compile_bytecode(instructions), lambda: str(value), output.append)
+    return output
+
+
+def test_preheader_labels_are_not_reused():
+    code = Compilation(LOOP, 0).intermediate_code
+    existing = f"{PREHEADER_PREFIX}0"
+    optimizer = Optimizer([Quad(LABEL, existing)] + code)
+    optimizer.optimize_loops()
+    names = labels(optimizer.instructions)
+    assert len(names) == len(set(names))
+    assert f"{PREHEADER_PREFIX}1" in names
+
+
+def test_optimizing_optimized_code_again():
+    code = Compilation(LOOP, 0).intermediate_code
+    first = Optimizer(list(code)).optimize()
+    assert any(name.startswith(PREHEADER_PREFIX) for name in labels(first))
+    second = Optimizer(list(first)).optimize()
+    names = labels(second)
+    assert len(names) == len(set(names))
+    assert run(second, 5) == run(code, 5) == [80]
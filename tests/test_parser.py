@@ -0,0 +1,115 @@
+import sys
+
+import pytest
+
+from lexer import lexer
+from Parser_2 import Parser, ParseError, N_IF, N_WHILE
+from Compiler import Compilation
+from VirtualMachine import run_bytecode
+
+# Deeper than Python's recursion limit, so only an iterative parser gets through
+DEEP = sys.getrecursionlimit() * 3
+
+
+def parse(source):
+    return Parser(lexer(source, recover=True)).parse_program()
+
+
+def nested_program(depth):
+    """
+    `depth` if/while blocks inside each other; the program prints depth - 1.
+    """
+    heads = "".join(f"if (x < {depth}) {{ while (x < {i}) {{ x = x + 1; }}\n" for i in range(depth))
+    return f"var x; x = 0;\n{heads}{'}' * depth}\nprint(x);"
+
+
+def test_deep_nesting_parses():
+    root = parse(nested_program(DEEP))
+    tree = root.tree
+    assert sum(1 for kind in tree.kinds if kind == N_IF) == DEEP
+    assert sum(1 for kind in tree.kinds if kind == N_WHILE) == DEEP
+    # The tree prints back to source that parses to the same tree
+    again = parse(root.generate_code()).tree
+    assert again.kinds == tree.kinds and again.values == tree.values
+
+
+def test_deep_nesting_compiles_and_runs():
+    compilation = Compilation(nested_program(DEEP), 0)
+    assert compilation.analysis.diagnostics == []
+    output = []
+    run_bytecode(compilation.bytecode, output_function=output.append)
+    assert output == [DEEP - 1]
+
+
+def test_deep_nesting_with_else():
+    depth = DEEP
+    source = "var x; x = 1;\n" + "if (x) { x = x + 1; } else {\n" * depth + "x = 0;\n" + "}\n" * depth + "print(x);"
+    root = parse(source)
+    assert sum(1 for kind in root.tree.kinds if kind == N_IF) == depth
+
+
+def test_unclosed_deep_nesting_is_one_error():
+    source = "var x;\n" + "while (x) {\n" * DEEP + "x = 1;\n"
+    with pytest.raises(ParseError) as error:
+        parse(source)
+    assert [diagnostic.message for diagnostic in error.value.diagnostics] == ["Expected }, got end of input"]
+
+
+def errors_of(source):
+    parser = Parser(lexer(source, recover=True))
+    root = parser.parse_program(partial=True)
+    return [(diagnostic.message, diagnostic.line, diagnostic.column) for diagnostic in parser.errors], root
+
+
+def test_recovery_reports_every_error():
+    errors, root = errors_of("var x;\nx = 1 + ;\ny = (2;\nprint(x);\nz = = 3;\n")
+    assert errors == [
+        ("Unexpected token in expression: ; ';'", 2, 9),
+        ("Expected ), got ; ';'", 3, 7),
+        ("Unexpected token in expression: = '='", 5, 5),
+    ]
+    assert root.generate_code() == "var x;\nprint(x);"
+
+
+def test_recovery_inside_blocks_keeps_the_block():
+    errors, root = errors_of("while (x < 3) {\n  x = ;\n  x = x + 1;\n}\nprint(x);")
+    assert errors == [("Unexpected token in expression: ; ';'", 2, 7)]
+    assert root.generate_code() == "while ((x < 3)) {\nx = (x + 1);\n}\nprint(x);"
+
+
+def test_recovery_skips_a_statement_with_a_broken_head():
+    errors, root = errors_of("if (x +) { a = 1; b = 2; } else { c = 3; }\nprint(q);")
+    assert errors == [("Unexpected token in expression: ) ')'", 1, 8)]
+    assert root.generate_code() == "print(q);"
+
+
+def test_illegal_characters_are_reported_with_syntax_errors():
+    errors, root = errors_of("x = 1 $ $ 2;\ny = ;\nz = 3 @;\nw = 4;")
+    assert errors == [
+        ("Illegal character '$'", 1, 7),
+        ("Illegal character '$'", 1, 9),
+        ("Unexpected token in expression: ; ';'", 2, 5),
+        ("Illegal character '@'", 3, 7),
+    ]
+    assert root.generate_code() == "w = 4;"
+
+
+def test_unmatched_closing_brace():
+    errors, root = errors_of("x = 1; } y = 2;")
+    assert errors == [("Unexpected token: } '}'", 1, 8)]
+    assert root.generate_code() == "x = 1;\ny = 2;"
+
+
+def test_parse_error_carries_all_errors_and_the_partial_tree():
+    with pytest.raises(ParseError) as error:
+        parse("x = ;\ny = 1;\nz = ;")
+    assert isinstance(error.value, SyntaxError)
+    assert len(error.value.diagnostics) == 2
+    assert str(error.value) == "Unexpected token in expression: ; ';' at line 1, column 5 (and 1 more)"
+    assert error.value.root.generate_code() == "y = 1;"
+
+
+def test_one_error_per_broken_line_in_a_large_file():
+    lines = [f"x = {i};" if i % 100 else "x = * 1;" for i in range(100000)]
+    errors, _ = errors_of("var x;\n" + "\n".join(lines))
+    assert [line for _, line, _ in errors] == list(range(2, 100002, 100))
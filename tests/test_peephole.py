@@ -0,0 +1,132 @@
+from ICG import Quad, COPY, LABEL, GOTO, IF_GOTO, PRINT
+from Peephole import optimize_intermediate_code, optimize_target_code
+
+
+def text(instructions):
+    return [str(instruction) for instruction in instructions]
+
+
+def optimized(instructions):
+    return text(optimize_intermediate_code(instructions))
+
+
+def test_jump_threading():
+    code = [
+        Quad(IF_GOTO, 'L1', 'a', 1, '<'),
+        Quad(PRINT, None, 'a'),
+        Quad(LABEL, 'L1'),
+        Quad(GOTO, 'L2'),
+        Quad(LABEL, 'L2'),
+        Quad(GOTO, 'L3'),
+        Quad(LABEL, 'L3'),
+        Quad(PRINT, None, 'b'),
+    ]
+    threaded = optimized(code)
+    assert threaded[0] == str(Quad(IF_GOTO, 'L3', 'a', 1, '<'))
+    assert str(Quad(GOTO, 'L2')) not in threaded
+
+
+def test_threading_a_cycle_of_gotos_terminates():
+    code = [
+        Quad(IF_GOTO, 'L1', 'a', 1, '<'),
+        Quad(PRINT, None, 'a'),
+        Quad(LABEL, 'L1'),
+        Quad(GOTO, 'L2'),
+        Quad(LABEL, 'L2'),
+        Quad(GOTO, 'L1'),
+    ]
+    # The goto right before L2: goes, the branch into the cycle stays as it is
+    assert optimized(code) == text(code[:3] + code[4:])
+
+
+def test_goto_to_the_next_label_is_dropped():
+    code = [Quad(GOTO, 'L'), Quad(LABEL, 'L'), Quad(PRINT, None, 'x')]
+    assert optimized(code) == text(code[1:])
+
+
+def test_code_after_a_goto_is_dropped_up_to_a_label():
+    code = [Quad(GOTO, 'L'), Quad(COPY, 'x', 1), Quad(PRINT, None, 'x'), Quad(LABEL, 'M'), Quad(PRINT, None, 'y'),
+            Quad(LABEL, 'L')]
+    assert optimized(code) == text([code[0]] + code[3:])
+
+
+def test_branch_over_a_goto_is_inverted():
+    code = [
+        Quad(IF_GOTO, 'L1', 'a', 'b', '<'),
+        Quad(GOTO, 'L2'),
+        Quad(LABEL, 'L1'),
+        Quad(PRINT, None, 'a'),
+        Quad(LABEL, 'L2'),
+    ]
+    assert optimized(code) == text([
+        Quad(IF_GOTO, 'L2', 'a', 'b', '>='),
+        Quad(LABEL, 'L1'),
+        Quad(PRINT, None, 'a'),
+        Quad(LABEL, 'L2'),
+    ])
+
+
+def test_algebraic_identities():
+    code = [
+        Quad('+', 'a', 'x', 0),
+        Quad('+', 'b', 0, 'x'),
+        Quad('-', 'c', 'x', 0),
+        Quad('*', 'd', 'x', 1),
+        Quad('*', 'e', 1, 'x'),
+        Quad('/', 'f', 'x', 1),
+    ]
+    assert optimized(code) == text([Quad(COPY, name, 'x') for name in 'abcdef'])
+
+
+def test_identities_keep_int_and_float_apart():
+    # x + 0.0 makes an int x a float, and 0 - x is not x
+    code = [Quad('+', 'a', 'x', 0.0), Quad('*', 'b', 'x', 1.0), Quad('-', 'c', 0, 'x'), Quad('/', 'd', 1, 'x')]
+    assert optimized(code) == text(code)
+
+
+def test_self_copy_is_dropped():
+    code = [Quad(COPY, 'x', 'x'), Quad('+', 'y', 'y', 0), Quad(PRINT, None, 'y')]
+    assert optimized(code) == text(code[2:])
+
+
+def test_rewrites_enable_further_rewrites():
+    # Dropping the dead print exposes goto L; L:
+    code = [Quad(GOTO, 'L'), Quad(PRINT, None, 'x'), Quad(LABEL, 'L')]
+    assert optimized(code) == text([Quad(LABEL, 'L')])
+
+
+def test_window_limits_the_rules():
+    code = [Quad(IF_GOTO, 'L1', 'a', 'b', '<'), Quad(GOTO, 'L2'), Quad(LABEL, 'L1'), Quad(LABEL, 'L2')]
+    assert text(optimize_intermediate_code(code, window=1)) == text(code)
+
+
+def test_large_input_is_linear():
+    code = []
+    for i in range(20000):
+        code += [Quad(GOTO, f"L{i}"), Quad(LABEL, f"L{i}"), Quad('+', 'x', 'x', 0)]
+    assert optimized(code) == text([Quad(LABEL, f"L{i}") for i in range(20000)])
+
+
+def test_target_move_pairs():
+    code = [
+        ('mov', 'eax', 'eax'),
+        ('mov', 'eax', 'ebx'),
+        ('mov', 'ebx', 'eax'),
+        ('mov', 'ecx', 1),
+        ('mov', 'ecx', '[x]'),
+        ('jmp', 'L'),
+        ('label', 'L'),
+        ('print', 'ecx'),
+    ]
+    assert optimize_target_code(code) == [
+        ('mov', 'eax', 'ebx'),
+        ('mov', 'ecx', '[x]'),
+        ('label', 'L'),
+        ('print', 'ecx'),
+    ]
+
+
+def test_target_move_of_a_register_into_itself_is_kept_apart():
+    # mov a, b; mov a, a is a self move; the overwritten move rule must not drop the first one
+    code = [('mov', 'eax', 'ebx'), ('mov', 'eax', 'eax'), ('print', 'eax')]
+    assert optimize_target_code(code) == [('mov', 'eax', 'ebx'), ('print', 'eax')]
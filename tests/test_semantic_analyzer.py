@@ -0,0 +1,47 @@
+from Compiler import Compilation
+from ICG import IntermediateCodeGenerator, COPY
+from Parser_2 import N_VAR_DECL, N_ASSIGN, N_INPUT, N_ID, N_NUMBER, T_INT, T_FLOAT
+
+
+def test_names_are_resolved_to_slots():
+    root = Compilation("var x; float y; input(x); y = 1.5; print(y * x);").checked_tree()
+    tree = root.tree
+    assert tree.slot_names == ['x', 'y']
+    for node in range(len(tree)):
+        if tree.kinds[node] in (N_VAR_DECL, N_ASSIGN, N_INPUT, N_ID):
+            assert tree.slot_names[tree.slots[node]] == tree.values[node]
+        else:
+            assert tree.slots[node] == -1
+
+
+def test_code_generator_uses_the_analyzed_types():
+    root = Compilation("float f; var i; f = 2.0; i = 3;").checked_tree()
+    tree = root.tree
+    numbers = [node for node in range(len(tree)) if tree.kinds[node] == N_NUMBER]
+    assert sorted(tree.types[node] for node in numbers) == [T_INT, T_FLOAT]
+
+    # The generator takes the constants from tree.types, not from the lexemes
+    for node in numbers:
+        tree.types[node] = T_FLOAT
+    code = IntermediateCodeGenerator().generate_code_for_program(root)
+    assert [(quad.dst, quad.src1) for quad in code if quad.op == COPY] == [('f', 2.0), ('i', 3.0)]
+    assert all(type(quad.src1) is float for quad in code)
+
+
+def test_shadowed_names_get_their_own_slots():
+    source = """
+        var x; x = 1;
+        if (x) { float x; x = 2.5; while (x < 3) { var x; x = 3; print(x); } }
+        if (x) { var x; x = 4; }
+        print(x);
+    """
+    root = Compilation(source).checked_tree()
+    assert root.tree.slot_names == ['x', 'x%1', 'x%2', 'x%3']
+
+
+def test_redeclaration_in_the_same_scope_is_an_error():
+    analysis = Compilation("var x; if (1) { var x; float x; x = 1.5; } var x; x = 1; print(x);").analysis
+    assert [(diagnostic.message, diagnostic.column) for diagnostic in analysis.errors] == [
+        ("Variable 'x' is already declared on line 1", 24),
+        ("Variable 'x' is already declared on line 1", 44),
+    ]
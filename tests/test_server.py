@@ -0,0 +1,65 @@
+import asyncio
+import json
+import os
+
+from CompilerServer import CompilerServer, compile_program
+
+
+def test_warnings_are_returned_with_the_code():
+    response = compile_program("var x; var y; y = 1; if (y) { x = 1; } print(x);", 1, ('target',))
+    assert response['ok']
+    assert response['target']
+    assert response['diagnostics'] == [{'severity': 'warning', 'message': "Variable 'x' may be used before being assigned",
+                                        'line': 1, 'column': 46}]
+
+
+def test_errors_are_returned_with_the_warnings():
+    response = compile_program("var x; var y; if (y) { x = 1; } print(x);", 1, ('tokens',))
+    assert not response['ok']
+    assert [(found['severity'], found['line'], found['column']) for found in response['diagnostics']] == [
+        ('error', 1, 19), ('warning', 1, 39)]
+
+
+async def exchange(socket_path, requests):
+    """
+    Sends JSON requests on one connection and returns the responses by id.
+    """
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    for request in requests:
+        writer.write(json.dumps(request).encode() + b'\n')
+    await writer.drain()
+    responses = {}
+    for _ in requests:
+        response = json.loads(await asyncio.wait_for(reader.readline(), 10))
+        responses[response['id']] = response
+    writer.close()
+    return responses
+
+
+def test_malformed_requests_get_an_error_response(tmp_path):
+    socket_path = str(tmp_path / 'daemon.sock')
+    requests = [
+        {'id': 1, 'source': "print(1);", 'level': [2]},
+        {'id': 2, 'source': "print(1);", 'emit': [['ir']]},
+        {'id': 3, 'source': "print(1);", 'emit': [{'kind': 'ir'}]},
+        {'id': 4, 'source': "print(1);", 'level': 7},
+        {'id': 5, 'source': "var x; x = 2; print(x);", 'level': 1, 'emit': ['ir']},
+    ]
+
+    async def scenario():
+        server = CompilerServer(socket_path, jobs=1)
+        serving = asyncio.ensure_future(server.serve())
+        while not os.path.exists(socket_path):
+            await asyncio.sleep(0.01)
+        try:
+            return await exchange(socket_path, requests)
+        finally:
+            server.stop()
+            await serving
+
+    responses = asyncio.run(scenario())
+    for request_id in (1, 2, 3, 4):
+        assert not responses[request_id]['ok']
+        assert "A compile request needs" in responses[request_id]['diagnostics'][0]['message']
+    # The connection still works after the bad requests
+    assert responses[5]['ok'] and responses[5]['ir']